@@ -0,0 +1,134 @@
+"""
+Compares dashboard queries served from the event rollup table with the same
+aggregation computed over raw modules_module_event rows.
+
+Seeds synthetic events into the database configured by PG_URL and removes them
+afterwards (unless --keep is passed):
+
+    python -m benchmarks.event_rollups --events 1000000 --devices 20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import delete
+
+from src.config.database import AsyncSessionLocal, engine
+from src.consts import EventPriority, ModuleType, RollupGranularity
+from src.models import AnalyticsModule, Device, ModuleEvent, ModuleEventRollup
+from src.models.devices import DeviceType
+from src.schemas.module_events import EventCreate, EventFilter
+from src.services.module_events import EventService
+
+BATCH_SIZE = 10_000
+
+
+async def seed(events: int, devices: int, days: int) -> tuple[list[int], int]:
+    async with AsyncSessionLocal() as session:
+        device_objs = [
+            Device(device_type=DeviceType.CAMERA, name=f"bench {i}", source="bench")
+            for i in range(devices)
+        ]
+        module = AnalyticsModule(
+            name="bench", module_type=ModuleType.PEOPLE_COUNTER.value
+        )
+        session.add_all([*device_objs, module])
+        await session.commit()
+        device_ids = [device.id for device in device_objs]
+
+        service = EventService(session)
+        now = datetime.now(tz=UTC)
+        priorities = list(EventPriority)
+        for offset in range(0, events, BATCH_SIZE):
+            batch = [
+                EventCreate(
+                    artifact_path="bench",
+                    description="bench",
+                    event_timestamp=now
+                    - timedelta(seconds=random.uniform(0, days * 86400)),
+                    name="bench",
+                    priority=random.choice(priorities),
+                    device_id=random.choice(device_ids),
+                    module_id=module.id,
+                )
+                for _ in range(min(BATCH_SIZE, events - offset))
+            ]
+            await service.bulk_create(batch)
+        return device_ids, module.id
+
+
+async def measure(query, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            await query(EventService(session))
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def cleanup(device_ids: list[int], module_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            delete(ModuleEvent).where(ModuleEvent.device_id.in_(device_ids))
+        )
+        await session.execute(
+            delete(ModuleEventRollup).where(ModuleEventRollup.device_id.in_(device_ids))
+        )
+        await session.execute(delete(Device).where(Device.id.in_(device_ids)))
+        await session.execute(
+            delete(AnalyticsModule).where(AnalyticsModule.id == module_id)
+        )
+        await session.commit()
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine.echo = False
+    print(f"Seeding {args.events} events over {args.days} days...")
+    device_ids, module_id = await seed(args.events, args.devices, args.days)
+    now = datetime.now(tz=UTC)
+    cases = {
+        "device, last 24h, per minute": (
+            EventFilter(device_id=device_ids[0], from_=now - timedelta(days=1)),
+            RollupGranularity.MINUTE,
+        ),
+        f"module, last {args.days}d, per hour": (
+            EventFilter(module_id=module_id, from_=now - timedelta(days=args.days)),
+            RollupGranularity.HOUR,
+        ),
+    }
+    try:
+        for name, (filters, granularity) in cases.items():
+            raw = await measure(
+                lambda service: service.aggregate_raw(filters, granularity),
+                args.repeats,
+            )
+            rollup = await measure(
+                lambda service: service.get_rollups(filters, granularity),
+                args.repeats,
+            )
+            print(
+                f"{name:<32} raw {raw * 1000:9.2f} ms   rollup {rollup * 1000:9.2f} ms"
+                f"   x{raw / rollup:.1f}"
+            )
+    finally:
+        if not args.keep:
+            await cleanup(device_ids, module_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--keep", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
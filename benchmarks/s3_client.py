@@ -0,0 +1,82 @@
+"""
+Compares S3StorageClient creating a client per call (the behaviour before the
+client was shared) with the single long-lived client opened by the application.
+
+Uses the bucket configured by S3_URL/S3_BUCKET_NAME and removes the uploaded
+object afterwards. Presign runs without a reachable S3, pass --presign-only then:
+
+    python -m benchmarks.s3_client --repeats 200 --size 65536
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+import uuid
+
+from src.config.project_settings import get_settings
+from src.external_services.storage.minio_s3 import S3StorageClient, create_file_storage
+
+
+async def measure(operation, repeats: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await operation()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def drain(storage: S3StorageClient, path: str) -> None:
+    file_stream = await storage.stream_file(path)
+    async for _ in file_stream.chunks:
+        pass
+
+
+async def run(args: argparse.Namespace) -> None:
+    storage = create_file_storage(get_settings())
+    path = f"benchmarks/{uuid.uuid4()}"
+    payload = os.urandom(args.size)
+    operations = {"presign": lambda: storage.get_file_link(path)}
+    if not args.presign_only:
+        operations = {
+            "upload": lambda: storage.upload_file(io.BytesIO(payload), path),
+            "download": lambda: drain(storage, path),
+            **operations,
+        }
+
+    results = {}
+    try:
+        for mode in ("per call", "shared"):
+            if mode == "shared":
+                await storage.open()
+            for name, operation in operations.items():
+                results[mode, name] = await measure(operation, args.repeats)
+    finally:
+        if not args.presign_only:
+            await storage.delete_file(path)
+        await storage.close()
+
+    for name in operations:
+        per_call, _ = results["per call", name]
+        shared, shared_p95 = results["shared", name]
+        print(
+            f"{name:<10} per call {per_call * 1000:8.2f} ms   shared "
+            f"{shared * 1000:8.2f} ms (p95 {shared_p95 * 1000:.2f})"
+            f"   x{per_call / shared:.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=100)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--presign-only", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
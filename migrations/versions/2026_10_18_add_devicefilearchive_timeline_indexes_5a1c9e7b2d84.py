@@ -0,0 +1,46 @@
+"""Add timeline indexes to DeviceFileArchive
+
+Revision ID: 5a1c9e7b2d84
+Revises: 4fced5d3fc31
+Create Date: 2026-10-18 16:04:40.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5a1c9e7b2d84"
+down_revision: Union[str, None] = "4fced5d3fc31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_devices_device_file_archive_device_id_timestamp_start",
+        "devices_device_file_archive",
+        ["device_id", "timestamp_start", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_devices_device_file_archive_device_id_duration",
+        "devices_device_file_archive",
+        ["device_id", sa.text("(timestamp_end - timestamp_start)")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_devices_device_file_archive_device_id_duration",
+        table_name="devices_device_file_archive",
+    )
+    op.drop_index(
+        "ix_devices_device_file_archive_device_id_timestamp_start",
+        table_name="devices_device_file_archive",
+    )
@@ -0,0 +1,63 @@
+"""Add time range indexes to ModuleEvent
+
+Revision ID: 845815d3704c
+Revises: fe8be65424bf
+Create Date: 2026-10-18 10:42:17.305518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "845815d3704c"
+down_revision: Union[str, None] = "fe8be65424bf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "modules_module_event",
+        "event_timestamp",
+        existing_type=postgresql.TIMESTAMP(),
+        type_=sa.TIMESTAMP(timezone=True),
+        existing_nullable=False,
+        postgresql_using="event_timestamp AT TIME ZONE 'UTC'",
+    )
+    op.create_index(
+        "ix_modules_module_event_device_id_event_timestamp",
+        "modules_module_event",
+        ["device_id", "event_timestamp", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_modules_module_event_module_id_event_timestamp",
+        "modules_module_event",
+        ["module_id", "event_timestamp", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_modules_module_event_module_id_event_timestamp",
+        table_name="modules_module_event",
+    )
+    op.drop_index(
+        "ix_modules_module_event_device_id_event_timestamp",
+        table_name="modules_module_event",
+    )
+    op.alter_column(
+        "modules_module_event",
+        "event_timestamp",
+        existing_type=sa.TIMESTAMP(timezone=True),
+        type_=postgresql.TIMESTAMP(),
+        existing_nullable=False,
+        postgresql_using="event_timestamp AT TIME ZONE 'UTC'",
+    )
@@ -0,0 +1,63 @@
+"""Create ArchiveObject table
+
+Revision ID: 7c3e1f0a9b52
+Revises: 5a1c9e7b2d84
+Create Date: 2026-10-18 18:12:07.532810
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3e1f0a9b52"
+down_revision: Union[str, None] = "5a1c9e7b2d84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "devices_archive_object",
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("path", name=op.f("pk_devices_archive_object")),
+    )
+    op.create_index(
+        "ix_devices_archive_object_unreferenced",
+        "devices_archive_object",
+        ["path"],
+        unique=False,
+        postgresql_where=sa.text("ref_count <= 0"),
+    )
+    # Files uploaded so far, the ones only deleted archives refer to are left for
+    # the archive GC
+    op.execute(
+        """
+        INSERT INTO devices_archive_object (path, ref_count)
+        SELECT filepath, count(*) FILTER (WHERE NOT is_deleted)
+        FROM devices_device_file_archive
+        WHERE filepath IS NOT NULL
+        GROUP BY filepath
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_devices_archive_object_unreferenced",
+        table_name="devices_archive_object",
+        postgresql_where=sa.text("ref_count <= 0"),
+    )
+    op.drop_table("devices_archive_object")
@@ -0,0 +1,84 @@
+"""Create ModuleEventRollup table
+
+Revision ID: 4fced5d3fc31
+Revises: 3b7e2d9c41af
+Create Date: 2026-10-18 15:21:09.518842
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4fced5d3fc31"
+down_revision: Union[str, None] = "3b7e2d9c41af"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GRANULARITIES = {"MINUTE": "minute", "HOUR": "hour"}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "modules_module_event_rollup",
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("module_id", sa.Integer(), nullable=False),
+        sa.Column("priority", sa.String(), nullable=False),
+        sa.Column("event_count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "granularity",
+            "bucket_start",
+            "device_id",
+            "module_id",
+            "priority",
+            name=op.f("pk_modules_module_event_rollup"),
+        ),
+    )
+    op.create_index(
+        "ix_modules_module_event_rollup_device_id_bucket_start",
+        "modules_module_event_rollup",
+        ["granularity", "device_id", "bucket_start"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_modules_module_event_rollup_module_id_bucket_start",
+        "modules_module_event_rollup",
+        ["granularity", "module_id", "bucket_start"],
+        unique=False,
+    )
+    # Backfill from the events stored so far, new events update rollups on insert
+    for granularity, field in GRANULARITIES.items():
+        op.execute(
+            f"""
+            INSERT INTO modules_module_event_rollup
+                (granularity, bucket_start, device_id, module_id, priority, event_count)
+            SELECT
+                '{granularity}',
+                date_trunc('{field}', event_timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                device_id,
+                module_id,
+                priority,
+                count(*)
+            FROM modules_module_event
+            GROUP BY 2, device_id, module_id, priority
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_modules_module_event_rollup_module_id_bucket_start",
+        table_name="modules_module_event_rollup",
+    )
+    op.drop_index(
+        "ix_modules_module_event_rollup_device_id_bucket_start",
+        table_name="modules_module_event_rollup",
+    )
+    op.drop_table("modules_module_event_rollup")
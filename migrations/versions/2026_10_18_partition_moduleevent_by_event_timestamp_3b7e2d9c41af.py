@@ -0,0 +1,129 @@
+"""Partition ModuleEvent by event_timestamp
+
+Revision ID: 3b7e2d9c41af
+Revises: 845815d3704c
+Create Date: 2026-10-18 13:05:41.227304
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b7e2d9c41af"
+down_revision: Union[str, None] = "845815d3704c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "modules_module_event"
+LEGACY_TABLE = "modules_module_event_legacy"
+INDEXES = {
+    "ix_modules_module_event_device_id_event_timestamp": "device_id",
+    "ix_modules_module_event_module_id_event_timestamp": "module_id",
+}
+PRE_CREATED_DAYS = 7
+
+
+def _event_columns() -> list[sa.Column]:
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text(f"nextval('{TABLE}_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("artifact_path", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("event_timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("priority", sa.String(), server_default="MEDIUM", nullable=False),
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("module_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["device_id"],
+            ["devices_device.id"],
+            name=op.f("fk_modules_module_event_device_id_devices_device"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["module_id"],
+            ["modules_analytics_module.id"],
+            name=op.f("fk_modules_module_event_module_id_modules_analytics_module"),
+        ),
+    ]
+
+
+def _rename_to_legacy() -> None:
+    op.rename_table(TABLE, LEGACY_TABLE)
+    op.execute(
+        f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT pk_{TABLE} TO pk_{LEGACY_TABLE}"
+    )
+    for index in INDEXES:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+
+
+def _create_indexes() -> None:
+    for index, column in INDEXES.items():
+        op.create_index(index, TABLE, [column, "event_timestamp", "id"], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rename_to_legacy()
+    op.create_table(
+        TABLE,
+        *_event_columns(),
+        sa.PrimaryKeyConstraint("id", "event_timestamp", name=op.f(f"pk_{TABLE}")),
+        postgresql_partition_by="RANGE (event_timestamp)",
+    )
+    _create_indexes()
+    op.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+    # Daily partitions for every day that already has events plus the next week,
+    # further partitions are maintained by `python -m src.commands.event_partitions`
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            day timestamp;
+        BEGIN
+            FOR day IN
+                SELECT date_trunc('day', event_timestamp AT TIME ZONE 'UTC')
+                FROM {LEGACY_TABLE}
+                UNION
+                SELECT generate_series(
+                    date_trunc('day', now() AT TIME ZONE 'UTC'),
+                    date_trunc('day', now() AT TIME ZONE 'UTC')
+                        + interval '{PRE_CREATED_DAYS} days',
+                    interval '1 day'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {TABLE} FOR VALUES FROM (%L) TO (%L)',
+                    '{TABLE}_p' || to_char(day, 'YYYYMMDD'),
+                    day AT TIME ZONE 'UTC',
+                    (day + interval '1 day') AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute(f"INSERT INTO {TABLE} SELECT * FROM {LEGACY_TABLE}")
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    op.drop_table(LEGACY_TABLE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rename_to_legacy()
+    op.create_table(
+        TABLE,
+        *_event_columns(),
+        sa.PrimaryKeyConstraint("id", name=op.f(f"pk_{TABLE}")),
+    )
+    op.execute(f"INSERT INTO {TABLE} SELECT * FROM {LEGACY_TABLE}")
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    # Dropping the partitioned table drops all of its partitions and their constraints
+    op.drop_table(LEGACY_TABLE)
+    _create_indexes()
@@ -0,0 +1,90 @@
+"""
+Removes deleted archive rows and the files no live archive refers to anymore.
+With --orphans it also lists the whole storage and removes files that were never
+recorded, so the storage must not be shared with anything else. Meant to be run
+periodically (cron, k8s CronJob):
+
+    python -m src.commands.archive_gc [--orphans] [--dry-run] [--rate N]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+
+from src.config.database import AsyncSessionLocal
+from src.config.project_settings import get_settings
+from src.external_services.storage.minio_s3 import create_file_storage
+from src.services.archive_gc import ArchiveGarbageCollector
+
+logger = logging.getLogger(__name__)
+
+
+async def collect_garbage(
+    orphans: bool,
+    batch_size: int,
+    rate: float,
+    orphan_min_age: int,
+    dry_run: bool,
+) -> None:
+    storage = create_file_storage(get_settings())
+    await storage.open()
+    collector = ArchiveGarbageCollector(
+        session_factory=AsyncSessionLocal,
+        storage=storage,
+        batch_size=batch_size,
+        max_deletes_per_second=rate or None,
+        orphan_min_age=timedelta(seconds=orphan_min_age),
+        dry_run=dry_run,
+    )
+    verb = "Would delete" if dry_run else "Deleted"
+    try:
+        stats = await collector.collect_deleted()
+        logger.info(
+            "%s %d deleted archives and %d unreferenced files, %d files failed",
+            verb,
+            stats.deleted_rows,
+            stats.deleted_files,
+            stats.failed_files,
+        )
+        if orphans:
+            stats = await collector.collect_orphans()
+            logger.info(
+                "%s %d orphaned files, %d failed",
+                verb,
+                stats.deleted_files,
+                stats.failed_files,
+            )
+    finally:
+        await storage.close()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orphans", action="store_true")
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.archive_gc_batch_size
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=settings.archive_gc_deletes_per_second,
+        help="Files deleted per second at most, 0 for no limit",
+    )
+    parser.add_argument(
+        "--orphan-min-age", type=int, default=settings.archive_gc_orphan_min_age
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        collect_garbage(
+            args.orphans, args.batch_size, args.rate, args.orphan_min_age, args.dry_run
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Partition maintenance for ModuleEvent, meant to be run periodically (cron, k8s CronJob):
+
+    python -m src.commands.event_partitions [--premake N] [--retention-days N] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, UTC
+
+from src.config.database import AsyncSessionLocal
+from src.config.project_settings import get_settings
+from src.services.event_partitions import EventPartitionService
+
+logger = logging.getLogger(__name__)
+
+
+async def maintain_partitions(premake: int, retention_days: int, dry_run: bool) -> None:
+    settings = get_settings()
+    now = datetime.now(tz=UTC)
+    async with AsyncSessionLocal() as session:
+        service = EventPartitionService(session, settings.event_partition_interval)
+        for partition in await service.create_partitions(now, premake, dry_run):
+            logger.info(
+                "%s partition %s [%s, %s)",
+                "Would create" if dry_run else "Created",
+                partition.name,
+                partition.start,
+                partition.end,
+            )
+
+    async with AsyncSessionLocal() as session:
+        service = EventPartitionService(session, settings.event_partition_interval)
+        cutoff = now - timedelta(days=retention_days)
+        for partition in await service.drop_partitions(cutoff, dry_run):
+            logger.info(
+                "%s partition %s (ends %s)",
+                "Would drop" if dry_run else "Dropped",
+                partition.name,
+                partition.end,
+            )
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--premake", type=int, default=settings.event_partition_premake)
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.event_retention_days
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(maintain_partitions(args.premake, args.retention_days, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Writes events queued in the Redis ingest streams into Postgres. Every priority lane
+is drained by its own consumers, as many as the lane's concurrency setting. Run as
+many instances as needed, they share the work through consumer groups. Metrics are
+served on event_stream_metrics_port:
+
+    python -m src.commands.event_stream_worker [--consumer NAME]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+import redis.asyncio as redis
+from prometheus_client import start_http_server
+
+from src.config.database import AsyncSessionLocal
+from src.config.project_settings import get_settings
+from src.external_services.redis.event_feed import EventFeedPublisher
+from src.external_services.redis.event_stream import lane_key
+from src.external_services.redis.redis import pool
+from src.services.event_stream import EventStreamWorker
+
+
+async def run_workers(consumer: str) -> None:
+    settings = get_settings()
+    if settings.event_stream_metrics_port is not None:
+        start_http_server(settings.event_stream_metrics_port)
+    client = redis.Redis(connection_pool=pool)
+    publisher = EventFeedPublisher(client, settings.event_feed_channel)
+    workers = [
+        EventStreamWorker(
+            client=client,
+            session_factory=AsyncSessionLocal,
+            key=lane_key(settings.event_stream_key, priority),
+            group=settings.event_stream_group,
+            consumer=f"{consumer}-{priority.value.lower()}-{number}",
+            batch_size=settings.event_stream_batch_size,
+            block_ms=settings.event_stream_block_ms,
+            claim_idle_ms=settings.event_stream_claim_idle_ms,
+            publisher=publisher,
+            max_deliveries=settings.event_stream_max_deliveries,
+        )
+        for priority, lane in settings.event_lanes.items()
+        for number in range(lane.concurrency)
+    ]
+
+    def stop() -> None:
+        for worker in workers:
+            worker.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+    try:
+        await asyncio.gather(*(worker.run() for worker in workers))
+    finally:
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_workers(args.consumer))
+
+
+if __name__ == "__main__":
+    main()
@@ -44,3 +44,8 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
             yield session
         finally:
             await session.close()
+
+
+# Dependency for handlers that outlive the request scoped session, e.g. streaming responses
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return AsyncSessionLocal
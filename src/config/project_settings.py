@@ -1,14 +1,20 @@
 import os
 from functools import lru_cache
 
-from pydantic import PostgresDsn
+from pydantic import BaseModel, PostgresDsn, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from src.consts import StorageType
+from src.consts import StorageType, PartitionInterval, EventIngestion, EventPriority
 
 DOTENV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", ".env")
 
 
+class EventLaneSettings(BaseModel):
+    flush_rows: int
+    flush_interval: float
+    concurrency: int = 1
+
+
 class Settings(BaseSettings):
     pg_url: PostgresDsn = None
     test_db_url: PostgresDsn = None
@@ -17,10 +23,95 @@ class Settings(BaseSettings):
         env_file=DOTENV_PATH, env_file_encoding="utf-8", extra="allow"
     )
     storage_type: StorageType
-    s3_url: str
-    s3_access_key: str
-    s3_secret_key: str
-    s3_bucket_name: str
+    s3_url: str | None = None
+    s3_access_key: str | None = None
+    s3_secret_key: str | None = None
+    s3_bucket_name: str | None = None
+    s3_region: str = "us-east-1"
+    s3_multipart_threshold: int = 64 * 1024 * 1024
+    s3_multipart_part_size: int = 16 * 1024 * 1024
+    s3_multipart_concurrency: int = 4
+    s3_max_pool_connections: int = 50
+    s3_keepalive_timeout: float = 60
+    # Lifetime of presigned S3 links and signed local storage links
+    s3_presign_expires: int = 3600
+    local_storage_dir: str = "storage"
+    local_storage_url: str = "/api/v1/files/"
+    local_storage_secret: str | None = None
+    # Local disk cache in front of the storage, disabled unless a directory is set
+    disk_cache_dir: str | None = None
+    disk_cache_max_size: int = 10 * 1024 * 1024 * 1024
+    disk_cache_max_object_size: int = 512 * 1024 * 1024
+    # Links are cached until this many seconds before they expire
+    link_cache_margin: int = 600
+    link_cache_size: int = 10_000
+    link_cache_local_ttl: int = 60
+    link_cache_redis: bool = False
+    download_links_max_ids: int = 500
+    download_links_concurrency: int = 16
+    # Chunks of resumable uploads, S3 takes no parts below 5 MiB except the last
+    archive_upload_chunk_size: int = 8 * 1024 * 1024
+    # Resumable uploads are forgotten this long after their last chunk
+    archive_upload_ttl: int = 24 * 60 * 60
+    archive_clip_max_segments: int = 1000
+    # Chunks of the clip read ahead of the client, bounds the memory per clip
+    archive_clip_prefetch_chunks: int = 8
+    archive_gc_batch_size: int = 1000
+    archive_gc_deletes_per_second: float = 500
+    # Files younger than this may still be waiting for their archive row
+    archive_gc_orphan_min_age: int = 24 * 60 * 60
+
+    redis_url: str = "redis://localhost:6379/0"
+    # Seconds entities of a model stay cached by name, models not listed aren't cached
+    entity_cache_ttls: dict[str, int] = {
+        "Device": 100,
+        "AnalyticsModule": 100,
+        "DeviceFileArchive": 100,
+    }
+
+    event_ingestion: EventIngestion = EventIngestion.BUFFER
+    event_bulk_max_size: int = 10_000
+    event_buffer_max_size: int = 10_000
+    # CRITICAL and HIGH events get their own lanes that flush right away, so they
+    # never wait behind a large batch of routine events
+    event_lanes: dict[EventPriority, EventLaneSettings] = {
+        EventPriority.CRITICAL: EventLaneSettings(
+            flush_rows=50, flush_interval=0, concurrency=4
+        ),
+        EventPriority.HIGH: EventLaneSettings(
+            flush_rows=100, flush_interval=0.01, concurrency=2
+        ),
+        EventPriority.MEDIUM: EventLaneSettings(flush_rows=500, flush_interval=0.05),
+        EventPriority.LOW: EventLaneSettings(flush_rows=1000, flush_interval=0.2),
+    }
+    event_stream_key: str = "events:ingest"
+    event_stream_max_length: int = 1_000_000
+    event_stream_group: str = "event-writers"
+    event_stream_batch_size: int = 1000
+    event_stream_block_ms: int = 1000
+    event_stream_claim_idle_ms: int = 60_000
+    # Entries failing this many deliveries go to the "<lane key>:dead" stream
+    event_stream_max_deliveries: int = 5
+    # Port the stream worker serves its Prometheus metrics on, None turns it off
+    event_stream_metrics_port: int | None = 9100
+    event_feed_channel: str = "events:live"
+    event_feed_buffer_size: int = 1000
+    event_feed_heartbeat: float = 15.0
+    event_partition_interval: PartitionInterval = PartitionInterval.DAILY
+    event_partition_premake: int = 7
+    event_retention_days: int = 90
+
+    @field_validator("event_lanes")
+    @classmethod
+    def check_event_lanes(
+        cls, lanes: dict[EventPriority, EventLaneSettings]
+    ) -> dict[EventPriority, EventLaneSettings]:
+        missing = [
+            priority.value for priority in EventPriority if priority not in lanes
+        ]
+        if missing:
+            raise ValueError(f"No event lanes for {', '.join(missing)}")
+        return lanes
 
 
 @lru_cache
@@ -3,6 +3,7 @@ import enum
 
 class StorageType(enum.Enum):
     S3 = "S3"
+    LOCAL = "LOCAL"
 
 
 class ModuleType(enum.Enum):
@@ -15,3 +16,23 @@ class EventPriority(enum.Enum):
     MEDIUM = "MEDIUM"
     HIGH = "HIGH"
     CRITICAL = "CRITICAL"
+
+
+class PartitionInterval(enum.Enum):
+    DAILY = "DAILY"
+    WEEKLY = "WEEKLY"
+
+
+class ExportFormat(enum.Enum):
+    NDJSON = "NDJSON"
+    CSV = "CSV"
+
+
+class RollupGranularity(enum.Enum):
+    MINUTE = "MINUTE"
+    HOUR = "HOUR"
+
+
+class EventIngestion(enum.Enum):
+    BUFFER = "BUFFER"
+    STREAM = "STREAM"
@@ -0,0 +1,128 @@
+import math
+from dataclasses import dataclass, field
+from typing import Annotated
+
+import redis.asyncio as redis
+from fastapi import Depends
+
+from src.config.project_settings import Settings, get_settings
+from src.external_services.redis.redis import get_redis
+
+KEY_PREFIX = "archive:upload:"
+CHUNK_PREFIX = "chunk:"
+
+# Records a chunk unless the upload is gone or being completed or aborted
+ADD_CHUNK_SCRIPT = """
+if redis.call("HEXISTS", KEYS[1], "archive_id") == 0
+    or redis.call("HEXISTS", KEYS[1], "claimed") == 1 then
+    return 0
+end
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+return 1
+"""
+
+
+@dataclass
+class UploadSession:
+    id: str
+    archive_id: int
+    path: str
+    storage_upload_id: str
+    size: int
+    chunk_size: int
+    # ETags of the received chunks by chunk number
+    chunks: dict[int, str] = field(default_factory=dict)
+    # Set once a caller is completing or aborting the upload
+    claimed: bool = False
+
+    @property
+    def chunk_count(self) -> int:
+        return max(math.ceil(self.size / self.chunk_size), 1)
+
+    def chunk_length(self, number: int) -> int:
+        if number < self.chunk_count:
+            return self.chunk_size
+        return self.size - self.chunk_size * (self.chunk_count - 1)
+
+    @property
+    def missing(self) -> list[int]:
+        return [
+            number
+            for number in range(1, self.chunk_count + 1)
+            if number not in self.chunks
+        ]
+
+
+class UploadSessionStore:
+    """
+    State of resumable archive uploads, one Redis hash per upload that expires
+    ttl seconds after the last chunk arrived.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int) -> None:
+        self.client = client
+        self.ttl = ttl
+        self._add_chunk = client.register_script(ADD_CHUNK_SCRIPT)
+
+    async def create(self, session: UploadSession) -> None:
+        key = KEY_PREFIX + session.id
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={
+                    "archive_id": session.archive_id,
+                    "path": session.path,
+                    "storage_upload_id": session.storage_upload_id,
+                    "size": session.size,
+                    "chunk_size": session.chunk_size,
+                },
+            )
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def get(self, upload_id: str) -> UploadSession | None:
+        fields = await self.client.hgetall(KEY_PREFIX + upload_id)
+        if not fields:
+            return None
+        return UploadSession(
+            id=upload_id,
+            archive_id=int(fields["archive_id"]),
+            path=fields["path"],
+            storage_upload_id=fields["storage_upload_id"],
+            size=int(fields["size"]),
+            chunk_size=int(fields["chunk_size"]),
+            chunks={
+                int(name.removeprefix(CHUNK_PREFIX)): etag
+                for name, etag in fields.items()
+                if name.startswith(CHUNK_PREFIX)
+            },
+            claimed="claimed" in fields,
+        )
+
+    async def add_chunk(self, session: UploadSession, number: int, etag: str) -> bool:
+        """Whether the chunk was recorded, it isn't once the upload is claimed."""
+        added = await self._add_chunk(
+            keys=[KEY_PREFIX + session.id],
+            args=[f"{CHUNK_PREFIX}{number}", etag, self.ttl],
+        )
+        if added:
+            session.chunks[number] = etag
+        return bool(added)
+
+    async def claim(self, session: UploadSession) -> bool:
+        """Whether this caller may complete or abort the upload, only one may."""
+        return await self.client.hsetnx(KEY_PREFIX + session.id, "claimed", 1)
+
+    async def unclaim(self, session: UploadSession) -> None:
+        await self.client.hdel(KEY_PREFIX + session.id, "claimed")
+
+    async def delete(self, session: UploadSession) -> None:
+        await self.client.delete(KEY_PREFIX + session.id)
+
+
+def get_upload_session_store(
+    client: Annotated[redis.Redis, Depends(get_redis)],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> UploadSessionStore:
+    return UploadSessionStore(client, settings.archive_upload_ttl)
@@ -0,0 +1,39 @@
+import json
+import logging
+from typing import Annotated, Sequence
+
+import redis.asyncio as redis
+from fastapi import Depends
+from fastapi.encoders import jsonable_encoder
+from redis.exceptions import RedisError
+
+from src.config.project_settings import Settings, get_settings
+from src.external_services.redis.redis import get_redis
+from src.schemas.module_events import EventRetrieve
+
+logger = logging.getLogger(__name__)
+
+
+class EventFeedPublisher:
+    """Announces committed events to live feed subscribers of every API worker."""
+
+    def __init__(self, client: redis.Redis, channel: str) -> None:
+        self.client = client
+        self.channel = channel
+
+    async def publish(self, events: Sequence[EventRetrieve]) -> None:
+        # One message per committed batch, the live feed is best effort and must
+        # never fail ingestion
+        try:
+            await self.client.publish(
+                self.channel, json.dumps(jsonable_encoder(events))
+            )
+        except RedisError:
+            logger.exception("Failed to publish %d events to live feed", len(events))
+
+
+def get_event_feed_publisher(
+    client: Annotated[redis.Redis, Depends(get_redis)],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> EventFeedPublisher:
+    return EventFeedPublisher(client, settings.event_feed_channel)
@@ -0,0 +1,43 @@
+from typing import Annotated, Sequence
+
+import redis.asyncio as redis
+from fastapi import Depends
+
+from src.config.project_settings import Settings, get_settings
+from src.consts import EventPriority
+from src.external_services.redis.redis import get_redis
+from src.schemas.module_events import EventCreate
+
+EVENT_FIELD = "event"
+
+
+def lane_key(key: str, priority: EventPriority | str) -> str:
+    """Every priority is queued in its own stream and drained by its own workers."""
+    return f"{key}:{EventPriority(priority).value}"
+
+
+class EventStreamProducer:
+    def __init__(self, client: redis.Redis, key: str, max_length: int) -> None:
+        self.client = client
+        self.key = key
+        self.max_length = max_length
+
+    async def publish(self, events: Sequence[EventCreate]) -> list[str]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.xadd(
+                    lane_key(self.key, event.priority),
+                    {EVENT_FIELD: event.model_dump_json()},
+                    maxlen=self.max_length,
+                    approximate=True,
+                )
+            return await pipe.execute()
+
+
+def get_event_stream(
+    client: Annotated[redis.Redis, Depends(get_redis)],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> EventStreamProducer:
+    return EventStreamProducer(
+        client, settings.event_stream_key, settings.event_stream_max_length
+    )
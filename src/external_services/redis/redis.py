@@ -1,6 +1,8 @@
 import redis.asyncio as redis
 
-pool = redis.ConnectionPool(host="localhost", port=6379, db=0, decode_responses=True)
+from src.config.project_settings import settings
+
+pool = redis.ConnectionPool.from_url(settings.redis_url, decode_responses=True)
 
 
 async def get_redis() -> redis.Redis:
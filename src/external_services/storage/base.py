@@ -1,9 +1,51 @@
 from abc import ABC, abstractmethod
-from typing import BinaryIO
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Sequence
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Most parts a multipart upload may consist of, the S3 limit
+MAX_PARTS = 10_000
+
+# First and last byte position, both inclusive as in the Range header
+ByteRange = tuple[int, int]
+
+
+@dataclass
+class FileInfo:
+    size: int
+    etag: str | None = None
+    last_modified: datetime | None = None
+
+
+@dataclass
+class StoredFile:
+    path: str
+    size: int
+    last_modified: datetime | None = None
+
+
+@dataclass
+class UploadLink:
+    url: str
+    # Headers the upload has to be sent with, they are covered by the signature
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class FileStream:
+    size: int
+    chunks: AsyncIterator[bytes]
 
 
 class FileStorage(ABC):
 
+    async def open(self) -> None:
+        """Acquires long-lived resources, called once on application startup."""
+
+    async def close(self) -> None:
+        """Releases the resources acquired by open."""
+
     @abstractmethod
     async def upload_file(self, payload: BinaryIO, path: str) -> None:
         raise NotImplementedError
@@ -12,10 +54,85 @@ class FileStorage(ABC):
     async def get_file(self, path: str) -> bytes | None:
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_file_info(self, path: str) -> FileInfo | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stream_file(
+        self,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        byte_range: ByteRange | None = None,
+    ) -> FileStream | None:
+        """
+        Opens the file, or only byte_range of it, for reading in chunks of at most
+        chunk_size bytes.
+        """
+        raise NotImplementedError
+
+    async def get_local_path(self, path: str) -> str | None:
+        """
+        A local copy of the file that can be sent without reading it in Python. It
+        stays in place until release_local_path is called.
+        """
+        return None
+
+    async def release_local_path(self, path: str) -> None:
+        pass
+
     @abstractmethod
     async def delete_file(self, path: str) -> None:
         raise NotImplementedError
 
+    async def delete_files(self, paths: Sequence[str]) -> list[str]:
+        """Deletes many files at once, returns the paths that could not be deleted."""
+        for path in paths:
+            await self.delete_file(path)
+        return []
+
+    @abstractmethod
+    def list_files(self) -> AsyncIterator[StoredFile]:
+        raise NotImplementedError
+
     @abstractmethod
     async def get_file_link(self, path: str) -> str:
         raise NotImplementedError
+
+    async def get_upload_link(
+        self, path: str, size: int, sha256: str
+    ) -> UploadLink | None:
+        """
+        A link the client can PUT exactly this content to, without passing it
+        through the application. None when the storage only accepts uploads here.
+        """
+        return None
+
+    async def get_file_sha256(self, path: str) -> str | None:
+        """
+        Hex SHA-256 of the stored file as the storage computed it. None when the
+        file is missing or the storage keeps no checksum of it.
+        """
+        return None
+
+    async def create_multipart_upload(self, path: str) -> str | None:
+        """
+        Starts an upload sent in numbered parts, returns its id. None when the
+        storage only takes whole files.
+        """
+        return None
+
+    async def upload_part(
+        self, path: str, upload_id: str, part_number: int, body: bytes
+    ) -> str:
+        """Stores one part, replacing an earlier one. Returns the ETag."""
+        raise NotImplementedError
+
+    async def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        """Joins the parts, given as part number and ETag, into the file at path."""
+        raise NotImplementedError
+
+    async def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        raise NotImplementedError
@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Sequence
+
+from src.external_services.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    ByteRange,
+    FileInfo,
+    FileStorage,
+    FileStream,
+    StoredFile,
+    UploadLink,
+)
+from src.services.metrics import (
+    DISK_CACHE_HIT_RATIO,
+    DISK_CACHE_REQUESTS,
+    DISK_CACHE_SIZE,
+)
+
+TEMP_SUFFIX = ".tmp"
+
+
+class DiskCachedStorage(FileStorage):
+    """
+    Keeps recently read files of another storage on local disk, evicting the least
+    recently used ones once max_size bytes are taken. Files are cached while they
+    are streamed to the first client; ranged reads of uncached files and files
+    larger than max_object_size go straight to the storage.
+
+    Files handed out by get_local_path are pinned until released, they are neither
+    evicted nor removed in the meantime.
+    """
+
+    def __init__(
+        self, storage: FileStorage, directory: str, max_size: int, max_object_size: int
+    ) -> None:
+        self.storage = storage
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.max_object_size = max_object_size
+        self.size = 0
+        # Cache file name to its size, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._pins: Counter[str] = Counter()
+        # Pinned files dropped from the index, removed once released
+        self._stale: set[str] = set()
+        self._hits = 0
+        self._misses = 0
+
+    async def open(self) -> None:
+        await self.storage.open()
+        await asyncio.to_thread(self._load_entries)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+    def _load_entries(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for file in self.directory.iterdir():
+            if file.name.endswith(TEMP_SUFFIX):
+                file.unlink(missing_ok=True)
+                continue
+            stat = file.stat()
+            files.append((stat.st_atime, file.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.size += size
+        self._evict()
+
+    async def upload_file(self, payload: BinaryIO, path: str) -> None:
+        await self.storage.upload_file(payload, path)
+        self._discard(self._name(path))
+
+    async def get_file(self, path: str) -> bytes | None:
+        file = self._lookup(path)
+        if file is not None:
+            try:
+                return await asyncio.to_thread(file.read_bytes)
+            except FileNotFoundError:
+                self._discard(file.name)
+        payload = await self.storage.get_file(path)
+        if payload is not None and len(payload) <= self.max_object_size:
+            file = self._file(path)
+            await asyncio.to_thread(self._write, file, payload)
+            self._add(file.name, len(payload))
+        return payload
+
+    async def get_file_info(self, path: str) -> FileInfo | None:
+        return await self.storage.get_file_info(path)
+
+    async def get_local_path(self, path: str) -> str | None:
+        name = self._name(path)
+        if name not in self._entries:
+            return None
+        self._entries.move_to_end(name)
+        self._count(hit=True)
+        self._pins[name] += 1
+        return str(self.directory / name)
+
+    async def release_local_path(self, path: str) -> None:
+        name = self._name(path)
+        self._pins[name] -= 1
+        if self._pins[name] > 0:
+            return
+        del self._pins[name]
+        if name in self._stale:
+            self._stale.discard(name)
+            if name not in self._entries:
+                (self.directory / name).unlink(missing_ok=True)
+        self._evict()
+
+    async def stream_file(
+        self,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        byte_range: ByteRange | None = None,
+    ) -> FileStream | None:
+        file = self._lookup(path)
+        if file is not None:
+            try:
+                # Opened right away so a later eviction can't pull the file away
+                handle = await asyncio.to_thread(file.open, "rb")
+            except FileNotFoundError:
+                self._discard(file.name)
+            else:
+                start, end = byte_range or (0, self._entries[file.name] - 1)
+                return FileStream(
+                    size=end - start + 1,
+                    chunks=self._read(handle, start, end, chunk_size),
+                )
+
+        file_stream = await self.storage.stream_file(path, chunk_size, byte_range)
+        if (
+            file_stream is None
+            or byte_range is not None
+            or file_stream.size > self.max_object_size
+        ):
+            return file_stream
+        return FileStream(
+            size=file_stream.size,
+            chunks=self._fill(self._file(path), file_stream),
+        )
+
+    async def delete_file(self, path: str) -> None:
+        await self.storage.delete_file(path)
+        self._discard(self._name(path))
+
+    async def delete_files(self, paths: Sequence[str]) -> list[str]:
+        failed = await self.storage.delete_files(paths)
+        for path in paths:
+            self._discard(self._name(path))
+        return failed
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        async for stored_file in self.storage.list_files():
+            yield stored_file
+
+    async def get_file_link(self, path: str) -> str:
+        return await self.storage.get_file_link(path)
+
+    async def get_upload_link(
+        self, path: str, size: int, sha256: str
+    ) -> UploadLink | None:
+        return await self.storage.get_upload_link(path, size, sha256)
+
+    async def get_file_sha256(self, path: str) -> str | None:
+        return await self.storage.get_file_sha256(path)
+
+    async def create_multipart_upload(self, path: str) -> str | None:
+        return await self.storage.create_multipart_upload(path)
+
+    async def upload_part(
+        self, path: str, upload_id: str, part_number: int, body: bytes
+    ) -> str:
+        return await self.storage.upload_part(path, upload_id, part_number, body)
+
+    async def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        await self.storage.complete_multipart_upload(path, upload_id, parts)
+        self._discard(self._name(path))
+
+    async def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        await self.storage.abort_multipart_upload(path, upload_id)
+
+    def _name(self, path: str) -> str:
+        return hashlib.sha256(path.encode()).hexdigest()
+
+    def _file(self, path: str) -> Path:
+        return self.directory / self._name(path)
+
+    def _lookup(self, path: str) -> Path | None:
+        name = self._name(path)
+        cached = name in self._entries
+        self._count(hit=cached)
+        if not cached:
+            return None
+        self._entries.move_to_end(name)
+        return self.directory / name
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        DISK_CACHE_REQUESTS.labels("hit" if hit else "miss").inc()
+        DISK_CACHE_HIT_RATIO.set(self._hits / (self._hits + self._misses))
+
+    async def _read(
+        self, handle: BinaryIO, start: int, end: int, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        try:
+            await asyncio.to_thread(handle.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(handle.read, min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            handle.close()
+
+    async def _fill(self, file: Path, file_stream: FileStream) -> AsyncIterator[bytes]:
+        """Passes the chunks through while writing them to the cache."""
+        temp_file = file.with_name(f"{file.name}.{uuid.uuid4().hex}{TEMP_SUFFIX}")
+        handle = await asyncio.to_thread(temp_file.open, "wb")
+        written = 0
+        try:
+            async for chunk in file_stream.chunks:
+                await asyncio.to_thread(handle.write, chunk)
+                written += len(chunk)
+                yield chunk
+            handle.close()
+            if written == file_stream.size:
+                await asyncio.to_thread(temp_file.replace, file)
+                self._add(file.name, written)
+        finally:
+            handle.close()
+            temp_file.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write(file: Path, payload: bytes) -> None:
+        temp_file = file.with_name(f"{file.name}.{uuid.uuid4().hex}{TEMP_SUFFIX}")
+        temp_file.write_bytes(payload)
+        temp_file.replace(file)
+
+    def _add(self, name: str, size: int) -> None:
+        self.size += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        self._stale.discard(name)
+        self._evict()
+
+    def _evict(self) -> None:
+        for name in list(self._entries):
+            if self.size <= self.max_size:
+                break
+            if self._pins[name]:
+                continue
+            self.size -= self._entries.pop(name)
+            (self.directory / name).unlink(missing_ok=True)
+        DISK_CACHE_SIZE.set(self.size)
+
+    def _discard(self, name: str) -> None:
+        size = self._entries.pop(name, None)
+        if size is None:
+            return
+        self.size -= size
+        if self._pins[name]:
+            self._stale.add(name)
+        else:
+            (self.directory / name).unlink(missing_ok=True)
+        DISK_CACHE_SIZE.set(self.size)
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import hmac
+import io
+import mmap
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO
+from urllib.parse import quote, urlencode
+
+from src.external_services.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    ByteRange,
+    FileInfo,
+    FileStorage,
+    FileStream,
+    StoredFile,
+)
+
+TEMP_SUFFIX = ".upload"
+
+
+def sign_path(path: str, expires: int, secret: str) -> str:
+    message = f"{path}:{expires}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(path: str, expires: int, signature: str, secret: str) -> bool:
+    return expires > time.time() and hmac.compare_digest(
+        sign_path(path, expires, secret), signature
+    )
+
+
+class LocalFileStorage(FileStorage):
+    """
+    Keeps files in a local directory, for deployments next to the cameras. Links are
+    signed with HMAC and served by the files route, which sends the file with
+    sendfile where the server supports it.
+    """
+
+    def __init__(
+        self, directory: str, base_url: str, secret: str, link_expires: int = 3600
+    ) -> None:
+        self.directory = Path(directory).resolve()
+        self.base_url = base_url
+        self.secret = secret
+        self.link_expires = link_expires
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+
+    def resolve(self, path: str) -> Path:
+        file = (self.directory / path).resolve()
+        if not file.is_relative_to(self.directory) or file == self.directory:
+            raise ValueError(f"Path {path!r} is outside of the storage directory")
+        return file
+
+    async def upload_file(self, payload: BinaryIO, path: str) -> None:
+        await asyncio.to_thread(self._write, payload, self.resolve(path))
+
+    @staticmethod
+    def _write(payload: BinaryIO, file: Path) -> None:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = file.with_name(f"{file.name}.{uuid.uuid4().hex}{TEMP_SUFFIX}")
+        try:
+            with temp_file.open("wb") as destination:
+                shutil.copyfileobj(payload, destination)
+            temp_file.replace(file)
+        finally:
+            temp_file.unlink(missing_ok=True)
+
+    async def get_file(self, path: str) -> bytes | None:
+        try:
+            return await asyncio.to_thread(self.resolve(path).read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def get_file_info(self, path: str) -> FileInfo | None:
+        try:
+            stat = await asyncio.to_thread(self.resolve(path).stat)
+        except FileNotFoundError:
+            return None
+        return FileInfo(
+            size=stat.st_size,
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            last_modified=datetime.fromtimestamp(int(stat.st_mtime), tz=UTC),
+        )
+
+    async def get_file_sha256(self, path: str) -> str | None:
+        try:
+            return await asyncio.to_thread(self._sha256, self.resolve(path))
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _sha256(file: Path) -> str:
+        with file.open("rb") as source:
+            return hashlib.file_digest(source, "sha256").hexdigest()
+
+    async def get_local_path(self, path: str) -> str | None:
+        file = self.resolve(path)
+        return str(file) if await asyncio.to_thread(file.is_file) else None
+
+    async def stream_file(
+        self,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        byte_range: ByteRange | None = None,
+    ) -> FileStream | None:
+        try:
+            handle = await asyncio.to_thread(self.resolve(path).open, "rb")
+        except FileNotFoundError:
+            return None
+        size = os.fstat(handle.fileno()).st_size
+        start, end = byte_range or (0, size - 1)
+        end = min(end, size - 1)
+        return FileStream(
+            size=max(end - start + 1, 0),
+            chunks=self._read(handle, start, end, chunk_size),
+        )
+
+    @staticmethod
+    async def _read(
+        handle: BinaryIO, start: int, end: int, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        # Ranges are sliced out of a memory map, so seeking costs no reads at all
+        try:
+            if end < start:
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(start, end + 1, chunk_size):
+                    yield await asyncio.to_thread(
+                        mapped.__getitem__,
+                        slice(offset, min(offset + chunk_size, end + 1)),
+                    )
+        finally:
+            handle.close()
+
+    async def delete_file(self, path: str) -> None:
+        await asyncio.to_thread(self.resolve(path).unlink, missing_ok=True)
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        for stored_file in await asyncio.to_thread(self._list):
+            yield stored_file
+
+    def _list(self) -> list[StoredFile]:
+        if not self.directory.is_dir():
+            return []
+        files = []
+        for file in self.directory.rglob("*"):
+            if file.name.endswith(TEMP_SUFFIX) or not file.is_file():
+                continue
+            stat = file.stat()
+            files.append(
+                StoredFile(
+                    path=file.relative_to(self.directory).as_posix(),
+                    size=stat.st_size,
+                    last_modified=datetime.fromtimestamp(stat.st_mtime, tz=UTC),
+                )
+            )
+        return files
+
+    async def create_multipart_upload(self, path: str) -> str | None:
+        self.resolve(path)
+        return uuid.uuid4().hex
+
+    def _part(self, path: str, upload_id: str, part_number: int) -> Path:
+        # Parts wait next to the file under a temp name, so they are never listed
+        file = self.resolve(path)
+        return file.with_name(f"{file.name}.{upload_id}.{part_number}{TEMP_SUFFIX}")
+
+    async def upload_part(
+        self, path: str, upload_id: str, part_number: int, body: bytes
+    ) -> str:
+        part = self._part(path, upload_id, part_number)
+        await asyncio.to_thread(self._write, io.BytesIO(body), part)
+        return f'"{hashlib.sha256(body).hexdigest()}"'
+
+    async def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        part_files = [
+            self._part(path, upload_id, part_number) for part_number, _ in sorted(parts)
+        ]
+        await asyncio.to_thread(self._join, part_files, self.resolve(path))
+
+    def _join(self, part_files: list[Path], file: Path) -> None:
+        temp_file = file.with_name(f"{file.name}.{uuid.uuid4().hex}{TEMP_SUFFIX}")
+        try:
+            with temp_file.open("wb") as destination:
+                for part in part_files:
+                    with part.open("rb") as source:
+                        shutil.copyfileobj(source, destination)
+            temp_file.replace(file)
+        finally:
+            temp_file.unlink(missing_ok=True)
+        for part in part_files:
+            part.unlink(missing_ok=True)
+
+    async def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        file = self.resolve(path)
+        parts = await asyncio.to_thread(
+            list, file.parent.glob(f"{file.name}.{upload_id}.*{TEMP_SUFFIX}")
+        )
+        for part in parts:
+            await asyncio.to_thread(part.unlink, missing_ok=True)
+
+    async def get_file_link(self, path: str) -> str:
+        expires = int(time.time()) + self.link_expires
+        query = urlencode(
+            {"expires": expires, "signature": sign_path(path, expires, self.secret)}
+        )
+        return f"{self.base_url}{quote(path)}?{query}"
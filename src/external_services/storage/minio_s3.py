@@ -1,41 +1,176 @@
-from contextlib import asynccontextmanager
-from typing import Annotated, BinaryIO
+import asyncio
+import base64
+import logging
+import math
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Sequence
 
 import aiobotocore.session
+from aiobotocore.config import AioConfig
 from botocore.exceptions import ClientError
-from fastapi import Depends
+from fastapi import Request
 
-from src.config.project_settings import Settings, get_settings
+from src.config.project_settings import Settings, settings as default_settings
 from src.consts import StorageType
-from src.external_services.storage.base import FileStorage
+from src.external_services.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    MAX_PARTS,
+    ByteRange,
+    FileInfo,
+    FileStorage,
+    FileStream,
+    StoredFile,
+    UploadLink,
+)
+from src.external_services.storage.disk_cache import DiskCachedStorage
+from src.external_services.storage.local import LocalFileStorage
+
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+# Smallest part S3 accepts in a multipart upload, except for the last one
+MIN_PART_SIZE = 5 * MIB
+# Most keys a single DeleteObjects request accepts
+DELETE_OBJECTS_MAX_KEYS = 1000
 
 
 class S3StorageClient(FileStorage):
-    def __init__(self, access_key: str, secret_key: str, url: str, bucket_name: str):
+    def __init__(
+        self,
+        access_key: str,
+        secret_key: str,
+        url: str,
+        bucket_name: str,
+        region: str = default_settings.s3_region,
+        multipart_threshold: int = default_settings.s3_multipart_threshold,
+        multipart_part_size: int = default_settings.s3_multipart_part_size,
+        multipart_concurrency: int = default_settings.s3_multipart_concurrency,
+        max_pool_connections: int = default_settings.s3_max_pool_connections,
+        keepalive_timeout: float = default_settings.s3_keepalive_timeout,
+        presign_expires: int = default_settings.s3_presign_expires,
+    ):
         self.bucket_name = bucket_name
         self.access_key = access_key
         self.secret_key = secret_key
         self.url = url
+        self.multipart_threshold = multipart_threshold
+        self.multipart_part_size = max(multipart_part_size, MIN_PART_SIZE)
+        self.multipart_concurrency = multipart_concurrency
+        self.presign_expires = presign_expires
+        self.region = region
+        # Presigned links need SigV4, only it signs the checksum header of uploads
+        self.config = AioConfig(
+            signature_version="s3v4",
+            max_pool_connections=max_pool_connections,
+            connector_args={"keepalive_timeout": keepalive_timeout},
+        )
+        self._client = None
+        self._exit_stack: AsyncExitStack | None = None
 
-    @asynccontextmanager
-    async def get_client(self):
+    def _create_client(self):
         session = aiobotocore.session.get_session()
-        async with session.create_client(
+        return session.create_client(
             "s3",
             endpoint_url=self.url,
+            region_name=self.region,
             aws_secret_access_key=self.secret_key,
             aws_access_key_id=self.access_key,
-        ) as client:
+            config=self.config,
+        )
+
+    async def open(self) -> None:
+        # Creating a client resolves credentials and starts a new connection pool,
+        # so the application keeps one for its whole lifetime
+        self._exit_stack = AsyncExitStack()
+        self._client = await self._exit_stack.enter_async_context(self._create_client())
+
+    async def close(self) -> None:
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._client = None
+        self._exit_stack = None
+
+    @asynccontextmanager
+    async def get_client(self):
+        """The shared client once opened, otherwise a client for this call only."""
+        if self._client is not None:
+            yield self._client
+            return
+        async with self._create_client() as client:
             yield client
 
     async def upload_file(self, payload: BinaryIO, path: str) -> None:
+        size = payload.seek(0, os.SEEK_END)
+        payload.seek(0)
         async with self.get_client() as client:
+            if size > self.multipart_threshold:
+                return await self._upload_multipart(client, payload, path, size)
             return await client.put_object(
                 Bucket=self.bucket_name,
                 Key=path,
                 Body=payload,
             )
 
+    async def _upload_multipart(
+        self, client, payload: BinaryIO, path: str, size: int
+    ) -> None:
+        """
+        Uploads parts concurrently while reading the payload sequentially, so at most
+        multipart_concurrency parts are held in memory. Any failure aborts the upload,
+        otherwise S3 keeps the uploaded parts around.
+        """
+        part_size = max(self.multipart_part_size, math.ceil(size / MAX_PARTS))
+        upload = await client.create_multipart_upload(Bucket=self.bucket_name, Key=path)
+        upload_id = upload["UploadId"]
+        slots = asyncio.Semaphore(self.multipart_concurrency)
+        parts = []
+
+        async def upload_part(part_number: int, body: bytes) -> None:
+            try:
+                response = await client.upload_part(
+                    Bucket=self.bucket_name,
+                    Key=path,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+                parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+            finally:
+                slots.release()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                part_number = 1
+                while True:
+                    await slots.acquire()
+                    body = await asyncio.to_thread(payload.read, part_size)
+                    if not body:
+                        slots.release()
+                        break
+                    group.create_task(upload_part(part_number, body))
+                    part_number += 1
+            await client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=path,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": sorted(parts, key=lambda part: part["PartNumber"])
+                },
+            )
+        except BaseException as e:
+            try:
+                await asyncio.shield(
+                    client.abort_multipart_upload(
+                        Bucket=self.bucket_name, Key=path, UploadId=upload_id
+                    )
+                )
+            except Exception:
+                logger.exception("Failed to abort multipart upload of %s", path)
+            if isinstance(e, BaseExceptionGroup):
+                raise e.exceptions[0] from e
+            raise
+
     async def get_file(self, path):
         async with self.get_client() as client:
             try:
@@ -45,6 +180,55 @@ class S3StorageClient(FileStorage):
                 if e.response["Error"]["Code"] == "NoSuchKey":
                     return None
 
+    async def get_file_info(self, path):
+        async with self.get_client() as client:
+            try:
+                response = await client.head_object(Bucket=self.bucket_name, Key=path)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    return None
+                raise
+        return FileInfo(
+            size=response["ContentLength"],
+            etag=response.get("ETag"),
+            last_modified=response.get("LastModified"),
+        )
+
+    async def stream_file(
+        self,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        byte_range: ByteRange | None = None,
+    ) -> FileStream | None:
+        params = {"Bucket": self.bucket_name, "Key": path}
+        if byte_range is not None:
+            params["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        # The client has to stay open until the body is consumed, so it is closed by
+        # the chunk generator rather than on return
+        stack = AsyncExitStack()
+        client = await stack.enter_async_context(self.get_client())
+        try:
+            response = await client.get_object(**params)
+        except ClientError as e:
+            await stack.aclose()
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+        except BaseException:
+            await stack.aclose()
+            raise
+
+        async def chunks():
+            async with stack:
+                body = response["Body"]
+                try:
+                    async for chunk in body.iter_chunks(chunk_size):
+                        yield chunk
+                finally:
+                    body.close()
+
+        return FileStream(size=response["ContentLength"], chunks=chunks())
+
     async def delete_file(self, path):
         async with self.get_client() as client:
             await client.delete_object(
@@ -52,21 +236,159 @@ class S3StorageClient(FileStorage):
                 Key=path,
             )
 
+    async def delete_files(self, paths: Sequence[str]) -> list[str]:
+        failed = []
+        async with self.get_client() as client:
+            for start in range(0, len(paths), DELETE_OBJECTS_MAX_KEYS):
+                keys = paths[start : start + DELETE_OBJECTS_MAX_KEYS]
+                response = await client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+                )
+                for error in response.get("Errors", []):
+                    logger.error(
+                        "Failed to delete %s: %s", error["Key"], error.get("Message")
+                    )
+                    failed.append(error["Key"])
+        return failed
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        async with self.get_client() as client:
+            paginator = client.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(Bucket=self.bucket_name):
+                for obj in page.get("Contents", []):
+                    yield StoredFile(
+                        path=obj["Key"],
+                        size=obj["Size"],
+                        last_modified=obj.get("LastModified"),
+                    )
+
     async def get_file_link(self, path):
         async with self.get_client() as client:
             return await client.generate_presigned_url(
                 ClientMethod="get_object",
                 Params={"Bucket": self.bucket_name, "Key": path},
+                ExpiresIn=self.presign_expires,
             )
 
+    async def get_upload_link(
+        self, path: str, size: int, sha256: str
+    ) -> UploadLink | None:
+        # The length and checksum headers are signed, S3 refuses a PUT without
+        # them and stores the checksum for get_file_sha256
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        async with self.get_client() as client:
+            url = await client.generate_presigned_url(
+                ClientMethod="put_object",
+                Params={
+                    "Bucket": self.bucket_name,
+                    "Key": path,
+                    "ContentLength": size,
+                    "ChecksumSHA256": checksum,
+                },
+                ExpiresIn=self.presign_expires,
+            )
+        return UploadLink(
+            url=url,
+            headers={"Content-Length": str(size), "x-amz-checksum-sha256": checksum},
+        )
+
+    async def get_file_sha256(self, path: str) -> str | None:
+        async with self.get_client() as client:
+            try:
+                response = await client.head_object(
+                    Bucket=self.bucket_name, Key=path, ChecksumMode="ENABLED"
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    return None
+                raise
+        checksum = response.get("ChecksumSHA256")
+        # Multipart uploads only have a checksum of their part checksums
+        if checksum is None or "-" in checksum:
+            return None
+        return base64.b64decode(checksum).hex()
+
+    async def create_multipart_upload(self, path: str) -> str | None:
+        async with self.get_client() as client:
+            upload = await client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=path
+            )
+        return upload["UploadId"]
+
+    async def upload_part(
+        self, path: str, upload_id: str, part_number: int, body: bytes
+    ) -> str:
+        async with self.get_client() as client:
+            response = await client.upload_part(
+                Bucket=self.bucket_name,
+                Key=path,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+        return response["ETag"]
 
-def get_file_storage(
-    settings: Annotated[Settings, Depends(get_settings)],
-) -> FileStorage:
+    async def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        async with self.get_client() as client:
+            await client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=path,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": part_number, "ETag": etag}
+                        for part_number, etag in sorted(parts)
+                    ]
+                },
+            )
+
+    async def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        async with self.get_client() as client:
+            await client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=path, UploadId=upload_id
+            )
+
+
+def create_file_storage(settings: Settings) -> FileStorage:
+    storage = _create_backend(settings)
+    if settings.disk_cache_dir is not None:
+        return DiskCachedStorage(
+            storage,
+            directory=settings.disk_cache_dir,
+            max_size=settings.disk_cache_max_size,
+            max_object_size=settings.disk_cache_max_object_size,
+        )
+    return storage
+
+
+def _create_backend(settings: Settings) -> FileStorage:
     if settings.storage_type == StorageType.S3:
         return S3StorageClient(
             access_key=settings.s3_access_key,
             secret_key=settings.s3_secret_key,
             url=settings.s3_url,
             bucket_name=settings.s3_bucket_name,
+            region=settings.s3_region,
+            multipart_threshold=settings.s3_multipart_threshold,
+            multipart_part_size=settings.s3_multipart_part_size,
+            multipart_concurrency=settings.s3_multipart_concurrency,
+            max_pool_connections=settings.s3_max_pool_connections,
+            keepalive_timeout=settings.s3_keepalive_timeout,
+            presign_expires=settings.s3_presign_expires,
         )
+    if settings.storage_type == StorageType.LOCAL:
+        if settings.local_storage_secret is None:
+            raise ValueError("LOCAL_STORAGE_SECRET is required for local storage")
+        return LocalFileStorage(
+            directory=settings.local_storage_dir,
+            base_url=settings.local_storage_url,
+            secret=settings.local_storage_secret,
+            link_expires=settings.s3_presign_expires,
+        )
+
+
+def get_file_storage(request: Request) -> FileStorage:
+    return request.app.state.file_storage
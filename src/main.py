@@ -1,15 +1,55 @@
 from contextlib import asynccontextmanager
 
+import redis.asyncio as redis
 import uvicorn
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
 
+from src.config.database import AsyncSessionLocal
+from src.config.project_settings import get_settings
+from src.consts import EventIngestion
+from src.external_services.redis.event_feed import EventFeedPublisher
+from src.external_services.redis.redis import pool
+from src.external_services.storage.minio_s3 import create_file_storage
 from src.routes.v1 import router_v1
+from src.services.event_buffer import EventWriteBuffer
+from src.services.event_feed import EventFeedHub
+from src.services.link_cache import PresignedLinkCache
 
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
+    settings = get_settings()
+    redis_client = redis.Redis(connection_pool=pool)
+    application.state.file_storage = create_file_storage(settings)
+    await application.state.file_storage.open()
+    application.state.link_cache = PresignedLinkCache(
+        ttl=settings.s3_presign_expires - settings.link_cache_margin,
+        max_entries=settings.link_cache_size,
+        local_ttl=settings.link_cache_local_ttl,
+        client=redis_client if settings.link_cache_redis else None,
+    )
+    if settings.event_ingestion == EventIngestion.BUFFER:
+        application.state.event_buffer = EventWriteBuffer(
+            session_factory=AsyncSessionLocal,
+            max_size=settings.event_buffer_max_size,
+            lanes=settings.event_lanes,
+            publisher=EventFeedPublisher(redis_client, settings.event_feed_channel),
+        )
+        application.state.event_buffer.start()
+    application.state.event_feed_hub = EventFeedHub(
+        client=redis_client,
+        channel=settings.event_feed_channel,
+        buffer_size=settings.event_feed_buffer_size,
+        heartbeat=settings.event_feed_heartbeat,
+    )
+    application.state.event_feed_hub.start()
     yield
+    await application.state.event_feed_hub.stop()
+    if settings.event_ingestion == EventIngestion.BUFFER:
+        await application.state.event_buffer.stop()
+    await redis_client.aclose()
+    await application.state.file_storage.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -3,8 +3,10 @@ __all__ = [
     "Device",
     "AnalyticsModule",
     "ModuleEvent",
+    "ModuleEventRollup",
     "AnalyticsModuleDevice",
     "DeviceFileArchive",
+    "ArchiveObject",
 ]
 
 from src.config.database import Base
@@ -13,5 +15,5 @@ from src.models.analytics_modules import (
     AnalyticsModule,
     AnalyticsModuleDevice,
 )
-from src.models.devices import Device, DeviceFileArchive
-from src.models.module_events import ModuleEvent
+from src.models.devices import ArchiveObject, Device, DeviceFileArchive
+from src.models.module_events import ModuleEvent, ModuleEventRollup
@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import func, JSON, ForeignKey, TIMESTAMP
+from sqlalchemy import BigInteger, func, JSON, ForeignKey, TIMESTAMP, Index, text
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from src.config.database import Base
@@ -42,6 +42,20 @@ class Device(Base):
 
 class DeviceFileArchive(Base):
     __tablename__ = "devices_device_file_archive"
+    __table_args__ = (
+        Index(
+            "ix_devices_device_file_archive_device_id_timestamp_start",
+            "device_id",
+            "timestamp_start",
+            "id",
+        ),
+        # Lets the longest segment of a device be found with a single index probe
+        Index(
+            "ix_devices_device_file_archive_device_id_duration",
+            "device_id",
+            text("(timestamp_end - timestamp_start)"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     device_id: Mapped[int] = mapped_column(ForeignKey("devices_device.id"))
@@ -51,3 +65,27 @@ class DeviceFileArchive(Base):
     timestamp_end: Mapped[datetime] = mapped_column(type_=TIMESTAMP(timezone=True))
 
     device: Mapped["Device"] = relationship(back_populates="archive_files")
+
+
+class ArchiveObject(Base):
+    """
+    A stored archive file, named after the hash of its content. Archives with the
+    same content share the file, ref_count counts the live ones among them.
+    """
+
+    __tablename__ = "devices_archive_object"
+    __table_args__ = (
+        # Files nobody refers to anymore, waiting for the archive GC
+        Index(
+            "ix_devices_archive_object_unreferenced",
+            "path",
+            postgresql_where=text("ref_count <= 0"),
+        ),
+    )
+
+    path: Mapped[str] = mapped_column(primary_key=True)
+    size: Mapped[int | None] = mapped_column(type_=BigInteger)
+    ref_count: Mapped[int] = mapped_column()
+    created_at: Mapped[datetime] = mapped_column(
+        type_=TIMESTAMP(timezone=True), server_default=func.now()
+    )
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, TIMESTAMP, Index, BigInteger
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.models import Base, Device, AnalyticsModule
@@ -9,10 +9,28 @@ from src.consts import EventPriority
 
 class ModuleEvent(Base):
     __tablename__ = "modules_module_event"
-    id: Mapped[int] = mapped_column(primary_key=True)
+    __table_args__ = (
+        Index(
+            "ix_modules_module_event_device_id_event_timestamp",
+            "device_id",
+            "event_timestamp",
+            "id",
+        ),
+        Index(
+            "ix_modules_module_event_module_id_event_timestamp",
+            "module_id",
+            "event_timestamp",
+            "id",
+        ),
+        {"postgresql_partition_by": "RANGE (event_timestamp)"},
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     artifact_path: Mapped[str] = mapped_column()
     description: Mapped[str] = mapped_column()
-    event_timestamp: Mapped[datetime] = mapped_column()
+    # Part of the primary key because the table is range partitioned by it
+    event_timestamp: Mapped[datetime] = mapped_column(
+        type_=TIMESTAMP(timezone=True), primary_key=True
+    )
     name: Mapped[str] = mapped_column()
     priority: Mapped[str] = mapped_column(
         default=EventPriority.MEDIUM, server_default=EventPriority.MEDIUM.value
@@ -22,3 +40,29 @@ class ModuleEvent(Base):
 
     device: Mapped["Device"] = relationship(back_populates="events")
     module: Mapped["AnalyticsModule"] = relationship(back_populates="events")
+
+
+class ModuleEventRollup(Base):
+    __tablename__ = "modules_module_event_rollup"
+    __table_args__ = (
+        Index(
+            "ix_modules_module_event_rollup_device_id_bucket_start",
+            "granularity",
+            "device_id",
+            "bucket_start",
+        ),
+        Index(
+            "ix_modules_module_event_rollup_module_id_bucket_start",
+            "granularity",
+            "module_id",
+            "bucket_start",
+        ),
+    )
+    granularity: Mapped[str] = mapped_column(primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(
+        type_=TIMESTAMP(timezone=True), primary_key=True
+    )
+    device_id: Mapped[int] = mapped_column(primary_key=True)
+    module_id: Mapped[int] = mapped_column(primary_key=True)
+    priority: Mapped[str] = mapped_column(primary_key=True)
+    event_count: Mapped[int] = mapped_column(type_=BigInteger)
@@ -1,10 +1,11 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
 from src.schemas.analytics_modules import ModuleRetrieve, ModuleCreate, ModuleUpdate
 from src.schemas.global_schemas import ErrorMessage
 from src.services.analytics_modules import ModuleService
+from src.services.pagination import PageParams, paginate
 
 router = APIRouter()
 
@@ -12,8 +13,12 @@ router = APIRouter()
 @router.get("/", response_model=list[ModuleRetrieve])
 async def modules_list(
     module_service: Annotated[ModuleService, Depends()],
+    pagination: Annotated[PageParams, Depends()],
+    request: Request,
+    response: Response,
 ):
-    return await module_service.get_list()
+    page = await module_service.get_page_cached(pagination.limit, pagination.after_id)
+    return paginate(page, request, response)
 
 
 @router.get(
@@ -25,8 +30,7 @@ async def modules_retrieve(
     module_id: int,
     module_service: Annotated[ModuleService, Depends()],
 ):
-    module = await module_service.get_by_id(module_id)
-    return module
+    return await module_service.get_cached(module_id)
 
 
 @router.post("/", response_model=ModuleRetrieve, status_code=201)
@@ -1,11 +1,14 @@
-import json
+from datetime import datetime
 from typing import Annotated
 
-import redis.asyncio as redis
-from fastapi import APIRouter, Depends
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
 
-from src.external_services.redis.redis import get_redis
+from src.config.project_settings import Settings, get_settings
+from src.external_services.storage.base import FileStorage
+from src.external_services.storage.minio_s3 import get_file_storage
 from src.schemas.analytics_modules import ModuleRetrieve
 from src.schemas.devices import (
     DeviceRetrieve,
@@ -13,18 +16,108 @@ from src.schemas.devices import (
     DeviceUpdate,
     DeviceRetrieveWithModules,
 )
+from src.schemas.file_archive import ArchiveWindow, DeviceFileArchiveRetrieve
 from src.schemas.global_schemas import ErrorMessage
 from src.services.analytics_modules import ModuleService
+from src.services.archive_clip import stream_segments
 from src.services.devices import DeviceService
+from src.services.file_archive import ArchiveService
+from src.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    PageParams,
+    decode_cursor,
+    paginate,
+)
 
 router = APIRouter()
 
 
+def archive_window(
+    from_: Annotated[datetime, Query(alias="from")], to: datetime
+) -> ArchiveWindow:
+    try:
+        return ArchiveWindow(from_=from_, to=to)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_context=False))
+
+
 @router.get("/", response_model=list[DeviceRetrieve])
 async def devices_list(
     device_service: Annotated[DeviceService, Depends()],
+    pagination: Annotated[PageParams, Depends()],
+    request: Request,
+    response: Response,
+):
+    page = await device_service.get_page_cached(pagination.limit, pagination.after_id)
+    return paginate(page, request, response)
+
+
+@router.get(
+    "/{device_id}/archive/",
+    response_model=list[DeviceFileArchiveRetrieve],
+    responses={404: {"description": "Not found", "model": ErrorMessage}},
+)
+async def device_archive_timeline(
+    device_id: int,
+    window: Annotated[ArchiveWindow, Depends(archive_window)],
+    device_service: Annotated[DeviceService, Depends()],
+    archive_service: Annotated[ArchiveService, Depends()],
+    request: Request,
+    response: Response,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Annotated[
+        str | None, Query(description="Opaque cursor from a previous page")
+    ] = None,
+):
+    await device_service.get_by_id(device_id)
+    page = await archive_service.get_timeline_page(
+        device_id, window, limit, decode_cursor(cursor) if cursor else None
+    )
+    return paginate(page, request, response)
+
+
+@router.get(
+    "/{device_id}/archive/clip/",
+    response_class=StreamingResponse,
+    responses={
+        400: {"description": "Time range too long", "model": ErrorMessage},
+        404: {"description": "Not found", "model": ErrorMessage},
+    },
+)
+async def device_archive_clip(
+    device_id: int,
+    window: Annotated[ArchiveWindow, Depends(archive_window)],
+    device_service: Annotated[DeviceService, Depends()],
+    archive_service: Annotated[ArchiveService, Depends()],
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    settings: Annotated[Settings, Depends(get_settings)],
 ):
-    return await device_service.get_list()
+    """
+    The archive files overlapping the time range sent back to back as one stream.
+    Files are sent whole, X-Clip-Start and X-Clip-End tell the span actually covered.
+    A file missing from the storage aborts the transfer, so an incomplete clip is
+    never taken for the whole span.
+    """
+    await device_service.get_by_id(device_id)
+    segments = await archive_service.get_clip_segments(
+        device_id, window, settings.archive_clip_max_segments
+    )
+    return StreamingResponse(
+        stream_segments(
+            storage,
+            [segment.filepath for segment in segments],
+            prefetch_chunks=settings.archive_clip_prefetch_chunks,
+        ),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f"attachment; filename=device_{device_id}_clip",
+            "X-Clip-Start": segments[0].timestamp_start.isoformat(),
+            "X-Clip-End": max(
+                segment.timestamp_end for segment in segments
+            ).isoformat(),
+        },
+    )
 
 
 @router.get(
@@ -63,18 +156,8 @@ async def connect_module(
 async def devices_retrieve(
     device_id: int,
     device_service: Annotated[DeviceService, Depends()],
-    redis_client: Annotated[redis.Redis, Depends(get_redis)],
 ):
-    if found_obj := await redis_client.get(f"device:{device_id}"):
-        return json.loads(found_obj)
-
-    device = await device_service.get_by_id(device_id)
-
-    await redis_client.setex(
-        f"device:{device_id}", 100, json.dumps(jsonable_encoder(device))
-    )
-
-    return device
+    return await device_service.get_cached(device_id)
 
 
 @router.post("/", response_model=DeviceRetrieve, status_code=201)
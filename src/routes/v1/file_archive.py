@@ -1,18 +1,54 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette import status
 from starlette.responses import StreamingResponse
 
+from src.config.database import get_session_factory
+from src.config.project_settings import Settings, get_settings
+from src.consts import ExportFormat
+
+from src.external_services.redis.archive_uploads import (
+    UploadSessionStore,
+    get_upload_session_store,
+)
 from src.external_services.storage.base import FileStorage
 from src.external_services.storage.minio_s3 import get_file_storage
 from src.schemas.file_archive import (
+    ArchiveDownloadLink,
+    ArchiveDownloadLinksRequest,
+    ArchiveResumableUpload,
+    ArchiveResumableUploadCreate,
+    ArchiveUploadConfirm,
+    ArchiveUploadLink,
+    ArchiveUploadRequest,
     DeviceFileArchiveRetrieve,
     DeviceFileArchiveCreate,
     DeviceFileArchiveUpdate,
 )
 from src.schemas.global_schemas import ErrorMessage
+from src.services.byte_ranges import (
+    LocalFileResponse,
+    MultipartByteranges,
+    content_range,
+    file_info_headers,
+    if_range_matches,
+    parse_range,
+)
 from src.services.devices import DeviceService
-from src.services.file_archive import ArchiveService
+from src.services.export import EXPORT_MEDIA_TYPES, stream_export
+from src.services.file_archive import ArchiveService, resumable_upload_state
+from src.services.hashed_uploads import HashedUploadFile, get_hashed_upload
+from src.services.pagination import PageParams, paginate
 
 router = APIRouter()
 
@@ -20,18 +56,84 @@ router = APIRouter()
 @router.get("/", response_model=list[DeviceFileArchiveRetrieve])
 async def archive_list(
     archive_service: Annotated[ArchiveService, Depends()],
+    pagination: Annotated[PageParams, Depends()],
+    request: Request,
+    response: Response,
+):
+    page = await archive_service.get_page_cached(pagination.limit, pagination.after_id)
+    return paginate(page, request, response)
+
+
+@router.get("/export/", response_class=StreamingResponse)
+async def archive_export(
+    session_factory: Annotated[
+        async_sessionmaker[AsyncSession], Depends(get_session_factory)
+    ],
+    device_id: int | None = None,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+):
+    file_generator = stream_export(
+        session_factory,
+        ArchiveService,
+        ArchiveService.filter_statement(device_id),
+        DeviceFileArchiveRetrieve,
+        export_format,
+    )
+    extension = export_format.value.lower()
+    return StreamingResponse(
+        file_generator,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=archive.{extension}"},
+    )
+
+
+@router.post(
+    "/download_links/",
+    response_model=dict[int, ArchiveDownloadLink],
+    responses={413: {"description": "Too many ids", "model": ErrorMessage}},
+)
+async def get_file_download_links(
+    body: ArchiveDownloadLinksRequest,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    archive_service: Annotated[ArchiveService, Depends()],
+    settings: Annotated[Settings, Depends(get_settings)],
 ):
-    return await archive_service.get_list()
+    if len(body.ids) > settings.download_links_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request exceeds {settings.download_links_max_ids} ids",
+        )
+    return await archive_service.get_download_links(
+        body.ids, storage, settings.download_links_concurrency
+    )
 
 
 @router.post(
     "/{archive_id}/upload/",
     response_model=DeviceFileArchiveRetrieve,
-    responses={404: {"description": "Not found", "model": ErrorMessage}},
+    responses={
+        400: {"description": "Malformed body", "model": ErrorMessage},
+        404: {"description": "Not found", "model": ErrorMessage},
+        415: {"description": "Not a multipart body", "model": ErrorMessage},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
 )
 async def upload_file_to_archive(
     archive_id: int,
-    file: Annotated[UploadFile, File()],
+    file: Annotated[HashedUploadFile, Depends(get_hashed_upload)],
     storage: Annotated[FileStorage, Depends(get_file_storage)],
     archive_service: Annotated[ArchiveService, Depends()],
 ):
@@ -41,27 +143,251 @@ async def upload_file_to_archive(
     )
 
 
+@router.post(
+    "/{archive_id}/upload_link/",
+    response_model=ArchiveUploadLink,
+    responses={
+        400: {"description": "No direct uploads", "model": ErrorMessage},
+        404: {"description": "Not found", "model": ErrorMessage},
+    },
+)
+async def archive_upload_link(
+    archive_id: int,
+    upload: ArchiveUploadRequest,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    archive_service: Annotated[ArchiveService, Depends()],
+):
+    """
+    Starts a direct upload. PUT the file to the returned url with the returned
+    headers, then confirm it with the returned path and the ETag of the PUT response.
+    Without url the content is stored already and is confirmed with the returned
+    etag right away.
+    """
+    # Deleted and unknown archives get a 404 before any link is handed out
+    await archive_service.get_by_id(archive_id)
+    return await archive_service.create_upload_link(upload, storage)
+
+
+@router.post(
+    "/{archive_id}/confirm_upload/",
+    response_model=DeviceFileArchiveRetrieve,
+    responses={
+        404: {"description": "Not found", "model": ErrorMessage},
+        409: {"description": "File does not match", "model": ErrorMessage},
+    },
+)
+async def archive_confirm_upload(
+    archive_id: int,
+    confirm: ArchiveUploadConfirm,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    archive_service: Annotated[ArchiveService, Depends()],
+):
+    archive_instance = await archive_service.get_by_id(archive_id)
+    return await archive_service.confirm_upload(archive_instance, confirm, storage)
+
+
+@router.post(
+    "/{archive_id}/uploads/",
+    response_model=ArchiveResumableUpload,
+    status_code=201,
+    responses={
+        400: {"description": "No uploads in chunks", "model": ErrorMessage},
+        404: {"description": "Not found", "model": ErrorMessage},
+    },
+)
+async def archive_resumable_upload_create(
+    archive_id: int,
+    create: ArchiveResumableUploadCreate,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    sessions: Annotated[UploadSessionStore, Depends(get_upload_session_store)],
+    archive_service: Annotated[ArchiveService, Depends()],
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    """
+    Starts an upload sent in chunks of chunk_size bytes, numbered from 1. After an
+    interruption the upload tells which chunks were received, only the others have
+    to be sent again.
+    """
+    archive_instance = await archive_service.get_by_id(archive_id)
+    session = await archive_service.create_resumable_upload(
+        archive_instance, create, storage, sessions, settings.archive_upload_chunk_size
+    )
+    return resumable_upload_state(session)
+
+
+@router.get(
+    "/{archive_id}/uploads/{upload_id}/",
+    response_model=ArchiveResumableUpload,
+    responses={404: {"description": "Not found", "model": ErrorMessage}},
+)
+async def archive_resumable_upload_retrieve(
+    archive_id: int,
+    upload_id: str,
+    sessions: Annotated[UploadSessionStore, Depends(get_upload_session_store)],
+    archive_service: Annotated[ArchiveService, Depends()],
+):
+    archive_instance = await archive_service.get_by_id(archive_id)
+    session = await archive_service.get_resumable_upload(
+        archive_instance, upload_id, sessions
+    )
+    return resumable_upload_state(session)
+
+
+@router.put(
+    "/{archive_id}/uploads/{upload_id}/chunks/{number}/",
+    response_model=ArchiveResumableUpload,
+    responses={
+        400: {"description": "Invalid chunk", "model": ErrorMessage},
+        404: {"description": "Not found", "model": ErrorMessage},
+        413: {"description": "Chunk too large", "model": ErrorMessage},
+    },
+)
+async def archive_resumable_upload_chunk(
+    archive_id: int,
+    upload_id: str,
+    number: int,
+    request: Request,
+    sha256: Annotated[str, Header(alias="X-Chunk-SHA256")],
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    sessions: Annotated[UploadSessionStore, Depends(get_upload_session_store)],
+    archive_service: Annotated[ArchiveService, Depends()],
+):
+    """Takes the raw bytes of a chunk, X-Chunk-SHA256 is the hex SHA-256 of them."""
+    archive_instance = await archive_service.get_by_id(archive_id)
+    session = await archive_service.get_resumable_upload(
+        archive_instance, upload_id, sessions
+    )
+    body = bytearray()
+    async for data in request.stream():
+        body += data
+        if len(body) > session.chunk_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Chunks are at most {session.chunk_size} bytes",
+            )
+    session = await archive_service.upload_chunk(
+        session, number, bytes(body), sha256, storage, sessions
+    )
+    return resumable_upload_state(session)
+
+
+@router.post(
+    "/{archive_id}/uploads/{upload_id}/complete/",
+    response_model=DeviceFileArchiveRetrieve,
+    responses={
+        404: {"description": "Not found", "model": ErrorMessage},
+        409: {"description": "Chunks missing", "model": ErrorMessage},
+    },
+)
+async def archive_resumable_upload_complete(
+    archive_id: int,
+    upload_id: str,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    sessions: Annotated[UploadSessionStore, Depends(get_upload_session_store)],
+    archive_service: Annotated[ArchiveService, Depends()],
+):
+    archive_instance = await archive_service.get_by_id(archive_id)
+    session = await archive_service.get_resumable_upload(
+        archive_instance, upload_id, sessions
+    )
+    return await archive_service.complete_resumable_upload(
+        session, archive_instance, storage, sessions
+    )
+
+
+@router.delete(
+    "/{archive_id}/uploads/{upload_id}/",
+    response_model=None,
+    status_code=204,
+    responses={404: {"description": "Not found", "model": ErrorMessage}},
+)
+async def archive_resumable_upload_abort(
+    archive_id: int,
+    upload_id: str,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    sessions: Annotated[UploadSessionStore, Depends(get_upload_session_store)],
+    archive_service: Annotated[ArchiveService, Depends()],
+) -> None:
+    archive_instance = await archive_service.get_by_id(archive_id)
+    session = await archive_service.get_resumable_upload(
+        archive_instance, upload_id, sessions
+    )
+    await archive_service.abort_resumable_upload(session, storage, sessions)
+
+
 @router.get(
     "/{archive_id}/download_file/",
     responses={
+        206: {"description": "Requested byte ranges"},
         404: {"description": "Not found", "model": ErrorMessage},
         400: {"description": "No File", "model": ErrorMessage},
+        416: {"description": "Range not satisfiable", "model": ErrorMessage},
     },
 )
 async def download_file(
     archive_id: int,
+    request: Request,
     storage: Annotated[FileStorage, Depends(get_file_storage)],
     archive_service: Annotated[ArchiveService, Depends()],
 ):
     archive_instance = await archive_service.get_by_id(archive_id)
+    headers = {
+        "Content-Disposition": f"attachment; filename={archive_instance.filepath}"
+    }
+    if archive_instance.filepath is not None:
+        local_path = await storage.get_local_path(archive_instance.filepath)
+        if local_path is not None:
+            # Sent with sendfile where the server supports it, ranges included
+            return LocalFileResponse(
+                storage,
+                archive_instance.filepath,
+                local_path,
+                media_type="application/octet-stream",
+                headers=headers,
+            )
+
+    ranges = None
+    if "range" in request.headers:
+        file_info = await archive_service.get_file_info(archive_instance, storage)
+        headers.update(file_info_headers(file_info))
+        if if_range_matches(request.headers.get("if-range"), file_info):
+            ranges = parse_range(request.headers["range"], file_info.size)
+    else:
+        headers["Accept-Ranges"] = "bytes"
+
+    if ranges is None:
+        file_stream = await archive_service.download_file(archive_instance, storage)
+        headers["Content-Length"] = str(file_stream.size)
+        return StreamingResponse(
+            file_stream.chunks, media_type="application/octet-stream", headers=headers
+        )
+
+    if len(ranges) == 1:
+        file_stream = await archive_service.download_file(
+            archive_instance, storage, ranges[0]
+        )
+        headers["Content-Range"] = content_range(ranges[0], file_info.size)
+        headers["Content-Length"] = str(file_stream.size)
+        return StreamingResponse(
+            file_stream.chunks,
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type="application/octet-stream",
+            headers=headers,
+        )
 
-    file_generator = await archive_service.download_file(archive_instance, storage)
+    body = MultipartByteranges(
+        storage,
+        archive_instance.filepath,
+        ranges,
+        file_info.size,
+        content_type="application/octet-stream",
+    )
+    headers["Content-Length"] = str(body.content_length)
     return StreamingResponse(
-        file_generator,
-        media_type="application/octet-stream",
-        headers={
-            "Content-Disposition": f"attachment; filename={archive_instance.filepath}"
-        },
+        body,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=body.media_type,
+        headers=headers,
     )
 
 
@@ -91,8 +417,7 @@ async def archive_retrieve(
     archive_id: int,
     archive_service: Annotated[ArchiveService, Depends()],
 ):
-    archive_instance = await archive_service.get_by_id(archive_id)
-    return archive_instance
+    return await archive_service.get_cached(archive_id)
 
 
 @router.post("/", response_model=DeviceFileArchiveRetrieve, status_code=201)
@@ -0,0 +1,54 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+from starlette.responses import FileResponse, StreamingResponse
+
+from src.config.project_settings import Settings, get_settings
+from src.external_services.storage.base import FileStorage
+from src.external_services.storage.local import verify_signature
+from src.external_services.storage.minio_s3 import get_file_storage
+from src.schemas.global_schemas import ErrorMessage
+from src.services.byte_ranges import LocalFileResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/{path:path}",
+    response_class=FileResponse,
+    responses={
+        403: {"description": "Invalid or expired link", "model": ErrorMessage},
+        404: {"description": "Not found", "model": ErrorMessage},
+    },
+)
+async def files_retrieve(
+    path: str,
+    expires: int,
+    signature: str,
+    storage: Annotated[FileStorage, Depends(get_file_storage)],
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    """Serves signed links of the local storage backend."""
+    if settings.local_storage_secret is None or not verify_signature(
+        path, expires, signature, settings.local_storage_secret
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired link"
+        )
+
+    local_path = await storage.get_local_path(path)
+    if local_path is not None:
+        return LocalFileResponse(
+            storage, path, local_path, media_type="application/octet-stream"
+        )
+    file_stream = await storage.stream_file(path)
+    if file_stream is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File not found in storage"
+        )
+    return StreamingResponse(
+        file_stream.chunks,
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(file_stream.size)},
+    )
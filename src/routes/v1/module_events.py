@@ -0,0 +1,245 @@
+import json
+from datetime import datetime
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette import status
+from starlette.responses import StreamingResponse
+
+from src.config.database import get_session_factory
+from src.config.project_settings import Settings, get_settings
+from src.consts import EventPriority, ExportFormat, RollupGranularity, EventIngestion
+from src.external_services.redis.event_stream import (
+    EventStreamProducer,
+    get_event_stream,
+)
+from src.schemas.global_schemas import ErrorMessage
+from src.schemas.module_events import (
+    EventBulkError,
+    EventBulkResult,
+    EventCreate,
+    EventFilter,
+    EventRetrieve,
+    EventRollupRetrieve,
+)
+from src.services.event_buffer import get_event_buffer
+from src.services.event_feed import EventFeedHub, get_event_feed_hub
+from src.services.export import EXPORT_MEDIA_TYPES, NDJSON_MEDIA_TYPE, stream_export
+from src.services.module_events import EventService
+from src.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    paginate,
+)
+
+router = APIRouter()
+
+
+async def _read_bulk_rows(request: Request) -> list[Any]:
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        return [line for line in body.splitlines() if line.strip()]
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body is not valid JSON",
+        )
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body must be a JSON array of events",
+        )
+    return rows
+
+
+def event_filter(
+    device_id: int | None = None,
+    module_id: int | None = None,
+    priority: EventPriority | None = None,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+) -> EventFilter:
+    try:
+        return EventFilter(
+            device_id=device_id,
+            module_id=module_id,
+            priority=priority,
+            from_=from_,
+            to=to,
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_context=False))
+
+
+@router.get("/", response_model=list[EventRetrieve])
+async def events_list(
+    filters: Annotated[EventFilter, Depends(event_filter)],
+    event_service: Annotated[EventService, Depends()],
+    request: Request,
+    response: Response,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Annotated[
+        str | None, Query(description="Opaque cursor from a previous page")
+    ] = None,
+):
+    page = await event_service.get_filtered_page(
+        filters, limit, decode_cursor(cursor) if cursor else None
+    )
+    return paginate(page, request, response)
+
+
+@router.get("/rollups/", response_model=list[EventRollupRetrieve])
+async def events_rollups(
+    filters: Annotated[EventFilter, Depends(event_filter)],
+    event_service: Annotated[EventService, Depends()],
+    granularity: RollupGranularity = RollupGranularity.MINUTE,
+):
+    return await event_service.get_rollups(filters, granularity)
+
+
+@router.get("/live/", response_class=StreamingResponse)
+async def events_live(
+    hub: Annotated[EventFeedHub, Depends(get_event_feed_hub)],
+    device_id: int | None = None,
+    module_id: int | None = None,
+    priority: EventPriority | None = None,
+):
+    subscription = hub.subscribe(
+        EventFilter(device_id=device_id, module_id=module_id, priority=priority)
+    )
+    return StreamingResponse(
+        hub.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export/", response_class=StreamingResponse)
+async def events_export(
+    filters: Annotated[EventFilter, Depends(event_filter)],
+    session_factory: Annotated[
+        async_sessionmaker[AsyncSession], Depends(get_session_factory)
+    ],
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+):
+    file_generator = stream_export(
+        session_factory,
+        EventService,
+        EventService.filter_statement(filters),
+        EventRetrieve,
+        export_format,
+    )
+    extension = export_format.value.lower()
+    return StreamingResponse(
+        file_generator,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=events.{extension}"},
+    )
+
+
+@router.post(
+    "/",
+    response_model=None,
+    status_code=202,
+    responses={
+        429: {"description": "Ingestion buffer is full", "model": ErrorMessage},
+        503: {"description": "Shutting down", "model": ErrorMessage},
+    },
+)
+async def events_create(
+    event: EventCreate,
+    request: Request,
+    settings: Annotated[Settings, Depends(get_settings)],
+    event_stream: Annotated[EventStreamProducer, Depends(get_event_stream)],
+) -> None:
+    """
+    Queues the event for writing. With the in-memory buffer an accepted event is
+    lost if the process dies before its lane is flushed, or if the database stays
+    unreachable through all flush attempts, about 1.5 seconds. The stream ingestion
+    keeps it in Redis until it is committed.
+    """
+    if settings.event_ingestion == EventIngestion.STREAM:
+        await event_stream.publish([event])
+    else:
+        get_event_buffer(request).submit(event)
+
+
+@router.post(
+    "/bulk/",
+    response_model=EventBulkResult,
+    status_code=201,
+    responses={
+        202: {"description": "Queued for writing", "model": EventBulkResult},
+        400: {"description": "Malformed body", "model": ErrorMessage},
+        413: {"description": "Batch too large", "model": ErrorMessage},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/EventCreate"},
+                    }
+                },
+                NDJSON_MEDIA_TYPE: {
+                    "schema": {"$ref": "#/components/schemas/EventCreate"}
+                },
+            },
+        }
+    },
+)
+async def events_bulk_create(
+    request: Request,
+    response: Response,
+    event_service: Annotated[EventService, Depends()],
+    event_stream: Annotated[EventStreamProducer, Depends(get_event_stream)],
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    rows = await _read_bulk_rows(request)
+    if len(rows) > settings.event_bulk_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.event_bulk_max_size} events",
+        )
+
+    events: list[EventCreate] = []
+    positions: list[int] = []
+    errors: list[EventBulkError] = []
+    for index, row in enumerate(rows):
+        try:
+            if isinstance(row, bytes):
+                events.append(EventCreate.model_validate_json(row))
+            else:
+                events.append(EventCreate.model_validate(row))
+        except ValidationError as e:
+            errors.append(
+                EventBulkError(
+                    index=index,
+                    errors=e.errors(
+                        include_url=False, include_context=False, include_input=False
+                    ),
+                )
+            )
+            continue
+        positions.append(index)
+
+    if settings.event_ingestion == EventIngestion.STREAM:
+        # Device and module references are checked by the stream worker
+        if events:
+            await event_stream.publish(events)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return EventBulkResult(created=0, queued=len(events), errors=errors)
+
+    result = await event_service.bulk_create(events)
+    for error in result.errors:
+        error.index = positions[error.index]
+    result.errors = sorted(errors + result.errors, key=lambda error: error.index)
+    return result
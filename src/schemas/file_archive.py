@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from src.schemas.global_schemas import as_utc
 
 
 class DeviceFileArchiveBase(BaseModel):
@@ -22,3 +24,61 @@ class DeviceFileArchiveCreate(DeviceFileArchiveBase):
 class DeviceFileArchiveUpdate(DeviceFileArchiveBase):
     timestamp_start: datetime | None = None
     timestamp_end: datetime | None = None
+
+
+class ArchiveWindow(BaseModel):
+    from_: datetime = Field(alias="from")
+    to: datetime
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    @model_validator(mode="after")
+    def check_time_window(self) -> "ArchiveWindow":
+        if as_utc(self.from_) >= as_utc(self.to):
+            raise ValueError("'from' must be earlier than 'to'")
+        return self
+
+
+class ArchiveDownloadLinksRequest(BaseModel):
+    ids: list[int] = Field(min_length=1)
+
+
+class ArchiveDownloadLink(BaseModel):
+    link: str | None = None
+    error: str | None = None
+
+
+class ArchiveUploadRequest(BaseModel):
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+    size: int = Field(ge=0)
+    filename: str = ""
+
+
+class ArchiveUploadLink(BaseModel):
+    path: str
+    # None when the file is stored already and only has to be confirmed
+    url: str | None = None
+    # To be sent with the PUT, the link is only valid with them
+    headers: dict[str, str] = {}
+    # ETag to confirm a file that is stored already with
+    etag: str | None = None
+
+
+class ArchiveUploadConfirm(BaseModel):
+    path: str = Field(pattern=r"^[0-9a-f]{64}(\.[0-9a-z]+)?$")
+    size: int = Field(ge=0)
+    etag: str
+
+
+class ArchiveResumableUploadCreate(BaseModel):
+    size: int = Field(gt=0)
+    filename: str = ""
+
+
+class ArchiveResumableUpload(BaseModel):
+    upload_id: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    received: list[int]
+    received_bytes: int
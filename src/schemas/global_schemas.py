@@ -1,5 +1,14 @@
+from datetime import datetime, UTC
+
 from pydantic import BaseModel
 
 
+def as_utc(moment: datetime) -> datetime:
+    """Naive datetimes are taken as UTC, as the database does."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=UTC)
+    return moment
+
+
 class ErrorMessage(BaseModel):
     detail: str
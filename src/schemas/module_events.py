@@ -1,8 +1,10 @@
 from datetime import datetime
+from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
-from src.consts import EventPriority
+from src.consts import EventPriority, RollupGranularity
+from src.schemas.global_schemas import as_utc
 
 
 class EventBase(BaseModel):
@@ -14,6 +16,8 @@ class EventBase(BaseModel):
     device_id: int
     module_id: int
 
+    model_config = ConfigDict(use_enum_values=True)
+
 
 class EventCreate(EventBase): ...
 
@@ -29,3 +33,45 @@ class EventUpdate(EventBase):
     priority: EventPriority | None = None
     device_id: int | None = None
     module_id: int | None = None
+
+
+class EventFilter(BaseModel):
+    device_id: int | None = None
+    module_id: int | None = None
+    priority: EventPriority | None = None
+    from_: datetime | None = Field(default=None, alias="from")
+    to: datetime | None = None
+
+    model_config = ConfigDict(use_enum_values=True, populate_by_name=True)
+
+    @model_validator(mode="after")
+    def check_time_window(self) -> "EventFilter":
+        if (
+            self.from_ is not None
+            and self.to is not None
+            and as_utc(self.from_) >= as_utc(self.to)
+        ):
+            raise ValueError("'from' must be earlier than 'to'")
+        return self
+
+
+class EventRollupRetrieve(BaseModel):
+    granularity: RollupGranularity
+    bucket_start: datetime
+    device_id: int
+    module_id: int
+    priority: EventPriority
+    event_count: int
+
+    model_config = ConfigDict(use_enum_values=True)
+
+
+class EventBulkError(BaseModel):
+    index: int
+    errors: list[dict[str, Any]]
+
+
+class EventBulkResult(BaseModel):
+    created: int
+    queued: int = 0
+    errors: list[EventBulkError]
@@ -5,11 +5,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config.database import get_db_session
 from src.models import AnalyticsModule
+from src.schemas.analytics_modules import ModuleRetrieve
 from src.services.base import BaseService
+from src.services.entity_cache import EntityCache, get_entity_cache
 
 
 class ModuleService(BaseService[AnalyticsModule]):
+    cache_schema = ModuleRetrieve
+
     def __init__(
-        self, session: Annotated[AsyncSession, Depends(get_db_session)]
+        self,
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        cache: Annotated[EntityCache | None, Depends(get_entity_cache)] = None,
     ) -> None:
-        super().__init__(AnalyticsModule, session)
+        super().__init__(AnalyticsModule, session, cache)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from contextlib import aclosing, suppress
+from typing import AsyncIterator, Sequence
+
+from src.external_services.storage.base import DEFAULT_CHUNK_SIZE, FileStorage
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+async def stream_segments(
+    storage: FileStorage,
+    paths: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    prefetch_chunks: int = 8,
+) -> AsyncIterator[bytes]:
+    """
+    The files one after another as a single stream.
+
+    A background task reads ahead into a queue of prefetch_chunks chunks, so the
+    next file is already being opened and read while the end of the previous one
+    is still sent, and at most that many chunks are held in memory. A file missing
+    from the storage ends the stream with FileNotFoundError, rather than leaving a
+    gap in it.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch_chunks)
+
+    async def read_ahead() -> None:
+        try:
+            for path in paths:
+                file_stream = await storage.stream_file(path, chunk_size)
+                if file_stream is None:
+                    logger.error("Archive file %s of a clip is missing", path)
+                    raise FileNotFoundError(path)
+                async with aclosing(file_stream.chunks) as chunks:
+                    async for chunk in chunks:
+                        await queue.put(chunk)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_END)
+
+    reader = asyncio.create_task(read_ahead())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        reader.cancel()
+        with suppress(asyncio.CancelledError):
+            await reader
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import Select, delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.external_services.storage.base import FileStorage
+from src.models import ArchiveObject, DeviceFileArchive
+
+logger = logging.getLogger(__name__)
+
+# Files handed to the storage per call, the most S3 DeleteObjects accepts
+DELETE_BATCH_SIZE = 1000
+
+
+@dataclass
+class ArchiveGcStats:
+    deleted_rows: int = 0
+    deleted_files: int = 0
+    failed_files: int = 0
+
+
+class ArchiveGarbageCollector:
+    """
+    Removes the rows of deleted archives, files no live archive refers to anymore,
+    and files that were never recorded as archive objects at all. Rows and files
+    are handled in pages of batch_size, deletions are paced to
+    max_deletes_per_second files.
+
+    Uploads record their file before storing it, orphans younger than
+    orphan_min_age are still left alone in case one is in flight elsewhere. With
+    dry_run nothing is deleted, the stats tell what would have been.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        batch_size: int = 1000,
+        max_deletes_per_second: float | None = None,
+        orphan_min_age: timedelta = timedelta(days=1),
+        dry_run: bool = False,
+    ) -> None:
+        self.session_factory = session_factory
+        self.storage = storage
+        self.batch_size = batch_size
+        self.max_deletes_per_second = max_deletes_per_second
+        self.orphan_min_age = orphan_min_age
+        self.dry_run = dry_run
+        self._next_delete_at = 0.0
+
+    async def collect_deleted(self) -> ArchiveGcStats:
+        """Removes deleted archive rows, then the files without references."""
+        stats = ArchiveGcStats()
+        after_id = 0
+        while True:
+            async with self.session_factory() as session:
+                result = await session.scalars(
+                    Select(DeviceFileArchive.id)
+                    .where(
+                        DeviceFileArchive.is_deleted.is_(True),
+                        DeviceFileArchive.id > after_id,
+                    )
+                    .order_by(DeviceFileArchive.id)
+                    .limit(self.batch_size)
+                )
+                ids = result.all()
+                if not ids:
+                    break
+                after_id = ids[-1]
+                stats.deleted_rows += len(ids)
+                if self.dry_run:
+                    continue
+                # Their references were released when they were deleted
+                await session.execute(
+                    delete(DeviceFileArchive).where(DeviceFileArchive.id.in_(ids))
+                )
+                await session.commit()
+
+        after_path = ""
+        while True:
+            async with self.session_factory() as session:
+                # The rows stay locked until their files are gone, an upload of the
+                # same content waits and then stores the file anew
+                result = await session.scalars(
+                    Select(ArchiveObject.path)
+                    .where(
+                        ArchiveObject.ref_count <= 0, ArchiveObject.path > after_path
+                    )
+                    .order_by(ArchiveObject.path)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                paths = result.all()
+                if not paths:
+                    return stats
+                after_path = paths[-1]
+                failed = await self._delete_files(paths, stats)
+                if self.dry_run:
+                    continue
+                await session.execute(
+                    delete(ArchiveObject).where(
+                        ArchiveObject.path.in_(set(paths) - failed)
+                    )
+                )
+                await session.commit()
+
+    async def collect_orphans(self) -> ArchiveGcStats:
+        stats = ArchiveGcStats()
+        cutoff = datetime.now(tz=UTC) - self.orphan_min_age
+        page = []
+        async for stored_file in self.storage.list_files():
+            if stored_file.last_modified is None or stored_file.last_modified > cutoff:
+                continue
+            page.append(stored_file.path)
+            if len(page) >= self.batch_size:
+                await self._collect_orphan_page(page, stats)
+                page = []
+        if page:
+            await self._collect_orphan_page(page, stats)
+        return stats
+
+    async def _collect_orphan_page(
+        self, paths: list[str], stats: ArchiveGcStats
+    ) -> None:
+        async with self.session_factory() as session:
+            result = await session.scalars(
+                Select(ArchiveObject.path).where(ArchiveObject.path.in_(paths))
+            )
+            known = set(result.all())
+        await self._delete_files([path for path in paths if path not in known], stats)
+
+    async def _delete_files(self, paths: list[str], stats: ArchiveGcStats) -> set[str]:
+        failed = set()
+        for start in range(0, len(paths), DELETE_BATCH_SIZE):
+            batch = paths[start : start + DELETE_BATCH_SIZE]
+            if self.dry_run:
+                stats.deleted_files += len(batch)
+                continue
+            await self._throttle(len(batch))
+            batch_failed = await self.storage.delete_files(batch)
+            failed.update(batch_failed)
+            stats.deleted_files += len(batch) - len(batch_failed)
+            stats.failed_files += len(batch_failed)
+        return failed
+
+    async def _throttle(self, count: int) -> None:
+        if self.max_deletes_per_second is None:
+            return
+        now = time.monotonic()
+        delay = self._next_delete_at - now
+        self._next_delete_at = max(self._next_delete_at, now) + (
+            count / self.max_deletes_per_second
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
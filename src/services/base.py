@@ -1,31 +1,75 @@
-from typing import Sequence, TypeVar, Generic, Type
+from typing import Any, AsyncIterator, Sequence, TypeVar, Generic, Type
 
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from starlette.exceptions import HTTPException
 
+from src.services.entity_cache import EntityCache
+from src.services.pagination import Page, encode_cursor
+
 ModelType = TypeVar("ModelType", bound=DeclarativeBase)
 PydanticModelType = TypeVar("PydanticModelType", bound=BaseModel)
 
 
 class BaseService(Generic[ModelType]):
+    # Schema entities are cached as, services without one are never cached
+    cache_schema: Type[BaseModel] | None = None
+
     def __init__(
         self,
         model: Type[ModelType],
         session: AsyncSession,
+        cache: EntityCache | None = None,
     ) -> None:
         self.session: AsyncSession = session
         self.model: Type[ModelType] = model
+        self.cache: EntityCache | None = None
+        if (
+            cache is not None
+            and self.cache_schema is not None
+            and cache.enabled(model.__name__)
+        ):
+            self.cache = cache
+
+    def base_statement(self) -> Select:
+        """Rows the service works with, narrowed down by subclasses."""
+        return Select(self.model)
 
     async def get_list(self) -> Sequence[ModelType]:
-        stmt = Select(self.model).order_by(self.model.id)
+        stmt = self.base_statement().order_by(self.model.id)
         result = await self.session.scalars(stmt)
         return result.all()
 
+    async def get_page(
+        self, limit: int, after_id: int | None = None
+    ) -> Page[ModelType]:
+        stmt = self.base_statement().order_by(self.model.id).limit(limit + 1)
+        if after_id is not None:
+            stmt = stmt.where(self.model.id > after_id)
+        result = await self.session.scalars(stmt)
+        items = result.all()
+        if len(items) <= limit:
+            return Page(items=items)
+        items = items[:limit]
+        return Page(items=items, next_cursor=encode_cursor({"id": items[-1].id}))
+
+    async def stream_list(
+        self, stmt: Select | None = None, batch_size: int = 1000
+    ) -> AsyncIterator[ModelType]:
+        """Iterates over a server-side cursor, holding at most batch_size rows."""
+        if stmt is None:
+            stmt = self.base_statement().order_by(self.model.id)
+        result = await self.session.stream_scalars(
+            stmt.execution_options(yield_per=batch_size)
+        )
+        async for obj in result:
+            yield obj
+
     async def get_by_id(self, obj_id: int) -> ModelType:
-        stmt = Select(self.model).where(self.model.id == obj_id)
+        stmt = self.base_statement().where(self.model.id == obj_id)
         result = await self.session.scalar(stmt)
         if result is None:
             raise HTTPException(
@@ -34,10 +78,60 @@ class BaseService(Generic[ModelType]):
             )
         return result
 
+    async def get_cached(self, obj_id: int) -> ModelType | dict[str, Any]:
+        """
+        get_by_id for responses, read through the entity cache. A cache hit is the
+        serialized cache_schema, so the result must not be changed or stored.
+        """
+        if self.cache is None:
+            return await self.get_by_id(obj_id)
+        version, cached = await self.cache.get_entity(self.model.__name__, obj_id)
+        if cached is not None:
+            return cached
+        db_obj = await self.get_by_id(obj_id)
+        await self.cache.set_entity(
+            self.model.__name__, obj_id, version, self._serialize(db_obj)
+        )
+        return db_obj
+
+    async def get_page_cached(
+        self, limit: int, after_id: int | None = None
+    ) -> Page[ModelType | dict[str, Any]]:
+        """get_page for responses, read through the entity cache like get_cached."""
+        if self.cache is None:
+            return await self.get_page(limit, after_id)
+        version, cached = await self.cache.get_page(
+            self.model.__name__, limit, after_id
+        )
+        if cached is not None:
+            return Page(items=cached["items"], next_cursor=cached["next_cursor"])
+        page = await self.get_page(limit, after_id)
+        await self.cache.set_page(
+            self.model.__name__,
+            limit,
+            after_id,
+            version,
+            {
+                "items": [self._serialize(db_obj) for db_obj in page.items],
+                "next_cursor": page.next_cursor,
+            },
+        )
+        return page
+
+    def _serialize(self, db_obj: ModelType) -> dict[str, Any]:
+        return jsonable_encoder(
+            self.cache_schema.model_validate(db_obj, from_attributes=True)
+        )
+
+    async def invalidate_cache(self, obj_id: int | None = None) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate(self.model.__name__, obj_id)
+
     async def create(self, obj_in: PydanticModelType) -> ModelType:
         db_obj: ModelType = self.model(**obj_in.model_dump())
         self.session.add(db_obj)
         await self.session.commit()
+        await self.invalidate_cache()
         return db_obj
 
     async def update(self, obj_id: int, obj_in: PydanticModelType) -> ModelType:
@@ -56,9 +150,11 @@ class BaseService(Generic[ModelType]):
         ).items():
             setattr(db_obj, k, v)
         await self.session.commit()
+        await self.invalidate_cache(obj_id)
         return db_obj
 
     async def delete(self, obj_id: int) -> None:
         db_obj: ModelType = await self.get_by_id(obj_id)
         await self.session.delete(db_obj)
         await self.session.commit()
+        await self.invalidate_cache(obj_id)
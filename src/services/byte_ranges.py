@@ -0,0 +1,165 @@
+import logging
+import uuid
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from starlette import status
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from src.external_services.storage.base import ByteRange, FileInfo, FileStorage
+
+logger = logging.getLogger(__name__)
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 16
+
+
+def file_info_headers(info: FileInfo) -> dict[str, str]:
+    headers = {"Accept-Ranges": "bytes"}
+    if info.etag is not None:
+        headers["ETag"] = info.etag
+    if info.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(info.last_modified, usegmt=True)
+    return headers
+
+
+def if_range_matches(if_range: str | None, info: FileInfo) -> bool:
+    """Whether a Range request may be served, a stale validator means the full file."""
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # If-Range requires the strong comparison, weak tags never match
+        return not if_range.startswith("W/") and if_range == info.etag
+    if info.last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(if_range) == info.last_modified.replace(
+            microsecond=0
+        )
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(header: str | None, size: int) -> list[ByteRange] | None:
+    """
+    Satisfiable ranges of a ``Range: bytes=`` header, clamped to the file size.
+    None means the header is absent or malformed and the whole file is sent.
+    """
+    if header is None:
+        return None
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if not first:
+                suffix_length = int(last)
+                if suffix_length > 0 and size > 0:
+                    ranges.append((max(size - suffix_length, 0), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if end is None:
+            end = size - 1
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return ranges
+
+
+def content_range(byte_range: ByteRange, size: int) -> str:
+    return f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+
+
+class MultipartByteranges:
+    """
+    multipart/byteranges body, every part is fetched with its own ranged read. A file
+    deleted mid-response ends the body with FileNotFoundError, rather than sending
+    less than content_length promised.
+    """
+
+    def __init__(
+        self,
+        storage: FileStorage,
+        path: str,
+        ranges: list[ByteRange],
+        size: int,
+        content_type: str,
+    ) -> None:
+        self.storage = storage
+        self.path = path
+        self.ranges = ranges
+        self.boundary = uuid.uuid4().hex
+        self.media_type = f"multipart/byteranges; boundary={self.boundary}"
+        self._part_headers = [
+            (
+                f"--{self.boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: {content_range(byte_range, size)}\r\n\r\n"
+            ).encode()
+            for byte_range in ranges
+        ]
+        self._closing = f"--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_length(self) -> int:
+        parts = sum(
+            len(header) + end - start + 1 + 2
+            for header, (start, end) in zip(self._part_headers, self.ranges)
+        )
+        return parts + len(self._closing)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for header, byte_range in zip(self._part_headers, self.ranges):
+            yield header
+            file_stream = await self.storage.stream_file(
+                self.path, byte_range=byte_range
+            )
+            if file_stream is None:
+                logger.error(
+                    "File %s was deleted while its ranges were sent", self.path
+                )
+                raise FileNotFoundError(self.path)
+            async for chunk in file_stream.chunks:
+                yield chunk
+            yield b"\r\n"
+        yield self._closing
+
+
+class LocalFileResponse(FileResponse):
+    """
+    Sends the local copy of a stored file and releases it afterwards, also when the
+    client went away halfway.
+    """
+
+    def __init__(
+        self, storage: FileStorage, path: str, local_path: str, **kwargs
+    ) -> None:
+        super().__init__(local_path, **kwargs)
+        self.storage = storage
+        self.storage_path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.storage.release_local_path(self.storage_path)
@@ -8,14 +8,20 @@ from starlette import status
 
 from src.config.database import get_db_session
 from src.models import Device, AnalyticsModule, AnalyticsModuleDevice
+from src.schemas.devices import DeviceRetrieve
 from src.services.base import BaseService
+from src.services.entity_cache import EntityCache, get_entity_cache
 
 
 class DeviceService(BaseService[Device]):
+    cache_schema = DeviceRetrieve
+
     def __init__(
-        self, session: Annotated[AsyncSession, Depends(get_db_session)]
+        self,
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        cache: Annotated[EntityCache | None, Depends(get_entity_cache)] = None,
     ) -> None:
-        super().__init__(Device, session)
+        super().__init__(Device, session, cache)
 
     async def get_connected_modules(self, device: Device) -> Sequence[AnalyticsModule]:
         stmt = (
@@ -48,6 +54,9 @@ class DeviceService(BaseService[Device]):
         connection = AnalyticsModuleDevice(device=device, module=module)
         self.session.add(connection)
         await self.session.commit()
+        await self.invalidate_cache(device.id)
+        if self.cache is not None:
+            await self.cache.invalidate(AnalyticsModule.__name__, module.id)
         return await self.session.scalar(
             Select(Device)
             .options(selectinload(Device.connected_modules))
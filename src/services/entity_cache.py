@@ -0,0 +1,115 @@
+import json
+import logging
+from typing import Annotated, Any
+
+import redis.asyncio as redis
+from fastapi import Depends
+from redis.exceptions import RedisError
+
+from src.config.project_settings import Settings, get_settings
+from src.external_services.redis.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "entity:"
+# Versions outlive the values read at them, a counter that expired and started over
+# could match a stale value again
+VERSION_TTL_MARGIN = 60
+
+
+class EntityCache:
+    """
+    Serialized entities and list pages in Redis, kept for ttls[model name] seconds.
+    Models without a ttl are not cached.
+
+    Every value is stored with the version of the entity, or of the whole model for
+    list pages, it was read at. Writers bump both versions after committing, so a
+    value read before a write and stored after it is never served.
+    """
+
+    def __init__(self, client: redis.Redis, ttls: dict[str, int]) -> None:
+        self.client = client
+        self.ttls = ttls
+
+    def enabled(self, model: str) -> bool:
+        return self.ttls.get(model, 0) > 0
+
+    async def get_entity(self, model: str, obj_id: int) -> tuple[str | None, Any]:
+        """The current version of the entity and the value cached at it, if any."""
+        return await self._get(
+            f"{KEY_PREFIX}{model}:{obj_id}", f"{KEY_PREFIX}{model}:{obj_id}:version"
+        )
+
+    async def set_entity(
+        self, model: str, obj_id: int, version: str | None, value: Any
+    ) -> None:
+        await self._set(f"{KEY_PREFIX}{model}:{obj_id}", model, version, value)
+
+    async def get_page(
+        self, model: str, limit: int, after_id: int | None
+    ) -> tuple[str | None, Any]:
+        return await self._get(
+            f"{KEY_PREFIX}{model}:page:{limit}:{after_id}",
+            f"{KEY_PREFIX}{model}:version",
+        )
+
+    async def set_page(
+        self,
+        model: str,
+        limit: int,
+        after_id: int | None,
+        version: str | None,
+        value: Any,
+    ) -> None:
+        await self._set(
+            f"{KEY_PREFIX}{model}:page:{limit}:{after_id}", model, version, value
+        )
+
+    async def invalidate(self, model: str, obj_id: int | None = None) -> None:
+        """Drops the entity and all list pages of the model."""
+        if not self.enabled(model):
+            return
+        version_ttl = self.ttls[model] + VERSION_TTL_MARGIN
+        version_keys = [f"{KEY_PREFIX}{model}:version"]
+        if obj_id is not None:
+            version_keys.append(f"{KEY_PREFIX}{model}:{obj_id}:version")
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in version_keys:
+                    pipe.incr(key)
+                    pipe.expire(key, version_ttl)
+                if obj_id is not None:
+                    pipe.delete(f"{KEY_PREFIX}{model}:{obj_id}")
+                await pipe.execute()
+        except RedisError:
+            logger.exception("Failed to invalidate cached %s %s", model, obj_id)
+
+    async def _get(self, key: str, version_key: str) -> tuple[str | None, Any]:
+        try:
+            version, cached = await self.client.mget(version_key, key)
+        except RedisError:
+            logger.exception("Failed to read cached %s", key)
+            return None, None
+        version = version or "0"
+        if cached is not None:
+            cached_version, _, payload = cached.partition(":")
+            if cached_version == version:
+                return version, json.loads(payload)
+        return version, None
+
+    async def _set(self, key: str, model: str, version: str | None, value: Any) -> None:
+        if version is None:
+            return
+        try:
+            await self.client.setex(
+                key, self.ttls[model], f"{version}:{json.dumps(value)}"
+            )
+        except RedisError:
+            logger.exception("Failed to cache %s", key)
+
+
+def get_entity_cache(
+    client: Annotated[redis.Redis, Depends(get_redis)],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> EntityCache:
+    return EntityCache(client, settings.entity_cache_ttls)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette import status
+
+from src.config.project_settings import EventLaneSettings
+from src.consts import EventPriority
+from src.external_services.redis.event_feed import EventFeedPublisher
+from src.schemas.module_events import EventCreate
+from src.services.metrics import EVENT_COMMIT_LATENCY
+from src.services.module_events import EventService
+
+logger = logging.getLogger(__name__)
+
+FLUSH_ATTEMPTS = 3
+# Pause before the second attempt, doubled before every further one
+FLUSH_RETRY_DELAY = 0.5
+
+_STOP = object()
+
+
+@dataclass(eq=False)
+class EventLane:
+    priority: EventPriority
+    settings: EventLaneSettings
+    queue: asyncio.Queue = field(repr=False)
+    tasks: list[asyncio.Task] = field(default_factory=list, repr=False)
+
+
+class EventWriteBuffer:
+    """
+    Write-behind queues for single events, one lane per priority. A lane collects
+    events in memory and writes them with EventService.bulk_create once flush_rows
+    are queued or flush_interval seconds passed since the first queued event,
+    whichever comes first. Lanes are flushed by their own tasks, so urgent events
+    never wait behind a batch of routine ones.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_size: int,
+        lanes: dict[EventPriority, EventLaneSettings],
+        publisher: EventFeedPublisher | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.publisher = publisher
+        self.lanes = {
+            priority: EventLane(
+                priority=priority,
+                settings=lane_settings,
+                queue=asyncio.Queue(maxsize=max_size),
+            )
+            for priority, lane_settings in lanes.items()
+        }
+        self._closing = False
+
+    def start(self) -> None:
+        for lane in self.lanes.values():
+            lane.tasks = [
+                asyncio.create_task(self._run(lane))
+                for _ in range(lane.settings.concurrency)
+            ]
+
+    async def stop(self) -> None:
+        """Stops accepting events and waits until everything queued is written."""
+        self._closing = True
+        for lane in self.lanes.values():
+            for _ in lane.tasks:
+                await lane.queue.put(_STOP)
+        for lane in self.lanes.values():
+            await asyncio.gather(*lane.tasks)
+            lane.tasks = []
+
+    def submit(self, event: EventCreate) -> None:
+        if self._closing:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Event ingestion is shutting down",
+            )
+        lane = self.lanes[EventPriority(event.priority)]
+        try:
+            lane.queue.put_nowait((time.monotonic(), event))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Event buffer is full, retry later",
+                headers={"Retry-After": "1"},
+            )
+
+    async def _run(self, lane: EventLane) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = []
+            item = await lane.queue.get()
+            deadline = loop.time() + lane.settings.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= lane.settings.flush_rows:
+                    break
+                try:
+                    item = lane.queue.get_nowait()
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(lane.queue.get(), timeout)
+                except TimeoutError:
+                    break
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[float, EventCreate]]) -> None:
+        events = [event for _, event in batch]
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                async with self.session_factory() as session:
+                    result = await EventService(session, self.publisher).bulk_create(
+                        events
+                    )
+            except Exception:
+                logger.exception(
+                    "Failed to flush %d events (attempt %d/%d)",
+                    len(batch),
+                    attempt,
+                    FLUSH_ATTEMPTS,
+                )
+                if attempt < FLUSH_ATTEMPTS:
+                    await asyncio.sleep(FLUSH_RETRY_DELAY * 2 ** (attempt - 1))
+                continue
+            committed_at = time.monotonic()
+            for received_at, event in batch:
+                EVENT_COMMIT_LATENCY.labels(event.priority).observe(
+                    committed_at - received_at
+                )
+            for error in result.errors:
+                logger.warning("Dropped buffered event: %s", error.errors)
+            return
+        logger.error("Dropped %d buffered events after retries", len(batch))
+
+
+def get_event_buffer(request: Request) -> EventWriteBuffer:
+    return request.app.state.event_buffer
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+import redis.asyncio as redis
+from fastapi import Request
+from redis.exceptions import RedisError
+
+from src.schemas.module_events import EventFilter
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1.0
+
+_DROPPED = object()
+
+
+@dataclass(eq=False)
+class EventFeedSubscription:
+    filters: EventFilter
+    queue: asyncio.Queue = field(repr=False)
+
+    def matches(self, event: dict) -> bool:
+        return (
+            (
+                self.filters.device_id is None
+                or event["device_id"] == self.filters.device_id
+            )
+            and (
+                self.filters.module_id is None
+                or event["module_id"] == self.filters.module_id
+            )
+            and (
+                self.filters.priority is None
+                or event["priority"] == self.filters.priority
+            )
+        )
+
+
+class EventFeedHub:
+    """
+    Holds the single Redis pub/sub subscription of an API worker and fans events out
+    to its live feed connections. Every connection gets a bounded queue, a client
+    that can't keep up is disconnected instead of buffering events without limit.
+    """
+
+    def __init__(
+        self, client: redis.Redis, channel: str, buffer_size: int, heartbeat: float
+    ) -> None:
+        self.client = client
+        self.channel = channel
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.subscriptions: set[EventFeedSubscription] = set()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscription in list(self.subscriptions):
+            self._drop(subscription)
+
+    def subscribe(self, filters: EventFilter) -> EventFeedSubscription:
+        subscription = EventFeedSubscription(
+            filters=filters, queue=asyncio.Queue(maxsize=self.buffer_size)
+        )
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventFeedSubscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def dispatch(self, message: str) -> None:
+        for event in json.loads(message):
+            payload = None
+            for subscription in list(self.subscriptions):
+                if not subscription.matches(event):
+                    continue
+                if payload is None:
+                    payload = json.dumps(event)
+                try:
+                    subscription.queue.put_nowait(payload)
+                except asyncio.QueueFull:
+                    self._drop(subscription)
+
+    def _drop(self, subscription: EventFeedSubscription) -> None:
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(_DROPPED)
+
+    async def stream(self, subscription: EventFeedSubscription) -> AsyncIterator[str]:
+        """Server-sent events for one connection."""
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(
+                        subscription.queue.get(), self.heartbeat
+                    )
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if payload is _DROPPED:
+                    yield "event: dropped\ndata: subscriber is too slow\n\n"
+                    return
+                yield f"data: {payload}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            self.dispatch(message["data"])
+                        except Exception:
+                            logger.exception("Skipped a malformed live feed message")
+            except RedisError:
+                logger.exception("Live feed subscription lost, reconnecting")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+def get_event_feed_hub(request: Request) -> EventFeedHub:
+    return request.app.state.event_feed_hub
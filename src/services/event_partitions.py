@@ -0,0 +1,171 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.consts import PartitionInterval
+from src.models import ModuleEvent
+
+PARENT_TABLE = ModuleEvent.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+_BOUND_PATTERN = re.compile(r"FROM \('(?P<start>[^']+)'\) TO \('(?P<end>[^']+)'\)")
+
+
+@dataclass
+class EventPartition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+def partition_start(moment: datetime, interval: PartitionInterval) -> datetime:
+    start = moment.astimezone(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == PartitionInterval.WEEKLY:
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def partition_step(interval: PartitionInterval) -> timedelta:
+    if interval == PartitionInterval.WEEKLY:
+        return timedelta(weeks=1)
+    return timedelta(days=1)
+
+
+def uncovered_ranges(
+    start: datetime, end: datetime, partitions: list[EventPartition]
+) -> list[tuple[datetime, datetime]]:
+    """The parts of [start, end) no partition covers, partitions sorted by start."""
+    ranges = []
+    cursor = start
+    for partition in partitions:
+        if partition.end <= cursor or partition.start >= end:
+            continue
+        if partition.start > cursor:
+            ranges.append((cursor, partition.start))
+        cursor = max(cursor, partition.end)
+    if cursor < end:
+        ranges.append((cursor, end))
+    return ranges
+
+
+class EventPartitionService:
+    """
+    Maintains range partitions of the ModuleEvent table: creates upcoming partitions
+    ahead of time and drops whole partitions past retention instead of DELETE-ing rows.
+
+    Periods partly covered by partitions of another interval, after the interval was
+    changed, get partitions for their uncovered parts, so no rows stay behind in the
+    default partition.
+    """
+
+    def __init__(self, session: AsyncSession, interval: PartitionInterval) -> None:
+        self.session = session
+        self.interval = interval
+
+    async def get_partitions(self) -> list[EventPartition]:
+        await self.session.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+        result = await self.session.execute(
+            text(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = CAST(:parent AS regclass)
+                """
+            ),
+            {"parent": PARENT_TABLE},
+        )
+        partitions = []
+        for name, bound in result.all():
+            match = _BOUND_PATTERN.search(bound)
+            if match is None:
+                continue
+            partitions.append(
+                EventPartition(
+                    name=name,
+                    start=datetime.fromisoformat(match["start"]),
+                    end=datetime.fromisoformat(match["end"]),
+                )
+            )
+        return sorted(partitions, key=lambda partition: partition.start)
+
+    async def create_partitions(
+        self, now: datetime, premake: int, dry_run: bool = False
+    ) -> list[EventPartition]:
+        existing = await self.get_partitions()
+        step = partition_step(self.interval)
+        start = partition_start(now, self.interval)
+
+        created = []
+        for _ in range(premake + 1):
+            end = start + step
+            for gap_start, gap_end in uncovered_ranges(start, end, existing):
+                partition = EventPartition(
+                    name=f"{PARENT_TABLE}_p{gap_start:%Y%m%d}",
+                    start=gap_start,
+                    end=gap_end,
+                )
+                if not dry_run:
+                    await self._create_partition(partition)
+                created.append(partition)
+            start = end
+
+        if not dry_run:
+            await self.session.commit()
+        return created
+
+    async def _create_partition(self, partition: EventPartition) -> None:
+        # Rows that landed in the default partition for this range have to be moved
+        # out first, otherwise attaching the new partition fails validation.
+        params = {"start": partition.start, "end": partition.end}
+        await self.session.execute(
+            text(
+                f'CREATE TABLE "{partition.name}" '
+                f'(LIKE "{PARENT_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            )
+        )
+        await self.session.execute(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM "{DEFAULT_PARTITION}"
+                    WHERE event_timestamp >= :start AND event_timestamp < :end
+                    RETURNING *
+                )
+                INSERT INTO "{partition.name}" SELECT * FROM moved
+                """
+            ),
+            params,
+        )
+        await self.session.execute(
+            text(
+                f'ALTER TABLE "{PARENT_TABLE}" ATTACH PARTITION "{partition.name}" '
+                f"FOR VALUES FROM ('{partition.start.isoformat()}') "
+                f"TO ('{partition.end.isoformat()}')"
+            )
+        )
+
+    async def drop_partitions(
+        self, older_than: datetime, dry_run: bool = False
+    ) -> list[EventPartition]:
+        expired = [p for p in await self.get_partitions() if p.end <= older_than]
+        if dry_run:
+            return expired
+
+        for partition in expired:
+            await self.session.execute(
+                text(
+                    f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{partition.name}"'
+                )
+            )
+            await self.session.execute(text(f'DROP TABLE "{partition.name}"'))
+        # The default partition only catches stray timestamps, so it stays small
+        await self.session.execute(
+            text(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE event_timestamp < :cutoff'),
+            {"cutoff": older_than},
+        )
+        await self.session.commit()
+        return expired
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+
+import redis.asyncio as redis
+from pydantic import ValidationError
+from redis.exceptions import ResponseError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.external_services.redis.event_feed import EventFeedPublisher
+from src.external_services.redis.event_stream import EVENT_FIELD
+from src.schemas.module_events import EventCreate
+from src.services.metrics import EVENT_COMMIT_LATENCY
+from src.services.module_events import EventService
+
+logger = logging.getLogger(__name__)
+
+# Pause after a failed batch, doubled on every further failure
+MIN_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+
+class EventStreamWorker:
+    """
+    Consumer group member that moves events from one priority lane of the ingest
+    stream into Postgres.
+
+    Entries are acknowledged only after their batch is committed, so a crashed worker
+    leaves them pending and another worker reclaims them after claim_idle_ms. Entries
+    delivered max_deliveries times without being committed are moved to the
+    dead_letter_key stream, so one bad batch can't hold up the lane.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        key: str,
+        group: str,
+        consumer: str,
+        batch_size: int,
+        block_ms: int,
+        claim_idle_ms: int,
+        publisher: EventFeedPublisher | None = None,
+        max_deliveries: int = 5,
+        dead_letter_key: str | None = None,
+    ) -> None:
+        self.client = client
+        self.session_factory = session_factory
+        self.key = key
+        self.group = group
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.publisher = publisher
+        self.max_deliveries = max_deliveries
+        self.dead_letter_key = dead_letter_key or f"{key}:dead"
+        self._stopping = False
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.client.xgroup_create(self.key, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self) -> None:
+        loop_iterations = 0
+        retry_delay = MIN_RETRY_DELAY
+        ready = False
+        while not self._stopping:
+            try:
+                if not ready:
+                    await self.ensure_group()
+                    await self.reclaim()
+                    ready = True
+                await self.read_batch()
+                loop_iterations += 1
+                # Pending entries are only worth checking once in a while
+                if loop_iterations % 100 == 0:
+                    await self.reclaim()
+            except Exception:
+                # The failed batch stays pending and is reclaimed later
+                logger.exception(
+                    "Stream worker %s failed, retrying in %.1f s",
+                    self.consumer,
+                    retry_delay,
+                )
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+            else:
+                retry_delay = MIN_RETRY_DELAY
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    async def read_batch(self) -> int:
+        response = await self.client.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.key: ">"},
+            count=self.batch_size,
+            block=self.block_ms,
+        )
+        processed = 0
+        for _stream, entries in response or []:
+            processed += await self._process(entries)
+        return processed
+
+    async def reclaim(self) -> int:
+        """Takes over entries other consumers fetched but never acknowledged."""
+        processed = 0
+        start_id = "0-0"
+        while True:
+            response = await self.client.xautoclaim(
+                self.key,
+                self.group,
+                self.consumer,
+                min_idle_time=self.claim_idle_ms,
+                start_id=start_id,
+                count=self.batch_size,
+            )
+            start_id, entries = response[0], response[1]
+            if entries:
+                entries = await self._dead_letter(entries)
+            if entries:
+                processed += await self._process(entries)
+            if start_id == "0-0":
+                return processed
+
+    async def _dead_letter(
+        self, entries: list[tuple[str, dict[str, str]]]
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Moves entries delivered too often aside, returns the others."""
+        pending = await self.client.xpending_range(
+            self.key,
+            self.group,
+            min=entries[0][0],
+            max=entries[-1][0],
+            count=len(entries),
+        )
+        exhausted = {
+            item["message_id"]
+            for item in pending
+            if item["times_delivered"] > self.max_deliveries
+        }
+        if not exhausted:
+            return entries
+        async with self.client.pipeline(transaction=False) as pipe:
+            for entry_id, fields in entries:
+                if entry_id in exhausted:
+                    pipe.xadd(self.dead_letter_key, {**fields, "entry_id": entry_id})
+            pipe.xack(self.key, self.group, *exhausted)
+            await pipe.execute()
+        logger.error(
+            "Moved %d stream entries to %s after %d deliveries",
+            len(exhausted),
+            self.dead_letter_key,
+            self.max_deliveries,
+        )
+        return [entry for entry in entries if entry[0] not in exhausted]
+
+    async def _process(self, entries: list[tuple[str, dict[str, str]]]) -> int:
+        events = []
+        received_at = []
+        for entry_id, fields in entries:
+            try:
+                events.append(EventCreate.model_validate_json(fields[EVENT_FIELD]))
+                # Stream entry ids start with the unix time in ms the entry was added
+                received_at.append(int(entry_id.split("-")[0]) / 1000)
+            except (KeyError, TypeError, ValidationError):
+                logger.warning("Dropped malformed stream entry %s", entry_id)
+
+        if events:
+            async with self.session_factory() as session:
+                result = await EventService(session, self.publisher).bulk_create(events)
+            committed_at = time.time()
+            for event, added_at in zip(events, received_at):
+                EVENT_COMMIT_LATENCY.labels(event.priority).observe(
+                    committed_at - added_at
+                )
+            for error in result.errors:
+                logger.warning("Dropped stream event: %s", error.errors)
+
+        await self.client.xack(
+            self.key, self.group, *[entry_id for entry_id, _ in entries]
+        )
+        return len(entries)
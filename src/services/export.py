@@ -0,0 +1,55 @@
+import csv
+import io
+from typing import AsyncIterator, Callable, Type
+
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.consts import ExportFormat
+from src.services.base import BaseService
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: NDJSON_MEDIA_TYPE,
+    ExportFormat.CSV: CSV_MEDIA_TYPE,
+}
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+async def stream_export(
+    session_factory: async_sessionmaker[AsyncSession],
+    service_class: Callable[[AsyncSession], BaseService],
+    stmt: Select,
+    schema: Type[BaseModel],
+    export_format: ExportFormat,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Serializes rows of stmt as they come from a server-side cursor and yields them
+    in chunks of roughly chunk_size bytes. Owns its session, because the response
+    body is sent after request scoped dependencies are already closed.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if export_format == ExportFormat.CSV:
+        writer = csv.DictWriter(buffer, fieldnames=list(schema.model_fields))
+        writer.writeheader()
+
+    async with session_factory() as session:
+        async for obj in service_class(session).stream_list(stmt):
+            row = schema.model_validate(obj, from_attributes=True)
+            if writer is None:
+                buffer.write(row.model_dump_json())
+                buffer.write("\n")
+            else:
+                writer.writerow(row.model_dump(mode="json"))
+            if buffer.tell() >= chunk_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -1,34 +1,453 @@
-from typing import Annotated
+import asyncio
+import logging
+import hashlib
+import math
+import re
+import uuid
+from datetime import datetime
+from pathlib import PurePath
+from typing import Annotated, Any, Sequence
 
-from fastapi import Depends, UploadFile, HTTPException
+from fastapi import Depends, HTTPException
+from sqlalchemy import Select, TIMESTAMP, func, literal, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
 from src.config.database import get_db_session
-from src.external_services.storage.base import FileStorage
-from src.models import DeviceFileArchive
+from src.external_services.redis.archive_uploads import (
+    UploadSession,
+    UploadSessionStore,
+)
+from src.external_services.storage.base import (
+    MAX_PARTS,
+    ByteRange,
+    FileInfo,
+    FileStorage,
+    FileStream,
+)
+from src.models import ArchiveObject, DeviceFileArchive
+from src.schemas.file_archive import (
+    ArchiveDownloadLink,
+    DeviceFileArchiveRetrieve,
+    ArchiveResumableUpload,
+    ArchiveResumableUploadCreate,
+    ArchiveUploadConfirm,
+    ArchiveUploadLink,
+    ArchiveUploadRequest,
+    ArchiveWindow,
+)
 from src.services.base import BaseService
+from src.services.entity_cache import EntityCache, get_entity_cache
+from src.services.hashed_uploads import HashedUploadFile
+from src.services.link_cache import PresignedLinkCache, get_link_cache
+from src.services.pagination import Page, encode_cursor
 
-import uuid
+logger = logging.getLogger(__name__)
+
+
+def resumable_upload_state(session: UploadSession) -> ArchiveResumableUpload:
+    return ArchiveResumableUpload(
+        upload_id=session.id,
+        size=session.size,
+        chunk_size=session.chunk_size,
+        chunk_count=session.chunk_count,
+        received=sorted(session.chunks),
+        received_bytes=sum(session.chunk_length(number) for number in session.chunks),
+    )
+
+
+def object_path(stem: str, filename: str | None) -> str:
+    """Storage path of content, the extension is kept so downloads stay playable."""
+    suffix = PurePath(filename or "").suffix.lower()
+    if not re.fullmatch(r"\.[0-9a-z]+", suffix):
+        suffix = ""
+    return f"{stem}{suffix}"
 
 
 class ArchiveService(BaseService[DeviceFileArchive]):
+    cache_schema = DeviceFileArchiveRetrieve
+
     def __init__(
         self,
         session: Annotated[AsyncSession, Depends(get_db_session)],
+        link_cache: Annotated[
+            PresignedLinkCache | None, Depends(get_link_cache)
+        ] = None,
+        cache: Annotated[EntityCache | None, Depends(get_entity_cache)] = None,
     ) -> None:
-        super().__init__(DeviceFileArchive, session)
+        super().__init__(DeviceFileArchive, session, cache)
+        self.link_cache = link_cache
+
+    def base_statement(self) -> Select:
+        # Soft-deleted archives stay in the table until the garbage collector
+        # removes their files
+        return Select(DeviceFileArchive).where(DeviceFileArchive.is_deleted.is_(False))
+
+    @staticmethod
+    def filter_statement(device_id: int | None = None) -> Select:
+        stmt = (
+            Select(DeviceFileArchive)
+            .where(DeviceFileArchive.is_deleted.is_(False))
+            .order_by(DeviceFileArchive.id)
+        )
+        if device_id is not None:
+            stmt = stmt.where(DeviceFileArchive.device_id == device_id)
+        return stmt
+
+    @staticmethod
+    def overlapping_statement(device_id: int, window: ArchiveWindow) -> Select:
+        """
+        Segments of a device overlapping the window, ordered by start time.
+
+        A segment overlaps when it starts before the window ends and ends after it
+        starts. No segment is longer than the longest one of the device, so the scan
+        of the (device_id, timestamp_start) index can begin that much before the
+        window instead of at the start of the device history.
+        """
+        longest = (
+            Select(
+                func.max(
+                    DeviceFileArchive.timestamp_end - DeviceFileArchive.timestamp_start
+                )
+            )
+            .where(DeviceFileArchive.device_id == device_id)
+            .scalar_subquery()
+        )
+        return (
+            Select(DeviceFileArchive)
+            .where(
+                DeviceFileArchive.device_id == device_id,
+                DeviceFileArchive.is_deleted.is_(False),
+                DeviceFileArchive.timestamp_start
+                >= literal(window.from_, TIMESTAMP(timezone=True)) - longest,
+                DeviceFileArchive.timestamp_start < window.to,
+                DeviceFileArchive.timestamp_end > window.from_,
+            )
+            .order_by(DeviceFileArchive.timestamp_start, DeviceFileArchive.id)
+        )
+
+    async def get_timeline_page(
+        self,
+        device_id: int,
+        window: ArchiveWindow,
+        limit: int,
+        cursor: dict[str, Any] | None = None,
+    ) -> Page[DeviceFileArchive]:
+        stmt = self.overlapping_statement(device_id, window).limit(limit + 1)
+        if cursor is not None:
+            try:
+                after = (datetime.fromisoformat(cursor["ts"]), int(cursor["id"]))
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid pagination cursor",
+                )
+            stmt = stmt.where(
+                tuple_(DeviceFileArchive.timestamp_start, DeviceFileArchive.id) > after
+            )
+        result = await self.session.scalars(stmt)
+        items = result.all()
+        if len(items) <= limit:
+            return Page(items=items)
+        items = items[:limit]
+        last = items[-1]
+        return Page(
+            items=items,
+            next_cursor=encode_cursor(
+                {"ts": last.timestamp_start.isoformat(), "id": last.id}
+            ),
+        )
+
+    async def get_clip_segments(
+        self, device_id: int, window: ArchiveWindow, max_segments: int
+    ) -> Sequence[DeviceFileArchive]:
+        stmt = (
+            self.overlapping_statement(device_id, window)
+            .where(DeviceFileArchive.filepath.is_not(None))
+            .limit(max_segments + 1)
+        )
+        result = await self.session.scalars(stmt)
+        segments = result.all()
+        if len(segments) > max_segments:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The time range spans more than {max_segments} archive files",
+            )
+        if not segments:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No archive files in the time range",
+            )
+        return segments
 
     async def upload_file_to_storage(
-        self, instance: DeviceFileArchive, file: UploadFile, storage: FileStorage
+        self,
+        instance: DeviceFileArchive,
+        file: HashedUploadFile,
+        storage: FileStorage,
     ) -> DeviceFileArchive:
-        file_path = f"{uuid.uuid4()}_{file.filename}"
-        await storage.upload_file(payload=file.file, path=file_path)
-        await file.close()
+        """
+        Stores the file under the hash of its content, so retried and repeated
+        uploads are kept once and not sent to the storage again. The hash was taken
+        while the file was received, the file is only read again to store it.
+        """
+        file_path = object_path(file.sha256, file.filename)
+        # The reference is taken first, from then on the archive GC leaves the file be
+        ref_count = await self._acquire_object(file_path, file.size)
+        try:
+            if ref_count == 1 or await storage.get_file_info(file_path) is None:
+                await storage.upload_file(payload=file.file, path=file_path)
+        except BaseException:
+            await self._release_object(file_path)
+            await self.session.commit()
+            raise
+        finally:
+            await file.close()
+
+        return await self._attach_object(instance, file_path)
+
+    async def create_upload_link(
+        self, upload: ArchiveUploadRequest, storage: FileStorage
+    ) -> ArchiveUploadLink:
+        """
+        First step of a direct upload: where to PUT the file, unless the same
+        content is stored already.
+        """
+        file_path = object_path(upload.sha256, upload.filename)
+        file_info = await storage.get_file_info(file_path)
+        # Only content the storage checked is reused, anything else at the path is
+        # overwritten by the upload
+        if (
+            file_info is not None
+            and file_info.size == upload.size
+            and await storage.get_file_sha256(file_path) == upload.sha256
+        ):
+            return ArchiveUploadLink(path=file_path, etag=file_info.etag)
+        link = await storage.get_upload_link(file_path, upload.size, upload.sha256)
+        if link is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The storage does not accept direct uploads",
+            )
+        return ArchiveUploadLink(path=file_path, url=link.url, headers=link.headers)
+
+    async def confirm_upload(
+        self,
+        instance: DeviceFileArchive,
+        confirm: ArchiveUploadConfirm,
+        storage: FileStorage,
+    ) -> DeviceFileArchive:
+        """
+        Second step of a direct upload, checks the stored file before using it. Its
+        checksum has to match the hash in the path, a file that doesn't is removed
+        unless an archive uses it.
+        """
+        await self._acquire_object(confirm.path, confirm.size)
+        file_info = await storage.get_file_info(confirm.path)
+        if (
+            file_info is not None
+            and file_info.size == confirm.size
+            and file_info.etag is not None
+            and confirm.etag.strip('"') == file_info.etag.strip('"')
+        ):
+            sha256 = await storage.get_file_sha256(confirm.path)
+            if sha256 == PurePath(confirm.path).stem:
+                return await self._attach_object(instance, confirm.path)
+            await self._release_object(confirm.path)
+            await self._delete_unused_object(confirm.path, storage)
+        else:
+            await self._release_object(confirm.path)
+        await self.session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The stored file does not match the upload",
+        )
+
+    async def create_resumable_upload(
+        self,
+        instance: DeviceFileArchive,
+        create: ArchiveResumableUploadCreate,
+        storage: FileStorage,
+        sessions: UploadSessionStore,
+        chunk_size: int,
+    ) -> UploadSession:
+        upload_id = uuid.uuid4().hex
+        file_path = object_path(f"uploads/{upload_id}", create.filename)
+        storage_upload_id = await storage.create_multipart_upload(file_path)
+        if storage_upload_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The storage does not accept uploads in chunks",
+            )
+        session = UploadSession(
+            id=upload_id,
+            archive_id=instance.id,
+            path=file_path,
+            storage_upload_id=storage_upload_id,
+            size=create.size,
+            chunk_size=max(chunk_size, math.ceil(create.size / MAX_PARTS)),
+        )
+        await sessions.create(session)
+        return session
+
+    async def get_resumable_upload(
+        self, instance: DeviceFileArchive, upload_id: str, sessions: UploadSessionStore
+    ) -> UploadSession:
+        session = await sessions.get(upload_id)
+        if session is None or session.archive_id != instance.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Upload {upload_id} not found",
+            )
+        return session
+
+    async def upload_chunk(
+        self,
+        session: UploadSession,
+        number: int,
+        body: bytes,
+        sha256: str,
+        storage: FileStorage,
+        sessions: UploadSessionStore,
+    ) -> UploadSession:
+        """Stores a chunk that arrived intact, chunks may come in any order and again."""
+        if session.claimed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The upload is being finished already",
+            )
+        if not 1 <= number <= session.chunk_count:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Chunk numbers go from 1 to {session.chunk_count}",
+            )
+        if len(body) != session.chunk_length(number):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Chunk {number} must be {session.chunk_length(number)} bytes",
+            )
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(body).hexdigest())
+        if digest != sha256.lower():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Checksum of chunk {number} does not match",
+            )
+        etag = await storage.upload_part(
+            session.path, session.storage_upload_id, number, body
+        )
+        if not await sessions.add_chunk(session, number, etag):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The upload is being finished already",
+            )
+        return session
+
+    async def complete_resumable_upload(
+        self,
+        session: UploadSession,
+        instance: DeviceFileArchive,
+        storage: FileStorage,
+        sessions: UploadSessionStore,
+    ) -> DeviceFileArchive:
+        if session.missing:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{len(session.missing)} chunks are missing",
+            )
+        if not await sessions.claim(session):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The upload is being finished already",
+            )
+        # A chunk sent again before the claim may have replaced an ETag
+        session = await sessions.get(session.id) or session
+        await self._acquire_object(session.path, session.size)
+        try:
+            await storage.complete_multipart_upload(
+                session.path, session.storage_upload_id, list(session.chunks.items())
+            )
+        except BaseException:
+            await self._release_object(session.path)
+            await self.session.commit()
+            await sessions.unclaim(session)
+            raise
+        await sessions.delete(session)
+        return await self._attach_object(instance, session.path)
+
+    async def abort_resumable_upload(
+        self, session: UploadSession, storage: FileStorage, sessions: UploadSessionStore
+    ) -> None:
+        if not await sessions.claim(session):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The upload is being finished already",
+            )
+        await storage.abort_multipart_upload(session.path, session.storage_upload_id)
+        await sessions.delete(session)
+
+    async def _attach_object(
+        self, instance: DeviceFileArchive, file_path: str
+    ) -> DeviceFileArchive:
+        """Points the archive at a file it holds a reference to already."""
+        previous_path = instance.filepath
         instance.filepath = file_path
         self.session.add(instance)
+        if previous_path is not None:
+            await self._release_object(previous_path)
         await self.session.commit()
+        await self.invalidate_cache(instance.id)
+        if previous_path is not None and previous_path != file_path:
+            await self._invalidate_link(previous_path)
         return instance
 
+    async def delete(self, obj_id: int) -> None:
+        """Marks the archive deleted, its file is removed later by the archive GC."""
+        instance = await self.get_by_id(obj_id)
+        instance.is_deleted = True
+        if instance.filepath is not None:
+            await self._release_object(instance.filepath)
+        await self.session.commit()
+        await self.invalidate_cache(obj_id)
+        if instance.filepath is not None:
+            await self._invalidate_link(instance.filepath)
+
+    async def _acquire_object(self, path: str, size: int) -> int:
+        stmt = (
+            insert(ArchiveObject)
+            .values(path=path, size=size, ref_count=1)
+            .on_conflict_do_update(
+                index_elements=[ArchiveObject.path],
+                set_={"ref_count": ArchiveObject.ref_count + 1},
+            )
+            .returning(ArchiveObject.ref_count)
+        )
+        ref_count = await self.session.scalar(stmt)
+        await self.session.commit()
+        return ref_count
+
+    async def _release_object(self, path: str) -> None:
+        await self.session.execute(
+            update(ArchiveObject)
+            .where(ArchiveObject.path == path)
+            .values(ref_count=ArchiveObject.ref_count - 1)
+        )
+
+    async def _delete_unused_object(self, path: str, storage: FileStorage) -> None:
+        """Removes the file and its row unless it is referenced."""
+        # The row stays locked until the file is gone, as in the archive GC
+        obj = await self.session.scalar(
+            Select(ArchiveObject).where(ArchiveObject.path == path).with_for_update()
+        )
+        if obj is None or obj.ref_count > 0:
+            return
+        await storage.delete_file(path)
+        await self.session.delete(obj)
+
+    async def _invalidate_link(self, path: str) -> None:
+        if self.link_cache is not None:
+            await self.link_cache.invalidate(path)
+
     async def get_download_link(
         self, instance: DeviceFileArchive, storage: FileStorage
     ) -> str:
@@ -37,24 +456,83 @@ class ArchiveService(BaseService[DeviceFileArchive]):
                 status_code=400,
                 detail=f"This instance has no file",
             )
-        return await storage.get_file_link(instance.filepath)
+        if self.link_cache is None:
+            return await storage.get_file_link(instance.filepath)
+        link = await self.link_cache.get(instance.filepath)
+        if link is None:
+            link = await storage.get_file_link(instance.filepath)
+            await self.link_cache.set(instance.filepath, link)
+        return link
 
-    async def download_file(self, instance: DeviceFileArchive, storage: FileStorage):
+    async def get_file_info(
+        self, instance: DeviceFileArchive, storage: FileStorage
+    ) -> FileInfo:
         if instance.filepath is None:
             raise HTTPException(
                 status_code=400,
                 detail=f"This instance has no file",
             )
-        file = await storage.get_file(instance.filepath)
+        file_info = await storage.get_file_info(instance.filepath)
 
-        if file is None:
+        if file_info is None:
             raise HTTPException(
                 status_code=404,
                 detail="File not found in storage",
             )
+        return file_info
+
+    async def get_download_links(
+        self, ids: Sequence[int], storage: FileStorage, concurrency: int
+    ) -> dict[int, ArchiveDownloadLink]:
+        """
+        Links for many archives loaded with a single query. Problems are reported
+        per id instead of failing the whole batch.
+        """
+        result = await self.session.scalars(
+            self.base_statement().where(DeviceFileArchive.id.in_(set(ids)))
+        )
+        instances = {instance.id: instance for instance in result}
+        slots = asyncio.Semaphore(concurrency)
 
-        # TODO: Fix this mess somehow?
-        async def file_generator():
-            yield file
+        async def get_link(obj_id: int) -> ArchiveDownloadLink:
+            instance = instances.get(obj_id)
+            if instance is None:
+                return ArchiveDownloadLink(
+                    error=f"{self.model.__name__} with id {obj_id} not found"
+                )
+            async with slots:
+                try:
+                    return ArchiveDownloadLink(
+                        link=await self.get_download_link(instance, storage)
+                    )
+                except HTTPException as e:
+                    return ArchiveDownloadLink(error=e.detail)
+                except Exception:
+                    logger.exception("Failed to get a link for %s", instance.filepath)
+                    return ArchiveDownloadLink(error="Failed to get a download link")
 
-        return file_generator()
+        unique_ids = list(dict.fromkeys(ids))
+        links = await asyncio.gather(*(get_link(obj_id) for obj_id in unique_ids))
+        return dict(zip(unique_ids, links))
+
+    async def download_file(
+        self,
+        instance: DeviceFileArchive,
+        storage: FileStorage,
+        byte_range: ByteRange | None = None,
+    ) -> FileStream:
+        if instance.filepath is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"This instance has no file",
+            )
+        file_stream = await storage.stream_file(
+            instance.filepath, byte_range=byte_range
+        )
+
+        if file_stream is None:
+            raise HTTPException(
+                status_code=404,
+                detail="File not found in storage",
+            )
+        return file_stream
@@ -0,0 +1,82 @@
+import hashlib
+from typing import AsyncIterator, BinaryIO
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from starlette import status
+from starlette.datastructures import Headers, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+FILE_FIELD = "file"
+
+
+class HashedUploadFile(UploadFile):
+    """An uploaded file hashed chunk by chunk while the request body is spooled."""
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        *,
+        size: int | None = None,
+        filename: str | None = None,
+        headers: Headers | None = None,
+    ) -> None:
+        super().__init__(file, size=size, filename=filename, headers=headers)
+        self._digest = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    async def write(self, data: bytes) -> None:
+        self._digest.update(data)
+        await super().write(data)
+
+
+class HashingMultiPartParser(MultiPartParser):
+    """Spools files of a multipart body into HashedUploadFile."""
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is not None:
+            self._current_part.file = HashedUploadFile(
+                upload.file,
+                size=0,
+                filename=upload.filename,
+                headers=upload.headers,
+            )
+
+
+async def get_hashed_upload(request: Request) -> AsyncIterator[HashedUploadFile]:
+    """
+    The file field of a multipart/form-data body. It is hashed while it is received,
+    so the content hash is known without reading the spooled file again.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected a multipart/form-data body",
+        )
+    parser = HashingMultiPartParser(request.headers, request.stream(), max_files=1)
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    upload = form.get(FILE_FIELD)
+    if not isinstance(upload, HashedUploadFile):
+        await form.close()
+        raise RequestValidationError(
+            [
+                {
+                    "type": "missing",
+                    "loc": ("body", FILE_FIELD),
+                    "msg": "Field required",
+                    "input": None,
+                }
+            ]
+        )
+    try:
+        yield upload
+    finally:
+        await upload.close()
@@ -0,0 +1,88 @@
+import logging
+import time
+from collections import OrderedDict
+
+import redis.asyncio as redis
+from fastapi import Request
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "archive:link:"
+
+
+class PresignedLinkCache:
+    """
+    Presigned download links by storage path. A link is kept for ttl seconds, which
+    has to stay below the presign expiry so an expired link is never handed out.
+
+    The in-process LRU answers repeated requests without any round trip. The optional
+    Redis layer shares links between workers; since other workers can't invalidate
+    the in-process layer, it keeps links for at most local_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: int,
+        max_entries: int,
+        local_ttl: int,
+        client: redis.Redis | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.local_ttl = min(local_ttl, ttl) if client is not None else ttl
+        self.client = client
+        self._links: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, path: str) -> str | None:
+        cached = self._links.get(path)
+        if cached is not None:
+            expires_at, link = cached
+            if expires_at > time.monotonic():
+                self._links.move_to_end(path)
+                return link
+            del self._links[path]
+
+        if self.client is None:
+            return None
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.get(REDIS_KEY_PREFIX + path)
+                pipe.ttl(REDIS_KEY_PREFIX + path)
+                link, remaining = await pipe.execute()
+        except RedisError:
+            logger.exception("Failed to read cached link")
+            return None
+        if link is not None and remaining > 0:
+            # Another worker cached it earlier, so part of the ttl is already used up
+            self._remember(path, link, min(self.local_ttl, remaining))
+        return link
+
+    async def set(self, path: str, link: str) -> None:
+        self._remember(path, link, self.local_ttl)
+        if self.client is None:
+            return
+        try:
+            await self.client.setex(REDIS_KEY_PREFIX + path, self.ttl, link)
+        except RedisError:
+            logger.exception("Failed to cache link")
+
+    async def invalidate(self, *paths: str) -> None:
+        for path in paths:
+            self._links.pop(path, None)
+        if self.client is None or not paths:
+            return
+        try:
+            await self.client.delete(*[REDIS_KEY_PREFIX + path for path in paths])
+        except RedisError:
+            logger.exception("Failed to invalidate cached links")
+
+    def _remember(self, path: str, link: str, ttl: float) -> None:
+        self._links[path] = (time.monotonic() + ttl, link)
+        self._links.move_to_end(path)
+        while len(self._links) > self.max_entries:
+            self._links.popitem(last=False)
+
+
+def get_link_cache(request: Request) -> PresignedLinkCache:
+    return request.app.state.link_cache
@@ -0,0 +1,21 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+EVENT_COMMIT_LATENCY = Histogram(
+    "event_ingest_commit_latency_seconds",
+    "Time from accepting an event until it is committed to the database",
+    ["priority"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+DISK_CACHE_REQUESTS = Counter(
+    "storage_disk_cache_requests_total",
+    "File reads answered by the local disk cache (hit) or the storage (miss)",
+    ["result"],
+)
+DISK_CACHE_HIT_RATIO = Gauge(
+    "storage_disk_cache_hit_ratio",
+    "Share of file reads answered by the local disk cache since startup",
+)
+DISK_CACHE_SIZE = Gauge(
+    "storage_disk_cache_bytes", "Bytes held by the local disk cache"
+)
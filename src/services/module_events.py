@@ -1,15 +1,297 @@
-from typing import Annotated
+from collections import Counter
+from datetime import datetime, timedelta, UTC
+from typing import Annotated, Any, Sequence
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException
+from sqlalchemy import Select, insert, tuple_, func, literal, Row, ColumnElement
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
 from src.config.database import get_db_session
-from src.models import ModuleEvent
+from src.external_services.redis.event_feed import (
+    EventFeedPublisher,
+    get_event_feed_publisher,
+)
+from src.consts import RollupGranularity
+from src.models import ModuleEvent, Device, AnalyticsModule, ModuleEventRollup
+from src.schemas.global_schemas import as_utc
+from src.schemas.module_events import (
+    EventCreate,
+    EventBulkError,
+    EventBulkResult,
+    EventFilter,
+    EventRetrieve,
+)
 from src.services.base import BaseService
+from src.services.pagination import Page, encode_cursor
+
+ROLLUP_TRUNCATED_FIELDS = {
+    RollupGranularity.MINUTE: {"second": 0, "microsecond": 0},
+    RollupGranularity.HOUR: {"minute": 0, "second": 0, "microsecond": 0},
+}
+ROLLUP_STEPS = {
+    RollupGranularity.MINUTE: timedelta(minutes=1),
+    RollupGranularity.HOUR: timedelta(hours=1),
+}
+ROLLUP_KEY = ("granularity", "bucket_start", "device_id", "module_id", "priority")
+
+
+def truncate_to_bucket(moment: datetime, granularity: RollupGranularity) -> datetime:
+    return (
+        as_utc(moment).astimezone(UTC).replace(**ROLLUP_TRUNCATED_FIELDS[granularity])
+    )
+
+
+def bucket_window(filters: EventFilter, granularity: RollupGranularity) -> EventFilter:
+    """The filters with from and to widened to the buckets they fall into."""
+    update = {}
+    if filters.from_ is not None:
+        update["from_"] = truncate_to_bucket(filters.from_, granularity)
+    if filters.to is not None:
+        end = truncate_to_bucket(filters.to, granularity)
+        update["to"] = (
+            end if end == as_utc(filters.to) else end + ROLLUP_STEPS[granularity]
+        )
+    return filters.model_copy(update=update)
+
+
+def build_rollup_rows(rows: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+    counts: Counter[tuple] = Counter()
+    for row in rows:
+        for granularity in ROLLUP_TRUNCATED_FIELDS:
+            key = (
+                granularity.value,
+                truncate_to_bucket(row["event_timestamp"], granularity),
+                row["device_id"],
+                row["module_id"],
+                row["priority"],
+            )
+            counts[key] += 1
+    # Upserting in key order keeps concurrent batches from deadlocking on shared buckets
+    return [
+        dict(zip(ROLLUP_KEY, key), event_count=count)
+        for key, count in sorted(counts.items())
+    ]
 
 
 class EventService(BaseService[ModuleEvent]):
     def __init__(
-        self, session: Annotated[AsyncSession, Depends(get_db_session)]
+        self,
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        publisher: Annotated[
+            EventFeedPublisher | None, Depends(get_event_feed_publisher)
+        ] = None,
     ) -> None:
         super().__init__(ModuleEvent, session)
+        self.publisher = publisher
+
+    @staticmethod
+    def filter_clauses(filters: EventFilter) -> list[ColumnElement[bool]]:
+        clauses = []
+        if filters.device_id is not None:
+            clauses.append(ModuleEvent.device_id == filters.device_id)
+        if filters.module_id is not None:
+            clauses.append(ModuleEvent.module_id == filters.module_id)
+        if filters.priority is not None:
+            clauses.append(ModuleEvent.priority == filters.priority)
+        if filters.from_ is not None:
+            clauses.append(ModuleEvent.event_timestamp >= filters.from_)
+        if filters.to is not None:
+            clauses.append(ModuleEvent.event_timestamp < filters.to)
+        return clauses
+
+    @classmethod
+    def filter_statement(cls, filters: EventFilter) -> Select:
+        """
+        Events ordered by (event_timestamp, id) so that device/module filtered queries
+        are served by the composite (device_id | module_id, event_timestamp, id)
+        indexes without a separate sort step.
+        """
+        return (
+            Select(ModuleEvent)
+            .where(*cls.filter_clauses(filters))
+            .order_by(ModuleEvent.event_timestamp, ModuleEvent.id)
+        )
+
+    async def get_filtered_page(
+        self, filters: EventFilter, limit: int, cursor: dict[str, Any] | None = None
+    ) -> Page[ModuleEvent]:
+        stmt = self.filter_statement(filters).limit(limit + 1)
+        if cursor is not None:
+            try:
+                after = (datetime.fromisoformat(cursor["ts"]), int(cursor["id"]))
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid pagination cursor",
+                )
+            stmt = stmt.where(
+                tuple_(ModuleEvent.event_timestamp, ModuleEvent.id) > after
+            )
+        result = await self.session.scalars(stmt)
+        items = result.all()
+        if len(items) <= limit:
+            return Page(items=items)
+        items = items[:limit]
+        last = items[-1]
+        return Page(
+            items=items,
+            next_cursor=encode_cursor(
+                {"ts": last.event_timestamp.isoformat(), "id": last.id}
+            ),
+        )
+
+    async def bulk_create(self, events: Sequence[EventCreate]) -> EventBulkResult:
+        """
+        Inserts all events with existing device and module in batched multi-row
+        INSERTs. Rows referencing unknown devices or modules are skipped and reported
+        back by their position in ``events`` instead of failing the whole batch.
+        Committed events are announced to the live feed when a publisher is set.
+        """
+        errors = await self._check_references(events)
+        rejected = {error.index for error in errors}
+        rows = [
+            event.model_dump()
+            for index, event in enumerate(events)
+            if index not in rejected
+        ]
+        if rows:
+            try:
+                result = await self.session.scalars(
+                    insert(ModuleEvent).returning(
+                        ModuleEvent.id, sort_by_parameter_order=True
+                    ),
+                    rows,
+                )
+                ids = result.all()
+                await self._update_rollups(rows)
+                await self.session.commit()
+            except IntegrityError:
+                await self.session.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Referenced devices or modules changed during insert, retry",
+                )
+            if self.publisher is not None:
+                await self.publisher.publish(
+                    [EventRetrieve(id=id_, **row) for id_, row in zip(ids, rows)]
+                )
+        return EventBulkResult(created=len(rows), errors=errors)
+
+    async def _update_rollups(self, rows: Sequence[dict[str, Any]]) -> None:
+        stmt = pg_insert(ModuleEventRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY,
+            set_={
+                "event_count": ModuleEventRollup.event_count + stmt.excluded.event_count
+            },
+        )
+        await self.session.execute(stmt, build_rollup_rows(rows))
+
+    async def get_rollups(
+        self, filters: EventFilter, granularity: RollupGranularity
+    ) -> Sequence[Row]:
+        """Whole buckets overlapping the from and to of the filters."""
+        filters = bucket_window(filters, granularity)
+        # Plain rows instead of ORM instances, dashboards read thousands of buckets
+        stmt = (
+            Select(*ModuleEventRollup.__table__.columns)
+            .where(ModuleEventRollup.granularity == granularity.value)
+            .order_by(
+                ModuleEventRollup.bucket_start,
+                ModuleEventRollup.device_id,
+                ModuleEventRollup.module_id,
+                ModuleEventRollup.priority,
+            )
+        )
+        if filters.device_id is not None:
+            stmt = stmt.where(ModuleEventRollup.device_id == filters.device_id)
+        if filters.module_id is not None:
+            stmt = stmt.where(ModuleEventRollup.module_id == filters.module_id)
+        if filters.priority is not None:
+            stmt = stmt.where(ModuleEventRollup.priority == filters.priority)
+        if filters.from_ is not None:
+            stmt = stmt.where(ModuleEventRollup.bucket_start >= filters.from_)
+        if filters.to is not None:
+            stmt = stmt.where(ModuleEventRollup.bucket_start < filters.to)
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def aggregate_raw(
+        self, filters: EventFilter, granularity: RollupGranularity
+    ) -> Sequence[Row]:
+        """Same buckets as get_rollups, computed by scanning raw events."""
+        filters = bucket_window(filters, granularity)
+        bucket_start = func.timezone(
+            "UTC",
+            func.date_trunc(
+                granularity.value.lower(),
+                func.timezone("UTC", ModuleEvent.event_timestamp),
+            ),
+        ).label("bucket_start")
+        stmt = (
+            Select(
+                literal(granularity.value).label("granularity"),
+                bucket_start,
+                ModuleEvent.device_id,
+                ModuleEvent.module_id,
+                ModuleEvent.priority,
+                func.count().label("event_count"),
+            )
+            .where(*self.filter_clauses(filters))
+            .group_by(
+                bucket_start,
+                ModuleEvent.device_id,
+                ModuleEvent.module_id,
+                ModuleEvent.priority,
+            )
+            .order_by(
+                bucket_start,
+                ModuleEvent.device_id,
+                ModuleEvent.module_id,
+                ModuleEvent.priority,
+            )
+        )
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def _check_references(
+        self, events: Sequence[EventCreate]
+    ) -> list[EventBulkError]:
+        device_ids = {event.device_id for event in events}
+        module_ids = {event.module_id for event in events}
+        existing_devices = set(
+            await self.session.scalars(
+                Select(Device.id).where(Device.id.in_(device_ids))
+            )
+        )
+        existing_modules = set(
+            await self.session.scalars(
+                Select(AnalyticsModule.id).where(AnalyticsModule.id.in_(module_ids))
+            )
+        )
+
+        errors = []
+        for index, event in enumerate(events):
+            row_errors = []
+            if event.device_id not in existing_devices:
+                row_errors.append(
+                    {
+                        "type": "not_found",
+                        "loc": ["device_id"],
+                        "msg": f"Device with id {event.device_id} not found",
+                    }
+                )
+            if event.module_id not in existing_modules:
+                row_errors.append(
+                    {
+                        "type": "not_found",
+                        "loc": ["module_id"],
+                        "msg": f"AnalyticsModule with id {event.module_id} not found",
+                    }
+                )
+            if row_errors:
+                errors.append(EventBulkError(index=index, errors=row_errors))
+        return errors
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Annotated, Any, Generic, Sequence, TypeVar
+
+from fastapi import HTTPException, Query, Request, Response
+from starlette import status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+ItemType = TypeVar("ItemType")
+
+
+@dataclass
+class Page(Generic[ItemType]):
+    items: Sequence[ItemType]
+    next_cursor: str | None = None
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        values = None
+    if not isinstance(values, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+    return values
+
+
+class PageParams:
+    def __init__(
+        self,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        after_id: int | None = None,
+        cursor: Annotated[
+            str | None, Query(description="Opaque cursor from a previous page")
+        ] = None,
+    ) -> None:
+        self.limit = limit
+        self.after_id = after_id
+        self.cursor = decode_cursor(cursor) if cursor else None
+        if self.cursor is not None:
+            after_id = self.cursor.get("id")
+            if not isinstance(after_id, int):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid pagination cursor",
+                )
+            self.after_id = after_id
+
+
+def paginate(page: Page[ItemType], request: Request, response: Response):
+    """Exposes the next page cursor via headers and returns the page items."""
+    if page.next_cursor is not None:
+        next_url = request.url.remove_query_params("after_id").include_query_params(
+            cursor=page.next_cursor
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
@@ -2,8 +2,10 @@ import datetime
 import os
 import pathlib
 import sys
+import uuid
 
 import pytest
+import redis.asyncio as redis
 from alembic.command import downgrade, upgrade
 from alembic.config import Config
 from httpx import AsyncClient, ASGITransport
@@ -15,23 +17,30 @@ from sqlalchemy.ext.asyncio import (
     AsyncSession,
 )
 
-from src.config.database import get_db_session
-from src.config.project_settings import settings
-from src.consts import ModuleType
+from src.config.database import get_db_session, get_session_factory
+from src.config.project_settings import settings, get_settings
+from src.consts import ModuleType, EventIngestion, EventPriority
+from src.external_services.redis.event_stream import lane_key
 from src.external_services.storage.minio_s3 import get_file_storage
 from src.main import app
 from src.models import Device, AnalyticsModule
 from src.models.devices import DeviceType, DeviceFileArchive
+from src.services.event_buffer import EventWriteBuffer
+from src.services.event_stream import EventStreamWorker
+from src.services.entity_cache import KEY_PREFIX as ENTITY_KEY_PREFIX
+from src.services.link_cache import PresignedLinkCache
 from tests.mocks.fake_storage import FakeFileStorage
 
 sys.dont_write_bytecode = True
 
 tables_for_trunc = [
+    "devices_archive_object",
     "devices_device",
     "devices_device_file_archive",
     "module_device_association",
     "modules_analytics_module",
     "modules_module_event",
+    "modules_module_event_rollup",
 ]
 
 
@@ -87,7 +96,9 @@ async def db_session():
 @pytest.fixture()
 async def http_client() -> AsyncClient:
     app.dependency_overrides[get_db_session] = _get_test_db_session
+    app.dependency_overrides[get_session_factory] = lambda: test_session_factory
     app.dependency_overrides[get_file_storage] = _get_test_file_storage
+    app.state.link_cache = PresignedLinkCache(ttl=60, max_entries=100, local_ttl=60)
     async with AsyncClient(
         transport=ASGITransport(app=app),
         base_url="http://testserver",
@@ -97,6 +108,49 @@ async def http_client() -> AsyncClient:
     app.dependency_overrides = {}
 
 
+@pytest.fixture()
+async def event_buffer():
+    buffer = EventWriteBuffer(
+        session_factory=test_session_factory,
+        max_size=100,
+        lanes=settings.event_lanes,
+    )
+    buffer.start()
+    app.state.event_buffer = buffer
+    yield buffer
+    await buffer.stop()
+    del app.state.event_buffer
+
+
+@pytest.fixture()
+async def event_stream_worker():
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    stream_settings = settings.model_copy(
+        update={
+            "event_ingestion": EventIngestion.STREAM,
+            "event_stream_key": f"test:events:{uuid.uuid4()}",
+        }
+    )
+    app.dependency_overrides[get_settings] = lambda: stream_settings
+    worker = EventStreamWorker(
+        client=client,
+        session_factory=test_session_factory,
+        key=lane_key(stream_settings.event_stream_key, EventPriority.LOW),
+        group="test-writers",
+        consumer="test-consumer",
+        batch_size=100,
+        block_ms=10,
+        claim_idle_ms=0,
+    )
+    await worker.ensure_group()
+    yield worker
+    await client.delete(
+        *[lane_key(stream_settings.event_stream_key, p) for p in EventPriority],
+        worker.dead_letter_key,
+    )
+    await client.aclose()
+
+
 @pytest.fixture(scope="function", autouse=True)
 async def clean_tables(db_session):
     async with db_session() as session:
@@ -107,6 +161,12 @@ async def clean_tables(db_session):
 
         await session.commit()
 
+    # Ids start over with the tables, cached entities of earlier tests must go too
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    async for key in client.scan_iter(match=f"{ENTITY_KEY_PREFIX}*"):
+        await client.delete(key)
+    await client.aclose()
+
 
 @pytest.fixture()
 async def fake_device(db_session):
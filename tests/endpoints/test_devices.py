@@ -4,6 +4,8 @@ import pytest
 from httpx import AsyncClient
 from starlette import status
 
+from src.models import DeviceFileArchive
+
 
 @pytest.mark.asyncio(loop_scope="session")
 async def test_get_device_list(http_client: AsyncClient, fake_device):
@@ -112,3 +114,154 @@ async def test_list_connected_modules(
     assert response.status_code == status.HTTP_200_OK
     assert response.json()[0]["name"] == "Test module"
     assert len(response.json()) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_device_list_pagination(http_client: AsyncClient):
+    for i in range(5):
+        body = {
+            "name": f"Camera {i}",
+            "source": "rtsp://1.2.3.4:1234",
+            "device_type": "CAMERA",
+            "additional_settings": None,
+        }
+        await http_client.post(url="/api/v1/devices/", json=body)
+
+    response = await http_client.get(url="/api/v1/devices/?limit=2")
+    assert response.status_code == status.HTTP_200_OK
+    assert [device["id"] for device in response.json()] == [1, 2]
+    assert 'rel="next"' in response.headers["Link"]
+
+    response = await http_client.get(
+        url="/api/v1/devices/",
+        params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    assert [device["id"] for device in response.json()] == [3, 4]
+
+    response = await http_client.get(url="/api/v1/devices/?limit=2&after_id=4")
+    assert [device["id"] for device in response.json()] == [5]
+    assert "Link" not in response.headers
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_device_list_invalid_cursor(http_client: AsyncClient):
+    response = await http_client.get(url="/api/v1/devices/?cursor=not-a-cursor")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_device_archive_timeline(http_client: AsyncClient, fake_device):
+    segments = [
+        # A long recording that started well before the window
+        ("2025-03-14T00:00:00+00:00", "2025-03-14T12:30:00+00:00"),
+        ("2025-03-14T11:00:00+00:00", "2025-03-14T11:59:00+00:00"),
+        ("2025-03-14T12:00:00+00:00", "2025-03-14T12:10:00+00:00"),
+        ("2025-03-14T12:10:00+00:00", "2025-03-14T12:20:00+00:00"),
+        ("2025-03-14T13:00:00+00:00", "2025-03-14T13:10:00+00:00"),
+    ]
+    for start, end in segments:
+        await http_client.post(
+            url="/api/v1/archive/",
+            json={"device_id": 1, "timestamp_start": start, "timestamp_end": end},
+        )
+
+    window = {"from": "2025-03-14T12:00:00Z", "to": "2025-03-14T13:00:00Z"}
+    response = await http_client.get(url="/api/v1/devices/1/archive/", params=window)
+    assert response.status_code == status.HTTP_200_OK
+    assert [segment["id"] for segment in response.json()] == [1, 3, 4]
+
+    response = await http_client.get(
+        url="/api/v1/devices/1/archive/", params={**window, "limit": 2}
+    )
+    assert [segment["id"] for segment in response.json()] == [1, 3]
+    response = await http_client.get(
+        url="/api/v1/devices/1/archive/",
+        params={**window, "limit": 2, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    assert [segment["id"] for segment in response.json()] == [4]
+
+    # Naive bounds are taken as UTC
+    window = {"from": "2025-03-14T12:00:00", "to": "2025-03-14T13:00:00Z"}
+    response = await http_client.get(url="/api/v1/devices/1/archive/", params=window)
+    assert response.status_code == status.HTTP_200_OK
+    assert [segment["id"] for segment in response.json()] == [1, 3, 4]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_device_archive_timeline_invalid(http_client: AsyncClient, fake_device):
+    window = {"from": "2025-03-14T13:00:00Z", "to": "2025-03-14T12:00:00Z"}
+    response = await http_client.get(url="/api/v1/devices/1/archive/", params=window)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    window = {"from": "2025-03-14T13:00:00", "to": "2025-03-14T12:00:00Z"}
+    response = await http_client.get(
+        url="/api/v1/devices/1/archive/clip/", params=window
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    window = {"from": "2025-03-14T12:00:00Z", "to": "2025-03-14T13:00:00Z"}
+    response = await http_client.get(url="/api/v1/devices/2/archive/", params=window)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_device_archive_clip(http_client: AsyncClient, db_session, fake_device):
+    async with db_session() as session:
+        for start, end, filepath in [
+            ("2025-03-14T11:55:00+00:00", "2025-03-14T12:05:00+00:00", None),
+            (
+                "2025-03-14T12:05:00+00:00",
+                "2025-03-14T12:15:00+00:00",
+                "correct_filepath",
+            ),
+            (
+                "2025-03-14T12:15:00+00:00",
+                "2025-03-14T12:25:00+00:00",
+                "correct_filepath",
+            ),
+            (
+                "2025-03-14T12:25:00+00:00",
+                "2025-03-14T12:35:00+00:00",
+                "correct_filepath",
+            ),
+        ]:
+            session.add(
+                DeviceFileArchive(
+                    device_id=1,
+                    filepath=filepath,
+                    timestamp_start=datetime.fromisoformat(start),
+                    timestamp_end=datetime.fromisoformat(end),
+                )
+            )
+        await session.commit()
+
+    window = {"from": "2025-03-14T12:00:00Z", "to": "2025-03-14T12:20:00Z"}
+    response = await http_client.get(
+        url="/api/v1/devices/1/archive/clip/", params=window
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"test bytes string" * 2
+    assert response.headers["X-Clip-Start"] == "2025-03-14T12:05:00+00:00"
+    assert response.headers["X-Clip-End"] == "2025-03-14T12:25:00+00:00"
+
+    window = {"from": "2025-03-14T13:00:00Z", "to": "2025-03-14T14:00:00Z"}
+    response = await http_client.get(
+        url="/api/v1/devices/1/archive/clip/", params=window
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cached_device_is_invalidated(http_client: AsyncClient, fake_device):
+    assert (await http_client.get(url="/api/v1/devices/1/")).status_code == 200
+    assert len((await http_client.get(url="/api/v1/devices/")).json()) == 1
+
+    body = {"name": "Renamed Camera", "device_type": "CAMERA", "source": "rtsp://x"}
+    await http_client.put(url="/api/v1/devices/1/", json=body)
+    response = await http_client.get(url="/api/v1/devices/1/")
+    assert response.json()["name"] == "Renamed Camera"
+    response = await http_client.get(url="/api/v1/devices/")
+    assert response.json()[0]["name"] == "Renamed Camera"
+
+    await http_client.delete(url="/api/v1/devices/1/")
+    response = await http_client.get(url="/api/v1/devices/1/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert (await http_client.get(url="/api/v1/devices/")).json() == []
@@ -1,10 +1,23 @@
 import datetime
+import hashlib
 import io
+import json
+from tempfile import SpooledTemporaryFile
 
 import pytest
 from httpx import AsyncClient
+from prometheus_client import REGISTRY
 from starlette import status
 
+from src.config.project_settings import get_settings, settings
+from src.external_services.storage.base import UploadLink
+from src.external_services.storage.disk_cache import DiskCachedStorage
+from src.external_services.storage.minio_s3 import get_file_storage
+from src.main import app
+from src.external_services.storage.local import LocalFileStorage
+from src.models import ArchiveObject, DeviceFileArchive
+from tests.mocks.fake_storage import FakeFileStorage
+
 
 @pytest.mark.asyncio(loop_scope="session")
 async def test_get_archive_list(http_client: AsyncClient, fake_file_archive):
@@ -85,13 +98,22 @@ async def test_update_file_archive(http_client: AsyncClient, fake_file_archive):
 
 
 @pytest.mark.asyncio(loop_scope="session")
-async def test_delete_file_archive(http_client: AsyncClient, fake_file_archive):
+async def test_delete_file_archive(
+    http_client: AsyncClient, fake_file_archive, db_session
+):
     response = await http_client.get(url="/api/v1/archive/1/")
     assert response.status_code == status.HTTP_200_OK
     response = await http_client.delete(url="/api/v1/archive/1/")
     assert response.status_code == status.HTTP_204_NO_CONTENT
     response = await http_client.get(url="/api/v1/archive/1/")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await http_client.get(url="/api/v1/archive/")
+    assert response.json() == []
+
+    # The row stays until the archive GC removes its file
+    async with db_session() as session:
+        archive = await session.get(DeviceFileArchive, 1)
+        assert archive.is_deleted
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -102,6 +124,225 @@ async def test_upload_file_to_archive(http_client: AsyncClient, fake_file_archiv
         files=files,
     )
     assert response.status_code == status.HTTP_200_OK
+    assert response.json()["filepath"] == (
+        hashlib.sha256(b"some binary data").hexdigest() + ".mp4"
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_is_hashed_while_received(
+    http_client: AsyncClient, fake_file_archive, monkeypatch
+):
+    # Large enough to be spooled to disk
+    payload = b"frame" * 500_000
+    reads = []
+    original_read = SpooledTemporaryFile.read
+    monkeypatch.setattr(
+        SpooledTemporaryFile,
+        "read",
+        lambda self, *args: reads.append(args) or original_read(self, *args),
+    )
+    files = {"file": ("long.mp4", io.BytesIO(payload), "video/mp4")}
+    response = await http_client.post(url="/api/v1/archive/1/upload/", files=files)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["filepath"] == hashlib.sha256(payload).hexdigest() + ".mp4"
+    # The fake storage doesn't read the file, so nothing else did either
+    assert reads == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_file_requires_file_field(
+    http_client: AsyncClient, fake_file_archive
+):
+    response = await http_client.post(
+        url="/api/v1/archive/1/upload/", data={"name": "x"}, files={"other": b"x"}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await http_client.post(url="/api/v1/archive/1/upload/", json={})
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+class CountingLocalStorage(LocalFileStorage):
+    uploads = 0
+
+    async def upload_file(self, payload, path):
+        self.uploads += 1
+        await super().upload_file(payload, path)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repeated_uploads_are_stored_once(
+    http_client: AsyncClient, fake_file_archive, db_session, tmp_path
+):
+    storage = CountingLocalStorage(str(tmp_path), "/api/v1/files/", "secret")
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    now = datetime.datetime.now(tz=datetime.UTC).isoformat()
+    await http_client.post(
+        url="/api/v1/archive/",
+        json={"device_id": 1, "timestamp_start": now, "timestamp_end": now},
+    )
+
+    for archive_id in (1, 1, 2):
+        files = {"file": ("retry.mp4", io.BytesIO(b"same video"), "video/mp4")}
+        response = await http_client.post(
+            url=f"/api/v1/archive/{archive_id}/upload/", files=files
+        )
+        assert response.status_code == status.HTTP_200_OK
+    filepath = response.json()["filepath"]
+    assert storage.uploads == 1
+
+    async with db_session() as session:
+        assert (await session.get(ArchiveObject, filepath)).ref_count == 2
+    await http_client.delete(url="/api/v1/archive/1/")
+    async with db_session() as session:
+        assert (await session.get(ArchiveObject, filepath)).ref_count == 1
+
+
+class DirectUploadStorage(LocalFileStorage):
+    async def get_upload_link(self, path, size, sha256):
+        return UploadLink(
+            url=f"https://storage/{path}", headers={"Content-Length": str(size)}
+        )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_direct_upload(
+    http_client: AsyncClient, fake_file_archive, db_session, tmp_path
+):
+    storage = DirectUploadStorage(str(tmp_path), "/api/v1/files/", "secret")
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    payload = b"direct video"
+    upload = {
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "size": len(payload),
+        "filename": "clip.MP4",
+    }
+    response = await http_client.post(url="/api/v1/archive/1/upload_link/", json=upload)
+    assert response.status_code == status.HTTP_200_OK
+    path = response.json()["path"]
+    assert path == upload["sha256"] + ".mp4"
+    assert response.json()["url"] == f"https://storage/{path}"
+    assert response.json()["headers"] == {"Content-Length": str(len(payload))}
+
+    # Other content stored under the hash is refused and removed
+    await storage.upload_file(io.BytesIO(b"forged video"), path)
+    etag = (await storage.get_file_info(path)).etag
+    response = await http_client.post(
+        url="/api/v1/archive/1/confirm_upload/",
+        json={"path": path, "size": len(payload), "etag": etag},
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert await storage.get_file_info(path) is None
+    async with db_session() as session:
+        assert await session.get(ArchiveObject, path) is None
+
+    # The client PUTs the file to the link
+    await storage.upload_file(io.BytesIO(payload), path)
+    etag = (await storage.get_file_info(path)).etag
+
+    response = await http_client.post(
+        url="/api/v1/archive/1/confirm_upload/",
+        json={"path": path, "size": len(payload) + 1, "etag": etag},
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = await http_client.post(
+        url="/api/v1/archive/1/confirm_upload/",
+        json={"path": path, "size": len(payload), "etag": etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["filepath"] == path
+    async with db_session() as session:
+        assert (await session.get(ArchiveObject, path)).ref_count == 1
+
+    # Stored content needs no second upload
+    response = await http_client.post(url="/api/v1/archive/1/upload_link/", json=upload)
+    assert response.json() == {"path": path, "url": None, "headers": {}, "etag": etag}
+    response = await http_client.post(
+        url="/api/v1/archive/1/confirm_upload/",
+        json={"path": path, "size": len(payload), "etag": etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_direct_upload_unsupported(http_client: AsyncClient, fake_file_archive):
+    upload = {"sha256": "0" * 64, "size": 1}
+    response = await http_client.post(url="/api/v1/archive/1/upload_link/", json=upload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.fixture()
+async def chunked_storage(http_client: AsyncClient, tmp_path):
+    storage = LocalFileStorage(str(tmp_path), "/api/v1/files/", "secret")
+    chunked_settings = settings.model_copy(update={"archive_upload_chunk_size": 4})
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    app.dependency_overrides[get_settings] = lambda: chunked_settings
+    yield storage
+
+
+async def _put_chunk(http_client: AsyncClient, url: str, number: int, chunk: bytes):
+    return await http_client.put(
+        url=f"{url}chunks/{number}/",
+        content=chunk,
+        headers={"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()},
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_resumable_upload(
+    http_client: AsyncClient, fake_file_archive, db_session, chunked_storage
+):
+    response = await http_client.post(
+        url="/api/v1/archive/1/uploads/", json={"size": 10, "filename": "long.mp4"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["chunk_count"] == 3
+    url = f"/api/v1/archive/1/uploads/{response.json()['upload_id']}/"
+
+    response = await http_client.put(
+        url=f"{url}chunks/2/",
+        content=b"4567",
+        headers={"X-Chunk-SHA256": hashlib.sha256(b"4566").hexdigest()},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    await _put_chunk(http_client, url, 3, b"89")
+    await _put_chunk(http_client, url, 1, b"0123")
+
+    # After an interruption only the missing chunk is sent again
+    response = await http_client.get(url=url)
+    assert response.json()["received"] == [1, 3]
+    assert response.json()["received_bytes"] == 6
+    response = await http_client.post(url=f"{url}complete/")
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = await _put_chunk(http_client, url, 2, b"4567")
+    assert response.json()["received"] == [1, 2, 3]
+    response = await http_client.post(url=f"{url}complete/")
+    assert response.status_code == status.HTTP_200_OK
+    filepath = response.json()["filepath"]
+    assert filepath.startswith("uploads/") and filepath.endswith(".mp4")
+    assert await chunked_storage.get_file(filepath) == b"0123456789"
+    async with db_session() as session:
+        assert (await session.get(ArchiveObject, filepath)).ref_count == 1
+    assert (await http_client.get(url=url)).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_resumable_upload_abort(
+    http_client: AsyncClient, fake_file_archive, chunked_storage, tmp_path
+):
+    response = await http_client.post(
+        url="/api/v1/archive/1/uploads/", json={"size": 10}
+    )
+    url = f"/api/v1/archive/1/uploads/{response.json()['upload_id']}/"
+    response = await _put_chunk(http_client, url, 1, b"01234")
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    await _put_chunk(http_client, url, 1, b"0123")
+
+    response = await http_client.delete(url=url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert list(tmp_path.rglob("*.*")) == []
+    assert (await http_client.get(url=url)).status_code == status.HTTP_404_NOT_FOUND
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -109,6 +350,65 @@ async def test_download_file_from_archive(http_client: AsyncClient, fake_file_ar
     response = await http_client.get(url="/api/v1/archive/1/download_file/")
     assert response.status_code == status.HTTP_200_OK
     assert response.content == b"test bytes string"
+    assert response.headers["content-length"] == "17"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_download_file_range(http_client: AsyncClient, fake_file_archive):
+    url = "/api/v1/archive/1/download_file/"
+    response = await http_client.get(url=url, headers={"Range": "bytes=5-9"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"bytes"
+    assert response.headers["content-range"] == "bytes 5-9/17"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = await http_client.get(url=url, headers={"Range": "bytes=-6"})
+    assert response.content == b"string"
+
+    response = await http_client.get(url=url, headers={"Range": "bytes=100-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == "bytes */17"
+
+    response = await http_client.get(url=url, headers={"Range": "lines=1-2"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"test bytes string"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_download_file_multiple_ranges(
+    http_client: AsyncClient, fake_file_archive
+):
+    response = await http_client.get(
+        url="/api/v1/archive/1/download_file/", headers={"Range": "bytes=0-3,11-"}
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    media_type, boundary = response.headers["content-type"].split("; boundary=")
+    assert media_type == "multipart/byteranges"
+    assert int(response.headers["content-length"]) == len(response.content)
+    parts = response.content.split(f"--{boundary}".encode())
+    assert parts[1].endswith(b"Content-Range: bytes 0-3/17\r\n\r\ntest\r\n")
+    assert parts[2].endswith(b"Content-Range: bytes 11-16/17\r\n\r\nstring\r\n")
+    assert parts[3] == b"--\r\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_download_file_if_range(http_client: AsyncClient, fake_file_archive):
+    url = "/api/v1/archive/1/download_file/"
+    response = await http_client.get(
+        url=url, headers={"Range": "bytes=0-3", "If-Range": '"fake-etag"'}
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    response = await http_client.get(
+        url=url,
+        headers={"Range": "bytes=0-3", "If-Range": "Fri, 14 Mar 2025 12:00:00 GMT"},
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+
+    response = await http_client.get(
+        url=url, headers={"Range": "bytes=0-3", "If-Range": '"changed"'}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"test bytes string"
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -124,3 +424,80 @@ async def test_get_download_link(http_client: AsyncClient, fake_file_archive):
     response = await http_client.get(url="/api/v1/archive/1/get_download_link/")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == "file_link"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_download_link_is_cached(http_client: AsyncClient, fake_file_archive):
+    signed = FakeFileStorage.links_signed
+    for _ in range(3):
+        response = await http_client.get(url="/api/v1/archive/1/get_download_link/")
+        assert response.json() == "file_link"
+    assert FakeFileStorage.links_signed == signed + 1
+
+    await http_client.delete(url="/api/v1/archive/1/")
+    assert await app.state.link_cache.get("correct_filepath") is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_archive(http_client: AsyncClient, fake_file_archive):
+    response = await http_client.get(url="/api/v1/archive/export/?device_id=1")
+    assert response.status_code == status.HTTP_200_OK
+    rows = response.text.splitlines()
+    assert len(rows) == 1
+    assert json.loads(rows[0])["filepath"] == "correct_filepath"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_download_links(http_client: AsyncClient, fake_file_archive):
+    await http_client.post(
+        url="/api/v1/archive/",
+        json={
+            "device_id": 1,
+            "timestamp_start": "2025-03-14T12:00:00Z",
+            "timestamp_end": "2025-03-14T12:10:00Z",
+        },
+    )
+    response = await http_client.post(
+        url="/api/v1/archive/download_links/", json={"ids": [1, 2, 3, 1]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "1": {"link": "file_link", "error": None},
+        "2": {"link": None, "error": "This instance has no file"},
+        "3": {"link": None, "error": "DeviceFileArchive with id 3 not found"},
+    }
+
+    response = await http_client.post(
+        url="/api/v1/archive/download_links/", json={"ids": list(range(501))}
+    )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_disk_cache_hit_is_sent_as_file(
+    http_client: AsyncClient, fake_file_archive, tmp_path
+):
+    storage = DiskCachedStorage(FakeFileStorage(), str(tmp_path), 100, 50)
+    await storage.open()
+    app.dependency_overrides[get_file_storage] = lambda: storage
+
+    response = await http_client.get(url="/api/v1/archive/1/download_file/")
+    assert response.content == b"test bytes string"
+    hits = (
+        REGISTRY.get_sample_value(
+            "storage_disk_cache_requests_total", {"result": "hit"}
+        )
+        or 0
+    )
+
+    response = await http_client.get(
+        url="/api/v1/archive/1/download_file/", headers={"Range": "bytes=5-9"}
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"bytes"
+    assert (
+        REGISTRY.get_sample_value(
+            "storage_disk_cache_requests_total", {"result": "hit"}
+        )
+        == hits + 1
+    )
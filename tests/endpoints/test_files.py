@@ -0,0 +1,45 @@
+import io
+
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from src.config.project_settings import settings, get_settings
+from src.external_services.storage.local import LocalFileStorage
+from src.external_services.storage.minio_s3 import get_file_storage
+from src.main import app
+
+
+@pytest.fixture()
+async def local_storage(http_client: AsyncClient, tmp_path):
+    storage = LocalFileStorage(str(tmp_path), settings.local_storage_url, "secret")
+    await storage.open()
+    local_settings = settings.model_copy(update={"local_storage_secret": "secret"})
+    app.dependency_overrides[get_settings] = lambda: local_settings
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    yield storage
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_signed_local_link(http_client: AsyncClient, local_storage):
+    await local_storage.upload_file(io.BytesIO(b"recording"), "camera/1.mp4")
+    link = await local_storage.get_file_link("camera/1.mp4")
+
+    response = await http_client.get(url=link)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"recording"
+
+    response = await http_client.get(url=link, headers={"Range": "bytes=0-3"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"reco"
+
+    response = await http_client.get(url=link.replace("1.mp4", "2.mp4"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_expired_local_link(http_client: AsyncClient, local_storage):
+    local_storage.link_expires = -1
+    link = await local_storage.get_file_link("camera/1.mp4")
+    response = await http_client.get(url=link)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,255 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from src.config.project_settings import settings
+from src.consts import RollupGranularity
+from src.main import app
+from src.schemas.module_events import EventFilter
+from src.services.event_buffer import EventWriteBuffer
+from src.services.module_events import EventService
+
+
+def _event(**overrides) -> dict:
+    event = {
+        "artifact_path": "artifacts/frame.jpg",
+        "description": "Person entered",
+        "event_timestamp": "2025-03-14T12:00:00",
+        "name": "enter",
+        "priority": "LOW",
+        "device_id": 1,
+        "module_id": 1,
+    }
+    event.update(overrides)
+    return event
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_create_events(http_client: AsyncClient, fake_device, fake_module):
+    body = [_event(name=f"event {i}") for i in range(50)]
+    response = await http_client.post(url="/api/v1/events/bulk/", json=body)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == {"created": 50, "queued": 0, "errors": []}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_create_events_ndjson(
+    http_client: AsyncClient, fake_device, fake_module
+):
+    content = "\n".join(json.dumps(_event()) for _ in range(3)) + "\n"
+    response = await http_client.post(
+        url="/api/v1/events/bulk/",
+        content=content,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["created"] == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_create_events_reports_row_errors(
+    http_client: AsyncClient, fake_device, fake_module
+):
+    body = [
+        _event(),
+        _event(priority="UNKNOWN"),
+        _event(device_id=2),
+        _event(module_id=3),
+        _event(),
+    ]
+    response = await http_client.post(url="/api/v1/events/bulk/", json=body)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["created"] == 2
+    errors = response.json()["errors"]
+    assert [error["index"] for error in errors] == [1, 2, 3]
+    assert errors[0]["errors"][0]["loc"] == ["priority"]
+    assert errors[1]["errors"][0]["loc"] == ["device_id"]
+    assert errors[2]["errors"][0]["loc"] == ["module_id"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_create_events_not_a_list(http_client: AsyncClient):
+    response = await http_client.post(url="/api/v1/events/bulk/", json=_event())
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_events_time_window(
+    http_client: AsyncClient, fake_device, fake_module
+):
+    body = [
+        _event(event_timestamp=f"2025-03-14T12:0{minute}:00+00:00", name=str(minute))
+        for minute in range(6)
+    ]
+    await http_client.post(url="/api/v1/events/bulk/", json=body)
+
+    response = await http_client.get(
+        url="/api/v1/events/",
+        params={
+            "device_id": 1,
+            "from": "2025-03-14T12:01:00+00:00",
+            "to": "2025-03-14T12:04:00+00:00",
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [event["name"] for event in response.json()] == ["1", "2", "3"]
+
+    # Naive bounds are taken as UTC
+    response = await http_client.get(
+        url="/api/v1/events/",
+        params={"from": "2025-03-14T12:01:00", "to": "2025-03-14T12:04:00Z"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [event["name"] for event in response.json()] == ["1", "2", "3"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_events_filters(http_client: AsyncClient, fake_device, fake_module):
+    body = [_event(priority="LOW"), _event(priority="CRITICAL")]
+    await http_client.post(url="/api/v1/events/bulk/", json=body)
+
+    response = await http_client.get(
+        url="/api/v1/events/", params={"priority": "CRITICAL", "module_id": 1}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+    assert response.json()[0]["priority"] == "CRITICAL"
+
+    response = await http_client.get(url="/api/v1/events/", params={"device_id": 2})
+    assert response.json() == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_events_pagination(
+    http_client: AsyncClient, fake_device, fake_module
+):
+    body = [_event(event_timestamp="2025-03-14T12:00:00+00:00") for _ in range(3)]
+    await http_client.post(url="/api/v1/events/bulk/", json=body)
+
+    response = await http_client.get(url="/api/v1/events/", params={"limit": 2})
+    assert [event["id"] for event in response.json()] == [1, 2]
+    response = await http_client.get(
+        url="/api/v1/events/",
+        params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    assert [event["id"] for event in response.json()] == [3]
+    assert "Link" not in response.headers
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_events_invalid_time_window(http_client: AsyncClient):
+    response = await http_client.get(
+        url="/api/v1/events/",
+        params={"from": "2025-03-14T13:00:00", "to": "2025-03-14T12:00:00"},
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_events_ndjson(http_client: AsyncClient, fake_device, fake_module):
+    body = [_event(name=str(i)) for i in range(3)]
+    await http_client.post(url="/api/v1/events/bulk/", json=body)
+
+    response = await http_client.get(url="/api/v1/events/export/?device_id=1")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["0", "1", "2"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_events_csv(http_client: AsyncClient, fake_device, fake_module):
+    await http_client.post(url="/api/v1/events/bulk/", json=[_event(), _event()])
+
+    response = await http_client.get(url="/api/v1/events/export/?format=CSV")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0].startswith("artifact_path,description,event_timestamp")
+    assert len(lines) == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_event_rollups(
+    http_client: AsyncClient, db_session, fake_device, fake_module
+):
+    body = [
+        _event(event_timestamp="2025-03-14T12:00:10+00:00"),
+        _event(event_timestamp="2025-03-14T12:00:50+00:00"),
+        _event(event_timestamp="2025-03-14T12:59:00+00:00"),
+        _event(event_timestamp="2025-03-14T12:59:00+00:00", priority="HIGH"),
+    ]
+    await http_client.post(url="/api/v1/events/bulk/", json=body[:2])
+    await http_client.post(url="/api/v1/events/bulk/", json=body[2:])
+
+    response = await http_client.get(
+        url="/api/v1/events/rollups/", params={"priority": "LOW", "device_id": 1}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [
+        (rollup["bucket_start"], rollup["event_count"]) for rollup in response.json()
+    ] == [("2025-03-14T12:00:00Z", 2), ("2025-03-14T12:59:00Z", 1)]
+
+    response = await http_client.get(
+        url="/api/v1/events/rollups/", params={"granularity": "HOUR"}
+    )
+    assert [
+        (rollup["priority"], rollup["event_count"]) for rollup in response.json()
+    ] == [("HIGH", 1), ("LOW", 3)]
+
+    # Windows are widened to whole buckets, as the raw aggregation does
+    window = {"from": "2025-03-14T12:00:30Z", "to": "2025-03-14T12:58:30Z"}
+    response = await http_client.get(
+        url="/api/v1/events/rollups/", params={**window, "priority": "LOW"}
+    )
+    assert [
+        (rollup["bucket_start"], rollup["event_count"]) for rollup in response.json()
+    ] == [("2025-03-14T12:00:00Z", 2)]
+
+    response = await http_client.get(
+        url="/api/v1/events/rollups/",
+        params={"from": "2025-03-14T12:30:00Z", "granularity": "HOUR"},
+    )
+    assert [
+        (rollup["bucket_start"], rollup["event_count"]) for rollup in response.json()
+    ] == [("2025-03-14T12:00:00Z", 1), ("2025-03-14T12:00:00Z", 3)]
+
+    async with db_session() as session:
+        service = EventService(session)
+        filters = EventFilter(**window)
+        for granularity in RollupGranularity:
+            rollups = await service.get_rollups(filters, granularity)
+            raw = await service.aggregate_raw(filters, granularity)
+            assert [
+                (row.bucket_start, row.priority, row.event_count) for row in rollups
+            ] == [(row.bucket_start, row.priority, row.event_count) for row in raw]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_event_is_buffered(
+    http_client: AsyncClient, fake_device, fake_module, event_buffer
+):
+    for i in range(25):
+        response = await http_client.post(url="/api/v1/events/", json=_event())
+        assert response.status_code == status.HTTP_202_ACCEPTED
+
+    await event_buffer.stop()
+    response = await http_client.get(url="/api/v1/events/")
+    assert len(response.json()) == 25
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_event_buffer_full(http_client: AsyncClient):
+    buffer = EventWriteBuffer(
+        session_factory=None, max_size=1, lanes=settings.event_lanes
+    )
+    app.state.event_buffer = buffer
+    try:
+        response = await http_client.post(url="/api/v1/events/", json=_event())
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        response = await http_client.post(url="/api/v1/events/", json=_event())
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    finally:
+        del app.state.event_buffer
@@ -1,10 +1,22 @@
-from typing import BinaryIO
+from datetime import datetime, UTC
+from typing import AsyncIterator, BinaryIO
 
-from src.external_services.storage.base import FileStorage
+from src.external_services.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    ByteRange,
+    FileInfo,
+    FileStorage,
+    FileStream,
+    StoredFile,
+)
+
+ETAG = '"fake-etag"'
+LAST_MODIFIED = datetime(2025, 3, 14, 12, 0, tzinfo=UTC)
 
 
 class FakeFileStorage(FileStorage):
     file_uploaded = False
+    links_signed = 0
 
     async def upload_file(self, payload: BinaryIO, path: str) -> None:
         return None
@@ -15,8 +27,36 @@ class FakeFileStorage(FileStorage):
             return payload
         return None
 
+    async def get_file_info(self, path: str) -> FileInfo | None:
+        payload = await self.get_file(path)
+        if payload is None:
+            return None
+        return FileInfo(size=len(payload), etag=ETAG, last_modified=LAST_MODIFIED)
+
+    async def stream_file(
+        self,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        byte_range: ByteRange | None = None,
+    ) -> FileStream | None:
+        payload = await self.get_file(path)
+        if payload is None:
+            return None
+        if byte_range is not None:
+            payload = payload[byte_range[0] : byte_range[1] + 1]
+
+        async def chunks():
+            for start in range(0, len(payload), chunk_size):
+                yield payload[start : start + chunk_size]
+
+        return FileStream(size=len(payload), chunks=chunks())
+
     async def delete_file(self, path: str) -> None:
         return None
 
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        yield StoredFile(path="correct_filepath", size=17, last_modified=LAST_MODIFIED)
+
     async def get_file_link(self, path: str) -> str:
+        FakeFileStorage.links_signed += 1
         return "file_link"
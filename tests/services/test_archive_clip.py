@@ -0,0 +1,53 @@
+import pytest
+
+from src.external_services.storage.base import FileStream
+from src.services.archive_clip import stream_segments
+from tests.mocks.fake_storage import FakeFileStorage
+
+
+class SegmentStorage(FakeFileStorage):
+    def __init__(self, events: list[str]) -> None:
+        self.events = events
+
+    async def stream_file(self, path, chunk_size=1, byte_range=None):
+        if path == "missing":
+            return None
+        self.events.append(f"open {path}")
+
+        async def chunks():
+            for number in range(3):
+                yield f"{path}{number}".encode()
+
+        return FileStream(size=6, chunks=chunks())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_segments_are_stitched_in_order():
+    events = []
+    storage = SegmentStorage(events)
+    chunks = []
+    async for chunk in stream_segments(storage, ["a", "b"]):
+        chunks.append(chunk)
+        events.append(f"send {chunk.decode()}")
+
+    assert b"".join(chunks) == b"a0a1a2b0b1b2"
+    # The next segment is opened before the previous one has been sent
+    assert events.index("open b") < events.index("send a2")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_read_ahead_is_bounded():
+    events = []
+    storage = SegmentStorage(events)
+    async for _ in stream_segments(storage, ["a", "b", "c"], prefetch_chunks=1):
+        break
+    assert "open c" not in events
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_missing_segment_fails_the_clip():
+    chunks = []
+    with pytest.raises(FileNotFoundError):
+        async for chunk in stream_segments(SegmentStorage([]), ["a", "missing", "b"]):
+            chunks.append(chunk)
+    assert b"".join(chunks) == b"a0a1a2"
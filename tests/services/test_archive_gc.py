@@ -0,0 +1,86 @@
+import datetime
+import io
+import os
+
+import pytest
+from sqlalchemy import Select
+
+from src.external_services.storage.local import LocalFileStorage
+from src.models import ArchiveObject, DeviceFileArchive
+from src.services.archive_gc import ArchiveGarbageCollector
+
+START = datetime.datetime(2025, 3, 14, 12, 0, tzinfo=datetime.UTC)
+OLD = (START - datetime.timedelta(days=30)).timestamp()
+
+
+async def _storage(tmp_path, *paths: str) -> LocalFileStorage:
+    storage = LocalFileStorage(str(tmp_path), "/api/v1/files/", "secret")
+    await storage.open()
+    for path in paths:
+        await storage.upload_file(io.BytesIO(b"video"), path)
+        os.utime(storage.resolve(path), (OLD, OLD))
+    return storage
+
+
+async def _add(db_session, *objects: tuple[str, int], deleted_archives: int = 0):
+    async with db_session() as session:
+        for path, ref_count in objects:
+            session.add(ArchiveObject(path=path, ref_count=ref_count))
+        for _ in range(deleted_archives):
+            session.add(
+                DeviceFileArchive(
+                    device_id=1,
+                    filepath="released",
+                    is_deleted=True,
+                    timestamp_start=START,
+                    timestamp_end=START + datetime.timedelta(minutes=1),
+                )
+            )
+        await session.commit()
+
+
+async def _paths(storage: LocalFileStorage) -> list[str]:
+    return sorted([stored_file.path async for stored_file in storage.list_files()])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_collect_deleted(db_session, fake_device, tmp_path):
+    storage = await _storage(tmp_path, "released", "shared", "live")
+    await _add(
+        db_session, ("released", 0), ("shared", 2), ("live", 1), deleted_archives=3
+    )
+    collector = ArchiveGarbageCollector(db_session, storage, batch_size=2)
+
+    stats = await collector.collect_deleted()
+
+    assert (stats.deleted_rows, stats.deleted_files) == (3, 1)
+    assert await _paths(storage) == ["live", "shared"]
+    async with db_session() as session:
+        assert (await session.scalars(Select(DeviceFileArchive))).all() == []
+        objects = await session.scalars(Select(ArchiveObject.path))
+        assert sorted(objects.all()) == ["live", "shared"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_collect_orphans(db_session, fake_device, tmp_path):
+    storage = await _storage(tmp_path, "orphan", "released", "live")
+    await storage.upload_file(io.BytesIO(b"video"), "uploading")
+    await _add(db_session, ("released", 0), ("live", 1))
+    collector = ArchiveGarbageCollector(db_session, storage, batch_size=2)
+
+    stats = await collector.collect_orphans()
+
+    assert stats.deleted_files == 1
+    assert await _paths(storage) == ["live", "released", "uploading"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_dry_run_deletes_nothing(db_session, fake_device, tmp_path):
+    storage = await _storage(tmp_path, "released", "orphan")
+    await _add(db_session, ("released", 0), deleted_archives=1)
+    collector = ArchiveGarbageCollector(db_session, storage, dry_run=True)
+
+    stats = await collector.collect_deleted()
+    assert (stats.deleted_rows, stats.deleted_files) == (1, 1)
+    assert (await collector.collect_orphans()).deleted_files == 1
+    assert await _paths(storage) == ["orphan", "released"]
@@ -0,0 +1,41 @@
+import uuid
+
+import pytest
+import redis.asyncio as redis
+
+from src.config.project_settings import settings
+from src.external_services.redis.archive_uploads import (
+    KEY_PREFIX,
+    UploadSession,
+    UploadSessionStore,
+)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_chunks_are_refused_once_the_upload_is_claimed():
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    sessions = UploadSessionStore(client, ttl=60)
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        archive_id=1,
+        path="uploads/x",
+        storage_upload_id="s3-upload",
+        size=10,
+        chunk_size=4,
+    )
+    try:
+        await sessions.create(upload)
+        assert await sessions.add_chunk(upload, 1, "etag-1")
+
+        assert await sessions.claim(upload)
+        assert (await sessions.get(upload.id)).claimed
+        assert not await sessions.add_chunk(upload, 2, "etag-2")
+
+        # A chunk arriving after the upload finished doesn't bring it back
+        await sessions.delete(upload)
+        assert not await sessions.add_chunk(upload, 2, "etag-2")
+        assert not await client.exists(KEY_PREFIX + upload.id)
+        assert upload.chunks == {1: "etag-1"}
+    finally:
+        await client.delete(KEY_PREFIX + upload.id)
+        await client.aclose()
@@ -0,0 +1,43 @@
+import pytest
+
+from src.external_services.storage.base import FileStream
+from src.services.byte_ranges import MultipartByteranges
+from tests.mocks.fake_storage import FakeFileStorage
+
+
+class VanishingStorage(FakeFileStorage):
+    """Serves the first ranged read of a file, then acts as if it was deleted."""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        self.reads = 0
+
+    async def stream_file(self, path, chunk_size=1, byte_range=None):
+        self.reads += 1
+        if self.reads > 1:
+            return None
+        start, end = byte_range
+
+        async def chunks():
+            yield self.content[start : end + 1]
+
+        return FileStream(size=end - start + 1, chunks=chunks())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_file_deleted_mid_response_fails_the_body():
+    body = MultipartByteranges(
+        VanishingStorage(b"0123456789"),
+        "file.bin",
+        ranges=[(0, 1), (5, 6)],
+        size=10,
+        content_type="application/octet-stream",
+    )
+    chunks = []
+    with pytest.raises(FileNotFoundError):
+        async for chunk in body:
+            chunks.append(chunk)
+    sent = b"".join(chunks)
+    assert b"01\r\n" in sent
+    assert b"56" not in sent
+    assert len(sent) < body.content_length
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.external_services.storage.disk_cache import DiskCachedStorage
+from tests.mocks.fake_storage import FakeFileStorage
+
+
+class CountingStorage(FakeFileStorage):
+    def __init__(self, files: dict[str, bytes]) -> None:
+        self.files = files
+        self.reads = 0
+
+    async def get_file(self, path: str) -> bytes | None:
+        self.reads += 1
+        return self.files.get(path)
+
+
+async def _read(storage: DiskCachedStorage, path: str, byte_range=None) -> bytes:
+    file_stream = await storage.stream_file(path, chunk_size=4, byte_range=byte_range)
+    return b"".join([chunk async for chunk in file_stream.chunks])
+
+
+def _hits() -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "storage_disk_cache_requests_total", {"result": "hit"}
+        )
+        or 0
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_disk_cache_serves_repeated_reads(tmp_path):
+    backend = CountingStorage({"a": b"0123456789"})
+    storage = DiskCachedStorage(
+        backend, str(tmp_path), max_size=100, max_object_size=50
+    )
+    await storage.open()
+    hits = _hits()
+
+    assert await _read(storage, "a") == b"0123456789"
+    assert await _read(storage, "a") == b"0123456789"
+    assert await _read(storage, "a", byte_range=(2, 5)) == b"2345"
+    assert backend.reads == 1
+    assert _hits() - hits == 2
+    assert REGISTRY.get_sample_value("storage_disk_cache_hit_ratio") == 2 / 3
+    assert await storage.get_local_path("a") is not None
+
+    await storage.delete_file("a")
+    assert await storage.get_local_path("a") is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_disk_cache_evicts_least_recently_used(tmp_path):
+    backend = CountingStorage({name: b"x" * 40 for name in ("a", "b", "c")})
+    storage = DiskCachedStorage(
+        backend, str(tmp_path), max_size=100, max_object_size=50
+    )
+    await storage.open()
+
+    await _read(storage, "a")
+    await _read(storage, "b")
+    await _read(storage, "a")
+    await _read(storage, "c")
+
+    assert storage.size == 80
+    assert await storage.get_local_path("b") is None
+    assert await storage.get_local_path("a") is not None
+
+    # The index survives a restart
+    restarted = DiskCachedStorage(backend, str(tmp_path), 100, 50)
+    await restarted.open()
+    assert restarted.size == 80
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_disk_cache_keeps_pinned_files(tmp_path):
+    backend = CountingStorage({name: b"x" * 40 for name in ("a", "b", "c")})
+    storage = DiskCachedStorage(
+        backend, str(tmp_path), max_size=100, max_object_size=50
+    )
+    await storage.open()
+    await _read(storage, "a")
+    await _read(storage, "b")
+    local_path = await storage.get_local_path("a")
+
+    # Would evict the least recently used file, which is being sent
+    await _read(storage, "b")
+    await _read(storage, "c")
+    assert os.path.exists(local_path)
+    assert await storage.get_local_path("b") is None
+    await storage.delete_file("a")
+    assert os.path.exists(local_path)
+    assert await storage.get_local_path("a") is None
+
+    await storage.release_local_path("a")
+    assert not os.path.exists(local_path)
+    assert storage.size == 40
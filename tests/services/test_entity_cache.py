@@ -0,0 +1,37 @@
+import pytest
+import redis.asyncio as redis
+
+from src.config.project_settings import settings
+from src.services.entity_cache import EntityCache
+
+
+@pytest.fixture()
+async def entity_cache():
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    yield EntityCache(client, {"Device": 60})
+    await client.aclose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_value_read_before_a_write_is_not_served(entity_cache):
+    version, cached = await entity_cache.get_entity("Device", 1)
+    assert cached is None
+
+    # A writer commits while the reader still holds the old row
+    await entity_cache.invalidate("Device", 1)
+    await entity_cache.set_entity("Device", 1, version, {"name": "old"})
+    version, cached = await entity_cache.get_entity("Device", 1)
+    assert cached is None
+
+    await entity_cache.set_entity("Device", 1, version, {"name": "new"})
+    assert (await entity_cache.get_entity("Device", 1))[1] == {"name": "new"}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_write_drops_list_pages(entity_cache):
+    version, _ = await entity_cache.get_page("Device", 10, None)
+    await entity_cache.set_page("Device", 10, None, version, {"items": []})
+    assert (await entity_cache.get_page("Device", 10, None))[1] == {"items": []}
+
+    await entity_cache.invalidate("Device")
+    assert (await entity_cache.get_page("Device", 10, None))[1] is None
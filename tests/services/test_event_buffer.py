@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from pydantic import ValidationError
+
+from src.config.project_settings import EventLaneSettings, Settings
+from src.consts import EventPriority
+from src.schemas.module_events import EventCreate, EventFilter
+from src.services.event_buffer import EventWriteBuffer
+from src.services.module_events import EventService
+
+EVENT = {
+    "artifact_path": "artifacts/frame.jpg",
+    "description": "Person entered",
+    "event_timestamp": "2025-03-14T12:00:00",
+    "name": "enter",
+    "priority": "LOW",
+    "device_id": 1,
+    "module_id": 1,
+}
+
+
+def _latency_count(priority: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "event_ingest_commit_latency_seconds_count", {"priority": priority}
+        )
+        or 0
+    )
+
+
+async def _stored_priorities(db_session) -> list[str]:
+    async with db_session() as session:
+        page = await EventService(session).get_filtered_page(EventFilter(), 100)
+        return [event.priority for event in page.items]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_critical_lane_does_not_wait_for_low_lane(
+    db_session, fake_device, fake_module
+):
+    buffer = EventWriteBuffer(
+        session_factory=db_session,
+        max_size=100,
+        lanes={
+            EventPriority.CRITICAL: EventLaneSettings(
+                flush_rows=10, flush_interval=0, concurrency=2
+            ),
+            EventPriority.LOW: EventLaneSettings(flush_rows=10, flush_interval=60),
+        },
+    )
+    critical_count = _latency_count("CRITICAL")
+    buffer.start()
+    try:
+        buffer.submit(EventCreate.model_validate(EVENT))
+        buffer.submit(EventCreate.model_validate({**EVENT, "priority": "CRITICAL"}))
+        while not await _stored_priorities(db_session):
+            await asyncio.sleep(0.01)
+        assert await _stored_priorities(db_session) == ["CRITICAL"]
+        assert _latency_count("CRITICAL") == critical_count + 1
+    finally:
+        await buffer.stop()
+    assert sorted(await _stored_priorities(db_session)) == ["CRITICAL", "LOW"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_buffer_retries_failed_flush(
+    monkeypatch, db_session, fake_device, fake_module
+):
+    monkeypatch.setattr("src.services.event_buffer.FLUSH_RETRY_DELAY", 0)
+    failures = 1
+
+    def flaky_session_factory():
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise ConnectionError("Database went away")
+        return db_session()
+
+    buffer = EventWriteBuffer(
+        session_factory=flaky_session_factory,
+        max_size=100,
+        lanes={EventPriority.LOW: EventLaneSettings(flush_rows=1, flush_interval=0)},
+    )
+    buffer.start()
+    buffer.submit(EventCreate.model_validate(EVENT))
+    await buffer.stop()
+    assert await _stored_priorities(db_session) == ["LOW"]
+
+
+def test_event_lanes_must_cover_every_priority():
+    with pytest.raises(ValidationError, match="No event lanes for CRITICAL"):
+        Settings(
+            event_lanes={
+                priority: EventLaneSettings(flush_rows=10, flush_interval=0)
+                for priority in EventPriority
+                if priority != EventPriority.CRITICAL
+            }
+        )
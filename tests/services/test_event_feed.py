@@ -0,0 +1,87 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+import redis.asyncio as redis
+
+from src.config.project_settings import settings
+from src.external_services.redis.event_feed import EventFeedPublisher
+from src.schemas.module_events import EventCreate, EventFilter
+from src.services.event_feed import EventFeedHub
+from src.services.module_events import EventService
+
+EVENT = {
+    "id": 1,
+    "artifact_path": "artifacts/frame.jpg",
+    "description": "Person entered",
+    "event_timestamp": "2025-03-14T12:00:00",
+    "name": "enter",
+    "priority": "LOW",
+    "device_id": 1,
+    "module_id": 1,
+}
+
+
+def _hub(buffer_size: int = 10) -> EventFeedHub:
+    return EventFeedHub(client=None, channel="", buffer_size=buffer_size, heartbeat=1)
+
+
+async def _next(stream) -> str:
+    return await asyncio.wait_for(anext(stream), 5)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_feed_dispatch_filters_subscribers():
+    hub = _hub()
+    everything = hub.subscribe(EventFilter())
+    device_two = hub.subscribe(EventFilter(device_id=2))
+    high = hub.subscribe(EventFilter(priority="HIGH"))
+
+    hub.dispatch(json.dumps([EVENT, {**EVENT, "id": 2, "device_id": 2}]))
+
+    assert everything.queue.qsize() == 2
+    assert json.loads(device_two.queue.get_nowait())["id"] == 2
+    assert high.queue.empty()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_feed_drops_slow_subscriber():
+    hub = _hub(buffer_size=2)
+    slow = hub.subscribe(EventFilter())
+    stream = hub.stream(slow)
+
+    hub.dispatch(json.dumps([EVENT, EVENT, EVENT]))
+
+    assert slow not in hub.subscriptions
+    assert (await _next(stream)).startswith("event: dropped")
+    with pytest.raises(StopAsyncIteration):
+        await _next(stream)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_committed_events_reach_live_feed(db_session, fake_device, fake_module):
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    channel = f"test:events:live:{uuid.uuid4()}"
+    hub = EventFeedHub(client, channel, buffer_size=10, heartbeat=5)
+    subscription = hub.subscribe(EventFilter(device_id=1))
+    stream = hub.stream(subscription)
+    hub.start()
+    try:
+        # Wait until the hub is subscribed, messages published before are lost
+        while not (await client.pubsub_numsub(channel))[0][1]:
+            await asyncio.sleep(0.01)
+        # A malformed message is skipped, the hub keeps listening
+        await client.publish(channel, "not json")
+        event = EventCreate.model_validate(EVENT)
+        async with db_session() as session:
+            publisher = EventFeedPublisher(client, channel)
+            await EventService(session, publisher).bulk_create([event])
+
+        message = await _next(stream)
+        assert message.startswith("data: ")
+        assert json.loads(message.removeprefix("data: "))["name"] == "enter"
+    finally:
+        await stream.aclose()
+        await hub.stop()
+        await client.aclose()
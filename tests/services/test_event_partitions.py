@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+from src.consts import PartitionInterval
+from src.models import ModuleEvent
+from src.services.event_partitions import EventPartitionService, partition_start
+
+NOW = datetime.datetime(2030, 1, 9, 15, 30, tzinfo=datetime.UTC)
+
+
+def test_weekly_partition_starts_on_monday():
+    assert partition_start(NOW, PartitionInterval.WEEKLY) == datetime.datetime(
+        2030, 1, 7, tzinfo=datetime.UTC
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_partitions_moves_rows_out_of_default(
+    db_session, fake_device, fake_module
+):
+    async with db_session() as session:
+        session.add(
+            ModuleEvent(
+                artifact_path="a",
+                description="d",
+                event_timestamp=NOW,
+                name="n",
+                priority="LOW",
+                device_id=1,
+                module_id=1,
+            )
+        )
+        await session.commit()
+
+    async with db_session() as session:
+        service = EventPartitionService(session, PartitionInterval.DAILY)
+        created = await service.create_partitions(NOW, premake=1)
+        assert [partition.name for partition in created] == [
+            "modules_module_event_p20300109",
+            "modules_module_event_p20300110",
+        ]
+        assert await service.create_partitions(NOW, premake=1) == []
+
+    async with db_session() as session:
+        partition = await session.scalar(
+            text("SELECT tableoid::regclass::text FROM modules_module_event")
+        )
+        assert partition == "modules_module_event_p20300109"
+
+    async with db_session() as session:
+        service = EventPartitionService(session, PartitionInterval.DAILY)
+        dropped = await service.drop_partitions(NOW + datetime.timedelta(days=1))
+        dropped_names = [partition.name for partition in dropped]
+        assert "modules_module_event_p20300109" in dropped_names
+        assert "modules_module_event_p20300110" not in dropped_names
+        assert (
+            await session.scalar(text("SELECT count(*) FROM modules_module_event")) == 0
+        )
+        await service.drop_partitions(NOW + datetime.timedelta(days=2))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_switching_to_weekly_fills_around_daily_partitions(
+    db_session, fake_device, fake_module
+):
+    async with db_session() as session:
+        service = EventPartitionService(session, PartitionInterval.DAILY)
+        await service.create_partitions(NOW, premake=1)
+
+    async with db_session() as session:
+        service = EventPartitionService(session, PartitionInterval.WEEKLY)
+        created = await service.create_partitions(NOW, premake=1)
+        assert [(p.name, p.start.day, p.end.day) for p in created] == [
+            # The week of NOW around the daily partitions of the 9th and 10th
+            ("modules_module_event_p20300107", 7, 9),
+            ("modules_module_event_p20300111", 11, 14),
+            ("modules_module_event_p20300114", 14, 21),
+        ]
+        assert await service.create_partitions(NOW, premake=1) == []
+
+        session.add(
+            ModuleEvent(
+                artifact_path="a",
+                description="d",
+                event_timestamp=NOW + datetime.timedelta(days=3),
+                name="n",
+                priority="LOW",
+                device_id=1,
+                module_id=1,
+            )
+        )
+        await session.commit()
+        partition = await session.scalar(
+            text("SELECT tableoid::regclass::text FROM modules_module_event")
+        )
+        assert partition == "modules_module_event_p20300111"
+
+    async with db_session() as session:
+        service = EventPartitionService(session, PartitionInterval.WEEKLY)
+        await service.drop_partitions(NOW + datetime.timedelta(weeks=2))
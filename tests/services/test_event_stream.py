@@ -0,0 +1,114 @@
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from src.services.module_events import EventService
+from src.schemas.module_events import EventFilter
+
+EVENT = {
+    "artifact_path": "artifacts/frame.jpg",
+    "description": "Person entered",
+    "event_timestamp": "2025-03-14T12:00:00",
+    "name": "enter",
+    "priority": "LOW",
+    "device_id": 1,
+    "module_id": 1,
+}
+
+
+async def _stored_events(db_session) -> int:
+    async with db_session() as session:
+        page = await EventService(session).get_filtered_page(EventFilter(), 100)
+        return len(page.items)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_events_are_queued_to_stream(
+    http_client: AsyncClient, db_session, fake_device, fake_module, event_stream_worker
+):
+    response = await http_client.post(
+        url="/api/v1/events/bulk/", json=[EVENT, EVENT, {**EVENT, "priority": "?"}]
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["queued"] == 2
+    assert response.json()["errors"][0]["index"] == 2
+    response = await http_client.post(url="/api/v1/events/", json=EVENT)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert await _stored_events(db_session) == 0
+
+    assert await event_stream_worker.read_batch() == 3
+    assert await _stored_events(db_session) == 3
+    assert await event_stream_worker.read_batch() == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_worker_reclaims_unacknowledged_entries(
+    http_client: AsyncClient, db_session, fake_device, fake_module, event_stream_worker
+):
+    await http_client.post(url="/api/v1/events/bulk/", json=[EVENT, EVENT])
+    # Another consumer fetches the entries and dies before acknowledging them
+    await event_stream_worker.client.xreadgroup(
+        event_stream_worker.group,
+        "crashed-consumer",
+        {event_stream_worker.key: ">"},
+        count=10,
+    )
+    assert await event_stream_worker.read_batch() == 0
+
+    assert await event_stream_worker.reclaim() == 2
+    assert await _stored_events(db_session) == 2
+    pending = await event_stream_worker.client.xpending(
+        event_stream_worker.key, event_stream_worker.group
+    )
+    assert pending["pending"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_keeps_priorities_in_separate_lanes(
+    http_client: AsyncClient, db_session, fake_device, fake_module, event_stream_worker
+):
+    await http_client.post(
+        url="/api/v1/events/bulk/", json=[EVENT, {**EVENT, "priority": "CRITICAL"}]
+    )
+    critical_key = event_stream_worker.key.replace(":LOW", ":CRITICAL")
+    assert await event_stream_worker.client.xlen(critical_key) == 1
+
+    assert await event_stream_worker.read_batch() == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_worker_dead_letters_entries_failing_repeatedly(
+    http_client: AsyncClient, db_session, fake_device, fake_module, event_stream_worker
+):
+    await http_client.post(url="/api/v1/events/bulk/", json=[EVENT])
+    event_stream_worker.max_deliveries = 1
+    await event_stream_worker.client.xreadgroup(
+        event_stream_worker.group,
+        "crashed-consumer",
+        {event_stream_worker.key: ">"},
+        count=10,
+    )
+
+    assert await event_stream_worker.reclaim() == 0
+    assert await _stored_events(db_session) == 0
+    client = event_stream_worker.client
+    assert await client.xlen(event_stream_worker.dead_letter_key) == 1
+    pending = await client.xpending(event_stream_worker.key, event_stream_worker.group)
+    assert pending["pending"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_worker_survives_failing_batches(monkeypatch, event_stream_worker):
+    monkeypatch.setattr("src.services.event_stream.MIN_RETRY_DELAY", 0)
+    calls = 0
+
+    async def failing_read_batch() -> int:
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            event_stream_worker.stop()
+        raise ConnectionError("Redis went away")
+
+    monkeypatch.setattr(event_stream_worker, "read_batch", failing_read_batch)
+    await event_stream_worker.run()
+    assert calls == 3
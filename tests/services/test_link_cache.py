@@ -0,0 +1,37 @@
+import uuid
+
+import pytest
+import redis.asyncio as redis
+
+from src.config.project_settings import settings
+from src.services.link_cache import REDIS_KEY_PREFIX, PresignedLinkCache
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_link_cache_evicts_least_recently_used():
+    cache = PresignedLinkCache(ttl=60, max_entries=2, local_ttl=60)
+    await cache.set("a", "link-a")
+    await cache.set("b", "link-b")
+    assert await cache.get("a") == "link-a"
+    await cache.set("c", "link-c")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "link-a"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_link_cache_is_shared_through_redis():
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    path = f"test/{uuid.uuid4()}"
+    worker_a = PresignedLinkCache(ttl=60, max_entries=10, local_ttl=10, client=client)
+    worker_b = PresignedLinkCache(ttl=60, max_entries=10, local_ttl=10, client=client)
+    try:
+        await worker_a.set(path, "link")
+        assert 0 < await client.ttl(REDIS_KEY_PREFIX + path) <= 60
+        assert await worker_b.get(path) == "link"
+
+        await worker_b.invalidate(path)
+        assert await client.get(REDIS_KEY_PREFIX + path) is None
+    finally:
+        await client.delete(REDIS_KEY_PREFIX + path)
+        await client.aclose()
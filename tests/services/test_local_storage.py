@@ -0,0 +1,33 @@
+import io
+
+import pytest
+
+from src.external_services.storage.local import LocalFileStorage
+
+
+async def _read(storage: LocalFileStorage, path: str, byte_range=None) -> bytes:
+    file_stream = await storage.stream_file(path, chunk_size=3, byte_range=byte_range)
+    return b"".join([chunk async for chunk in file_stream.chunks])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_local_storage_round_trip(tmp_path):
+    storage = LocalFileStorage(str(tmp_path), "/api/v1/files/", "secret")
+    await storage.open()
+    await storage.upload_file(io.BytesIO(b"0123456789"), "camera/1.mp4")
+
+    assert await storage.get_file("camera/1.mp4") == b"0123456789"
+    assert await _read(storage, "camera/1.mp4") == b"0123456789"
+    assert await _read(storage, "camera/1.mp4", byte_range=(4, 7)) == b"4567"
+    assert (await storage.get_file_info("camera/1.mp4")).size == 10
+    assert list(tmp_path.glob("camera/*")) == [tmp_path / "camera" / "1.mp4"]
+
+    await storage.delete_file("camera/1.mp4")
+    assert await storage.stream_file("camera/1.mp4") is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_local_storage_stays_in_directory(tmp_path):
+    storage = LocalFileStorage(str(tmp_path / "files"), "/api/v1/files/", "secret")
+    with pytest.raises(ValueError):
+        await storage.upload_file(io.BytesIO(b""), "../escaped")
@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import io
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.config.project_settings import settings
+from src.external_services.storage.minio_s3 import MIB, S3StorageClient
+
+
+class RecordingS3Client:
+    def __init__(self, fail_part: int | None = None) -> None:
+        self.fail_part = fail_part
+        self.calls = []
+        self.parts = {}
+
+    async def put_object(self, **kwargs):
+        self.calls.append("put_object")
+
+    async def create_multipart_upload(self, **kwargs):
+        self.calls.append("create_multipart_upload")
+        return {"UploadId": "upload-1"}
+
+    async def upload_part(self, PartNumber, Body, **kwargs):
+        if PartNumber == self.fail_part:
+            raise ConnectionError("part upload failed")
+        self.parts[PartNumber] = Body
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    async def complete_multipart_upload(self, MultipartUpload, **kwargs):
+        self.calls.append("complete_multipart_upload")
+        self.completed = MultipartUpload["Parts"]
+
+    async def abort_multipart_upload(self, **kwargs):
+        self.calls.append("abort_multipart_upload")
+
+    async def head_object(self, **kwargs):
+        self.head = kwargs
+        return {"ContentLength": 5, "ChecksumSHA256": self.checksum}
+
+    async def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        self.calls.append(ClientMethod)
+        self.presigned = Params
+        return "https://s3/upload"
+
+    async def delete_objects(self, Delete, **kwargs):
+        self.calls.append(len(Delete["Objects"]))
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        return {
+            "Errors": [
+                {"Key": key, "Message": "AccessDenied"}
+                for key in keys
+                if key == "key-7"
+            ]
+        }
+
+
+def _storage(client: RecordingS3Client) -> S3StorageClient:
+    storage = S3StorageClient(
+        access_key="",
+        secret_key="",
+        url="",
+        bucket_name="bucket",
+        multipart_threshold=8 * MIB,
+        multipart_part_size=5 * MIB,
+        multipart_concurrency=2,
+    )
+
+    @asynccontextmanager
+    async def get_client():
+        yield client
+
+    storage.get_client = get_client
+    return storage
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_small_file_uses_single_put():
+    client = RecordingS3Client()
+    await _storage(client).upload_file(io.BytesIO(b"x" * MIB), "small")
+    assert client.calls == ["put_object"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_large_file_uses_multipart_upload():
+    client = RecordingS3Client()
+    payload = bytes(range(256)) * (48 * 1024)  # 12 MiB
+    await _storage(client).upload_file(io.BytesIO(payload), "large")
+
+    assert client.calls == ["create_multipart_upload", "complete_multipart_upload"]
+    assert [part["PartNumber"] for part in client.completed] == [1, 2, 3]
+    assert b"".join(client.parts[number] for number in (1, 2, 3)) == payload
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failed_multipart_upload_is_aborted():
+    client = RecordingS3Client(fail_part=2)
+    with pytest.raises(ConnectionError):
+        await _storage(client).upload_file(io.BytesIO(b"x" * 12 * MIB), "large")
+    assert client.calls == ["create_multipart_upload", "abort_multipart_upload"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_delete_files_in_batches_of_1000():
+    client = RecordingS3Client()
+    keys = [f"key-{number}" for number in range(2500)]
+    failed = await _storage(client).delete_files(keys)
+    assert client.calls == [1000, 1000, 500]
+    assert failed == ["key-7"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_link_is_bound_to_the_content():
+    client = RecordingS3Client()
+    sha256 = hashlib.sha256(b"video").hexdigest()
+    link = await _storage(client).get_upload_link(sha256, 5, sha256)
+    assert link.url == "https://s3/upload"
+    assert client.presigned["ContentLength"] == 5
+    assert base64.b64decode(client.presigned["ChecksumSHA256"]) == (
+        hashlib.sha256(b"video").digest()
+    )
+    assert link.headers == {
+        "Content-Length": "5",
+        "x-amz-checksum-sha256": client.presigned["ChecksumSHA256"],
+    }
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_link_signs_the_checksum_header():
+    storage = S3StorageClient(
+        access_key="key", secret_key="secret", url="http://s3", bucket_name="b"
+    )
+    sha256 = hashlib.sha256(b"video").hexdigest()
+    link = await storage.get_upload_link(sha256, 5, sha256)
+    assert "X-Amz-SignedHeaders=content-length%3Bhost%3Bx-amz-checksum-sha256" in (
+        link.url
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_file_sha256_comes_from_the_stored_checksum():
+    sha256 = hashlib.sha256(b"video").hexdigest()
+    client = RecordingS3Client()
+    client.checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+    assert await _storage(client).get_file_sha256("key") == sha256
+    assert client.head == {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"}
+
+    # Multipart uploads carry a checksum of checksums
+    client.checksum += "-3"
+    assert await _storage(client).get_file_sha256("key") is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_opened_storage_reuses_one_client():
+    client = RecordingS3Client()
+    created = []
+    storage = S3StorageClient(access_key="", secret_key="", url="", bucket_name="b")
+    assert storage.config.max_pool_connections == settings.s3_max_pool_connections
+
+    @asynccontextmanager
+    async def create_client():
+        created.append("open")
+        yield client
+        created.append("closed")
+
+    storage._create_client = create_client
+    await storage.open()
+    await storage.upload_file(io.BytesIO(b"x"), "first")
+    await storage.upload_file(io.BytesIO(b"x"), "second")
+    assert created == ["open"]
+    assert client.calls == ["put_object", "put_object"]
+
+    await storage.close()
+    assert created == ["open", "closed"]
+    async with storage.get_client():
+        assert created == ["open", "closed", "open"]